@@ -0,0 +1,182 @@
+"""
+本地AI模型 - 基于K线窗口特征的多分类逻辑回归（NumPy实现）
+
+模型文件为一个 .npy 权重矩阵（标准化参数已并入权重）和一个 meta.json，
+推理时以 mmap_mode='r' 映射权重，多个worker共享同一份只读页面。
+特征和推理都按矩阵批量计算，一次调用可为多个交易对和时间框架打分。
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 特征窗口长度（K线数）与类别
+WINDOW = 30
+CLASSES = ["down", "neutral", "up"]
+FEATURES = ["trend", "momentum", "last_return", "range_position", "log_volatility"]
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_DIR = os.path.join(BACKEND_DIR, "ai_model")
+WEIGHTS_FILE = "weights.npy"
+META_FILE = "meta.json"
+
+
+def window_features(windows: np.ndarray) -> np.ndarray:
+    """收盘价窗口矩阵 (样本数, WINDOW) -> 特征矩阵 (样本数, 特征数)"""
+    windows = np.asarray(windows, dtype=np.float64)
+    log_prices = np.log(windows)
+    returns = np.diff(log_prices, axis=1)
+    volatility = returns.std(axis=1)
+    scale = np.where(volatility > 0, volatility, 1e-9)
+
+    n = windows.shape[1]
+    x = np.arange(n, dtype=np.float64)
+    x -= x.mean()
+    slope = (log_prices - log_prices.mean(axis=1, keepdims=True)) @ x / np.dot(x, x)
+
+    lookback = min(10, n - 1)
+    momentum = (log_prices[:, -1] - log_prices[:, -1 - lookback]) / (scale * np.sqrt(lookback))
+
+    high = windows.max(axis=1)
+    low = windows.min(axis=1)
+    span = np.where(high > low, high - low, 1.0)
+
+    return np.column_stack([
+        slope * np.sqrt(n) / scale,
+        momentum,
+        returns[:, -1] / scale,
+        (windows[:, -1] - low) / span * 2 - 1,
+        np.log(scale)
+    ])
+
+
+def build_dataset(closes: np.ndarray, horizon: int = 1, threshold: float = 0.25) -> Tuple[np.ndarray, np.ndarray]:
+    """由收盘价序列构建训练样本
+
+    标签为未来horizon根K线的对数涨跌幅相对窗口波动率的方向：
+    超过 threshold·σ 为上涨，低于 -threshold·σ 为下跌，其余为中性。
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if len(closes) < WINDOW + horizon:
+        return np.empty((0, len(FEATURES))), np.empty(0, dtype=np.int64)
+
+    windows = sliding_window_view(closes[:-horizon], WINDOW)
+    features = window_features(windows)
+
+    future = np.log(closes[WINDOW - 1 + horizon:] / closes[WINDOW - 1:-horizon])
+    volatility = np.exp(features[:, FEATURES.index("log_volatility")])
+    labels = np.ones(len(future), dtype=np.int64)
+    labels[future > threshold * volatility] = CLASSES.index("up")
+    labels[future < -threshold * volatility] = CLASSES.index("down")
+    return features, labels
+
+
+def train_softmax(features: np.ndarray, labels: np.ndarray, epochs: int = 500,
+                  learning_rate: float = 0.5, l2: float = 1e-3) -> np.ndarray:
+    """批量梯度下降训练多分类逻辑回归
+
+    返回 (特征数 + 1, 类别数) 的权重矩阵，最后一行为偏置，标准化参数已并入权重，
+    推理时直接对原始特征计算 features @ W[:-1] + W[-1]。
+    """
+    mean = features.mean(axis=0)
+    std = features.std(axis=0)
+    std = np.where(std > 0, std, 1.0)
+    x = (features - mean) / std
+
+    n_samples, n_features = x.shape
+    n_classes = len(CLASSES)
+    targets = np.eye(n_classes)[labels]
+    weights = np.zeros((n_features, n_classes))
+    bias = np.zeros(n_classes)
+
+    for _ in range(epochs):
+        probabilities = softmax(x @ weights + bias)
+        error = (probabilities - targets) / n_samples
+        weights -= learning_rate * (x.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+
+    # 把标准化并入权重
+    folded = weights / std[:, None]
+    folded_bias = bias - (mean / std) @ weights
+    return np.vstack([folded, folded_bias])
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def model_dir() -> str:
+    """模型目录：AI_MODEL_DIR（相对路径相对于backend目录，与工作目录无关），默认 backend/ai_model
+
+    调用时才读取环境变量，保证 load_dotenv() 之后的配置生效。
+    """
+    directory = os.getenv("AI_MODEL_DIR") or DEFAULT_MODEL_DIR
+    return os.path.join(BACKEND_DIR, directory)
+
+
+def save_model(weights: np.ndarray, meta: Dict, directory: Optional[str] = None):
+    """保存模型（先写临时文件再替换，避免worker读到写了一半的文件）"""
+    directory = directory or model_dir()
+    os.makedirs(directory, exist_ok=True)
+    meta = dict(meta, features=FEATURES, classes=CLASSES, window=WINDOW, trained_at=int(time.time()))
+
+    weights_path = os.path.join(directory, WEIGHTS_FILE)
+    with open(weights_path + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(weights, dtype=np.float64))
+    os.replace(weights_path + ".tmp", weights_path)
+
+    meta_path = os.path.join(directory, META_FILE)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+class AIModel:
+    """内存映射的只读模型"""
+
+    def __init__(self, weights: np.ndarray, meta: Dict):
+        self.weights = weights
+        self.meta = meta
+        self.window = int(meta.get("window", WINDOW))
+
+    @classmethod
+    def load(cls, directory: Optional[str] = None) -> Optional["AIModel"]:
+        """加载模型，文件不存在时返回None"""
+        directory = directory or model_dir()
+        weights_path = os.path.join(directory, WEIGHTS_FILE)
+        meta_path = os.path.join(directory, META_FILE)
+        if not (os.path.exists(weights_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("features") != FEATURES:
+            raise ValueError("模型特征与当前代码不一致，请重新训练")
+        return cls(np.load(weights_path, mmap_mode="r"), meta)
+
+    def predict_proba(self, windows: np.ndarray) -> np.ndarray:
+        """批量推理：收盘价窗口矩阵 (样本数, window) -> 各类别概率 (样本数, 3)"""
+        features = window_features(windows)
+        return softmax(features @ self.weights[:-1] + self.weights[-1])
+
+    def predict_many(self, windows: List[Optional[np.ndarray]]) -> List[Optional[Dict]]:
+        """为多个窗口打分，窗口为None（历史不足）的位置返回None"""
+        valid = [i for i, window in enumerate(windows) if window is not None]
+        results: List[Optional[Dict]] = [None] * len(windows)
+        if not valid:
+            return results
+
+        probabilities = self.predict_proba(np.stack([windows[i] for i in valid]))
+        best = probabilities.argmax(axis=1)
+        for row, i in enumerate(valid):
+            results[i] = {
+                "direction": CLASSES[best[row]],
+                "probability": round(float(probabilities[row, best[row]]) * 100, 2),
+                "probabilities": dict(zip(CLASSES, np.round(probabilities[row], 4).tolist()))
+            }
+        return results
@@ -5,12 +5,81 @@ AI增强型交易策略服务
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Optional
+import re
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Tuple, Optional
 from datetime import datetime, timedelta
 import logging
+import time
 from dataclasses import dataclass
 import json
 
+from rolling_stats import rolling_mean, rolling_std
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # scipy为可选依赖，缺失时使用NumPy分块实现
+    lfilter = None
+
+# NumPy实现中每块的长度（块内用矩阵乘法，块间传递末值）
+EMA_BLOCK = 256
+
+
+def exponential_moving_average(values, period: int) -> np.ndarray:
+    """指数移动平均 ema[i] = alpha * x[i] + (1 - alpha) * ema[i-1]，ema[0] = x[0]
+
+    以 ema[-1] = x[0] 为初始状态作为一阶递归滤波一次算出，结果与逐点循环一致。
+    沿最后一维计算，二维输入（交易对 × K线）每行独立。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] == 0:
+        return values.copy()
+    alpha = 2 / (period + 1)
+    decay = 1 - alpha
+    if lfilter is not None:
+        ema, _ = lfilter([alpha], [1, -decay], values, axis=-1, zi=decay * values[..., :1])
+        return ema
+    return _ema_blocks(values, alpha)
+
+
+def _ema_blocks(values: np.ndarray, alpha: float) -> np.ndarray:
+    """无scipy时的EMA：块内为下三角权重矩阵乘法，块间只循环 n/EMA_BLOCK 次"""
+    n = values.shape[-1]
+    leading = values.shape[:-1]
+    block = min(EMA_BLOCK, n)
+    decay = 1 - alpha
+    padded = np.zeros(leading + (-(-n // block) * block,))
+    padded[..., :n] = values
+    blocks = padded.reshape(leading + (-1, block))
+
+    # weights[k, j] = alpha * decay^(k-j)，j <= k
+    powers = decay ** np.arange(block + 1)
+    lags = np.subtract.outer(np.arange(block), np.arange(block))
+    weights = np.where(lags >= 0, alpha * powers[np.clip(lags, 0, None)], 0.0)
+    partial = blocks @ weights.T
+
+    # 块内第k个点还需加上 decay^(k+1) * 上一块的末值
+    carry = powers[1:]
+    ema = np.empty_like(blocks)
+    previous = values[..., :1]
+    for i in range(blocks.shape[-2]):
+        ema[..., i, :] = partial[..., i, :] + carry * previous
+        previous = ema[..., i, -1:]
+    return ema.reshape(padded.shape)[..., :n]
+
+
+def relative_strength_index(prices, period: int = 14) -> np.ndarray:
+    """RSI（涨跌幅的简单移动平均）"""
+    deltas = np.diff(np.asarray(prices, dtype=np.float64), axis=-1)
+    gains = np.maximum(deltas, 0.0)
+    losses = np.maximum(-deltas, 0.0)
+
+    avg_gains = rolling_mean(gains, period)
+    avg_losses = rolling_mean(losses, period)
+
+    rs = avg_gains / (avg_losses + 1e-10)
+    return 100 - (100 / (1 + rs))
+
 @dataclass
 class StrategySignal:
     """策略信号数据类"""
@@ -30,6 +99,183 @@ class MarketData:
     volumes: List[float]
     timestamps: List[datetime]
     symbol: str
+    # 原地修改价格/成交量后需加1，使已缓存的指标失效
+    version: int = 0
+
+@dataclass
+class UniverseData:
+    """多个交易对按K线对齐的行情矩阵，prices/volumes 形状为 (交易对数, K线数)"""
+    symbols: List[str]
+    prices: np.ndarray
+    volumes: np.ndarray
+
+# 指标注册表：名称 -> 计算函数(indicators)；带周期的指标（如ma20）按前缀注册，函数额外接收周期。
+# 计算函数通过 indicators[...] 取依赖，依赖同样按需计算并缓存。
+INDICATORS: Dict[str, Callable] = {}
+PERIODIC_INDICATORS: Dict[str, Callable] = {}
+
+# calculate_technical_indicators 返回的完整指标集
+DEFAULT_INDICATORS = (
+    'ma5', 'ma10', 'ma20', 'ma50', 'rsi', 'bollinger_bands', 'macd',
+    'volume_ratio', 'current_price', 'price_change'
+)
+
+
+# 各策略（含AI市场环境分析）读取的指标，批量计算时只算这些
+MOMENTUM_INDICATORS = ('current_price', 'price_change', 'rsi', 'volume_ratio')
+CONTEXT_INDICATORS = ('rsi', 'volume_ratio', 'price_change', 'ma5', 'ma20', 'ma50')
+
+
+def indicator(name: str, periodic: bool = False):
+    """注册指标计算函数"""
+    def decorator(func):
+        (PERIODIC_INDICATORS if periodic else INDICATORS)[name] = func
+        return func
+    return decorator
+
+
+class Indicators(Mapping):
+    """一份行情数据上的指标，首次访问时计算并缓存（长度和迭代只包含已计算的指标）"""
+
+    def __init__(self, market_data: MarketData):
+        self.market_data = market_data
+        self._values: Dict = {}
+
+    def __getitem__(self, name: str):
+        if name not in self._values:
+            self._values[name] = self._compute(name)
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def require(self, names) -> 'Indicators':
+        """计算指定指标及其依赖"""
+        for name in names:
+            self[name]
+        return self
+
+    def _compute(self, name: str):
+        if name in INDICATORS:
+            return INDICATORS[name](self)
+        match = re.fullmatch(r'([a-z_]+?)(\d+)', name)
+        if match and match.group(1) in PERIODIC_INDICATORS and int(match.group(2)) > 0:
+            return PERIODIC_INDICATORS[match.group(1)](self, int(match.group(2)))
+        raise KeyError(name)
+
+
+@indicator('prices')
+def _prices(ind: Indicators) -> np.ndarray:
+    return np.asarray(ind.market_data.prices, dtype=np.float64)
+
+
+@indicator('volumes')
+def _volumes(ind: Indicators) -> np.ndarray:
+    return np.asarray(ind.market_data.volumes, dtype=np.float64)
+
+
+@indicator('current_price')
+def _current_price(ind: Indicators) -> float:
+    # [()] 使一维数据得到标量而不是0维数组
+    return ind['prices'][..., -1][()]
+
+
+@indicator('price_change')
+def _price_change(ind: Indicators) -> float:
+    prices = ind['prices']
+    if prices.shape[-1] < 2:
+        return np.zeros(prices.shape[:-1]) if prices.ndim > 1 else 0
+    return ((prices[..., -1] - prices[..., -2]) / prices[..., -2] * 100)[()]
+
+
+@indicator('ma', periodic=True)
+def _ma(ind: Indicators, period: int) -> np.ndarray:
+    return rolling_mean(ind['prices'], period)
+
+
+@indicator('ema', periodic=True)
+def _ema(ind: Indicators, period: int) -> np.ndarray:
+    return exponential_moving_average(ind['prices'], period)
+
+
+@indicator('volume_ma', periodic=True)
+def _volume_ma(ind: Indicators, period: int) -> np.ndarray:
+    return rolling_mean(ind['volumes'], period)
+
+
+@indicator('volume_ratio')
+def _volume_ratio(ind: Indicators) -> float:
+    volume_ma = ind['volume_ma20']
+    if volume_ma.shape[-1] == 0:
+        return np.ones(volume_ma.shape[:-1]) if volume_ma.ndim > 1 else 1
+    average = volume_ma[..., -1]
+    ratio = np.divide(ind['volumes'][..., -1], average, out=np.ones_like(average), where=average > 0)
+    return ratio if ratio.ndim else float(ratio)
+
+
+@indicator('rsi', periodic=True)
+def _rsi_period(ind: Indicators, period: int) -> np.ndarray:
+    return relative_strength_index(ind['prices'], period)
+
+
+@indicator('rsi')
+def _rsi(ind: Indicators) -> np.ndarray:
+    return ind['rsi14']
+
+
+@indicator('bollinger_bands')
+def _bollinger_bands(ind: Indicators) -> Dict:
+    middle = ind['ma20']
+    std = rolling_std(ind['prices'], 20)
+    return {'upper': middle + std * 2, 'middle': middle, 'lower': middle - std * 2}
+
+
+@indicator('macd')
+def _macd(ind: Indicators) -> Dict:
+    macd = ind['ema12'] - ind['ema26']
+    signal = exponential_moving_average(macd, 9)
+    return {'macd': macd, 'signal': signal, 'histogram': macd - signal}
+
+
+def _row_snapshot(indicators: Mapping, row: int) -> Dict:
+    """二维指标中一个交易对的快照：序列指标取最近两根K线，标量指标取该行的值"""
+    snapshot = {}
+    for name, value in indicators.items():
+        if isinstance(value, Mapping):
+            snapshot[name] = _row_snapshot(value, row)
+        elif np.ndim(value) == 2:
+            snapshot[name] = value[row, -2:]
+        else:
+            snapshot[name] = value[row]
+    return snapshot
+
+
+class IndicatorContext:
+    """按数据对象和版本缓存指标，同一次策略评估中的各项分析共享一份结果"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.computed = 0
+        self._market_data: Optional[MarketData] = None
+        self._key: Optional[Tuple[int, int, int]] = None
+        self._indicators: Optional[Indicators] = None
+
+    def get(self, market_data: MarketData, names=()) -> Mapping:
+        """返回（至少已算好names的）指标；数据对象、版本或长度变化时重新开始缓存，计算失败返回空字典"""
+        key = (market_data.version, len(market_data.prices), len(market_data.volumes))
+        if market_data is not self._market_data or key != self._key:
+            self._indicators = Indicators(market_data)
+            self._market_data = market_data
+            self._key = key
+            self.computed += 1
+        try:
+            return self._indicators.require(names)
+        except Exception as e:
+            self.logger.error(f"计算技术指标失败: {e}")
+            return {}
 
 class AIStrategyService:
     """AI增强型交易策略服务"""
@@ -42,76 +288,124 @@ class AIStrategyService:
             'ai_enhanced_ma': self.ai_enhanced_ma_strategy,
             'ai_enhanced_momentum': self.ai_enhanced_momentum_strategy
         }
+        self.indicator_context = IndicatorContext()
+
+    def _get_indicators(self, market_data, names=()) -> Mapping:
+        """策略使用的指标：market_data 为增量指标引擎的快照时直接使用，否则按历史计算并缓存"""
+        if isinstance(market_data, Mapping):
+            return market_data if all(name in market_data for name in names) else {}
+        return self.indicator_context.get(market_data, names)
 
     def calculate_technical_indicators(self, market_data: MarketData) -> Dict:
         """计算技术指标"""
         try:
-            prices = np.array(market_data.prices)
-
-            # 计算移动平均线
-            ma5 = self._calculate_ma(prices, 5)
-            ma10 = self._calculate_ma(prices, 10)
-            ma20 = self._calculate_ma(prices, 20)
-            ma50 = self._calculate_ma(prices, 50)
-
-            # 计算RSI
-            rsi = self._calculate_rsi(prices, 14)
-
-            # 计算布林带
-            bb_upper, bb_middle, bb_lower = self._calculate_bollinger_bands(prices, 20, 2)
-
-            # 计算MACD
-            macd, signal, histogram = self._calculate_macd(prices)
-
-            # 计算成交量指标
-            volume_ma = self._calculate_ma(market_data.volumes, 20)
-            volume_ratio = market_data.volumes[-1] / volume_ma[-1] if volume_ma[-1] > 0 else 1
-
-            return {
-                'ma5': ma5,
-                'ma10': ma10,
-                'ma20': ma20,
-                'ma50': ma50,
-                'rsi': rsi,
-                'bollinger_bands': {
-                    'upper': bb_upper,
-                    'middle': bb_middle,
-                    'lower': bb_lower
-                },
-                'macd': {
-                    'macd': macd,
-                    'signal': signal,
-                    'histogram': histogram
-                },
-                'volume_ratio': volume_ratio,
-                'current_price': prices[-1],
-                'price_change': ((prices[-1] - prices[-2]) / prices[-2] * 100) if len(prices) > 1 else 0
-            }
+            indicators = Indicators(market_data).require(DEFAULT_INDICATORS)
+            return {name: indicators[name] for name in DEFAULT_INDICATORS}
         except Exception as e:
             self.logger.error(f"计算技术指标失败: {e}")
             return {}
 
+    def calculate_universe_indicators(self, universe: UniverseData, names=DEFAULT_INDICATORS) -> Indicators:
+        """一次向量化计算所有交易对的指标（每个指标沿K线维度逐行计算）"""
+        return Indicators(universe).require(names)
+
+    def run_strategy_batch(self, strategy_id: str, universe: UniverseData,
+                           params: Dict = None, ai_context: Dict = None) -> Dict[str, StrategySignal]:
+        """对整个交易对集合运行策略，返回 交易对 -> 信号
+
+        指标在 (交易对 × K线) 矩阵上一次算出；每个交易对只取最近两根K线的指标组成快照，
+        复用单交易对的信号判断逻辑，这一步与历史长度无关。
+        """
+        if strategy_id not in self.strategies:
+            raise ValueError(f"未知策略: {strategy_id}")
+
+        try:
+            indicators = self.calculate_universe_indicators(universe, self._strategy_indicators(strategy_id, params))
+        except Exception as e:
+            self.logger.error(f"批量计算技术指标失败: {e}")
+            return {symbol: self._create_hold_signal("技术指标计算失败") for symbol in universe.symbols}
+
+        return {
+            symbol: self.run_strategy(strategy_id, _row_snapshot(indicators, row), params, ai_context)
+            for row, symbol in enumerate(universe.symbols)
+        }
+
+    def evaluate_all(self, market_data: Dict[str, MarketData], strategies=None,
+                     params: Dict[str, Dict] = None, ai_context: Dict = None) -> Dict:
+        """对每个交易对运行全部（或指定）策略，返回 {'signals': 交易对 -> 策略 -> 信号, 'timing_ms': 各阶段耗时}
+
+        每个交易对的指标只计算一次（各策略所需指标的并集），所有策略共享这一份指标；
+        market_data 的值也可以是 IndicatorEngine.snapshot() 快照，缺少所需指标时该交易对输出观望信号。
+        params 为 策略 -> 参数。
+        """
+        strategies = list(strategies or self.strategies)
+        unknown = [strategy_id for strategy_id in strategies if strategy_id not in self.strategies]
+        if unknown:
+            raise ValueError(f"未知策略: {', '.join(unknown)}")
+        params = params or {}
+        names = list(dict.fromkeys(
+            name for strategy_id in strategies
+            for name in self._strategy_indicators(strategy_id, params.get(strategy_id))
+        ))
+
+        started = time.perf_counter()
+        indicator_seconds = 0.0
+        strategy_seconds = dict.fromkeys(strategies, 0.0)
+        signals = {}
+        for symbol, data in market_data.items():
+            stage = time.perf_counter()
+            if isinstance(data, Mapping):
+                indicators = data if all(name in data for name in names) else None
+            else:
+                try:
+                    indicators = Indicators(data).require(names)
+                except Exception as e:
+                    self.logger.error(f"计算 {symbol} 技术指标失败: {e}")
+                    indicators = None
+            indicator_seconds += time.perf_counter() - stage
+
+            row = {}
+            for strategy_id in strategies:
+                stage = time.perf_counter()
+                if indicators is None:
+                    row[strategy_id] = self._create_hold_signal("技术指标计算失败")
+                else:
+                    row[strategy_id] = self.run_strategy(strategy_id, indicators, params.get(strategy_id), ai_context)
+                strategy_seconds[strategy_id] += time.perf_counter() - stage
+            signals[symbol] = row
+
+        return {
+            'signals': signals,
+            'timing_ms': {
+                'indicators': round(indicator_seconds * 1000, 3),
+                'strategies': {strategy_id: round(seconds * 1000, 3) for strategy_id, seconds in strategy_seconds.items()},
+                'total': round((time.perf_counter() - started) * 1000, 3)
+            }
+        }
+
+    def _strategy_indicators(self, strategy_id: str, params: Dict = None) -> List[str]:
+        """策略（AI增强策略含市场环境分析）读取的指标名"""
+        if strategy_id.endswith('momentum') or strategy_id == 'momentum_reversal':
+            names = list(MOMENTUM_INDICATORS)
+        else:
+            ma_params = params or {'short_period': 5, 'long_period': 20}
+            names = [f"ma{ma_params['short_period']}", f"ma{ma_params['long_period']}", 'current_price']
+        if strategy_id.startswith('ai_enhanced'):
+            names += CONTEXT_INDICATORS
+        return names
+
     def _calculate_ma(self, prices: np.ndarray, period: int) -> np.ndarray:
         """计算移动平均线"""
-        return np.convolve(prices, np.ones(period)/period, mode='valid')
+        return rolling_mean(prices, period)
 
     def _calculate_rsi(self, prices: np.ndarray, period: int = 14) -> np.ndarray:
         """计算RSI指标"""
-        deltas = np.diff(prices)
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-
-        avg_gains = np.convolve(gains, np.ones(period)/period, mode='valid')
-        avg_losses = np.convolve(losses, np.ones(period)/period, mode='valid')
-
-        rs = avg_gains / (avg_losses + 1e-10)
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        return relative_strength_index(prices, period)
 
     def _calculate_bollinger_bands(self, prices: np.ndarray, period: int = 20, std_dev: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """计算布林带"""
         ma = self._calculate_ma(prices, period)
-        std = np.array([np.std(prices[i:i+period]) for i in range(len(prices)-period+1)])
+        std = rolling_std(prices, period)
 
         upper = ma + (std * std_dev)
         lower = ma - (std * std_dev)
@@ -131,26 +425,21 @@ class AIStrategyService:
 
     def _calculate_ema(self, prices: np.ndarray, period: int) -> np.ndarray:
         """计算指数移动平均线"""
-        alpha = 2 / (period + 1)
-        ema = np.zeros_like(prices)
-        ema[0] = prices[0]
-
-        for i in range(1, len(prices)):
-            ema[i] = alpha * prices[i] + (1 - alpha) * ema[i-1]
-
-        return ema
+        return exponential_moving_average(prices, period)
 
     def ma_cross_strategy(self, market_data: MarketData, params: Dict = None) -> StrategySignal:
         """传统均线交叉策略"""
         if params is None:
             params = {'short_period': 5, 'long_period': 20}
 
-        indicators = self.calculate_technical_indicators(market_data)
+        short_name = f'ma{params["short_period"]}'
+        long_name = f'ma{params["long_period"]}'
+        indicators = self._get_indicators(market_data, (short_name, long_name, 'current_price'))
         if not indicators:
             return self._create_hold_signal("技术指标计算失败")
 
-        short_ma = indicators[f'ma{params["short_period"]}']
-        long_ma = indicators[f'ma{params["long_period"]}']
+        short_ma = indicators[short_name]
+        long_ma = indicators[long_name]
 
         if len(short_ma) < 2 or len(long_ma) < 2:
             return self._create_hold_signal("数据不足")
@@ -195,7 +484,7 @@ class AIStrategyService:
         if params is None:
             params = {'oversold_rsi': 30, 'oversold_threshold': -10}
 
-        indicators = self.calculate_technical_indicators(market_data)
+        indicators = self._get_indicators(market_data, MOMENTUM_INDICATORS)
         if not indicators:
             return self._create_hold_signal("技术指标计算失败")
 
@@ -275,7 +564,7 @@ class AIStrategyService:
         if ai_context is None:
             ai_context = {}
 
-        indicators = self.calculate_technical_indicators(market_data)
+        indicators = self._get_indicators(market_data)
 
         # 市场情绪分析
         market_sentiment = self._analyze_market_sentiment(indicators, ai_context)
@@ -327,7 +616,7 @@ class AIStrategyService:
         risk_level = 'low'
 
         # RSI极端值风险
-        if indicators.get('rsi'):
+        if len(indicators.get('rsi', [])) > 0:
             current_rsi = indicators['rsi'][-1]
             if current_rsi > 80 or current_rsi < 20:
                 risk_factors.append('RSI极端值')
@@ -514,7 +803,8 @@ class AIStrategyService:
                 'description': '基于短期和长期均线交叉的传统策略',
                 'category': 'trend_following',
                 'complexity': 'low',
-                'risk_level': 'medium'
+                'risk_level': 'medium',
+                'default_params': {'short_period': 5, 'long_period': 20}
             },
             {
                 'id': 'momentum_reversal',
@@ -522,7 +812,8 @@ class AIStrategyService:
                 'description': '捕捉超跌反弹机会的反转策略',
                 'category': 'mean_reversion',
                 'complexity': 'medium',
-                'risk_level': 'high'
+                'risk_level': 'high',
+                'default_params': {'oversold_rsi': 30, 'oversold_threshold': -10}
             },
             {
                 'id': 'ai_enhanced_ma',
@@ -530,7 +821,8 @@ class AIStrategyService:
                 'description': '结合AI市场分析的智能均线策略',
                 'category': 'ai_enhanced',
                 'complexity': 'medium',
-                'risk_level': 'medium'
+                'risk_level': 'medium',
+                'default_params': {'short_period': 5, 'long_period': 20}
             },
             {
                 'id': 'ai_enhanced_momentum',
@@ -538,13 +830,18 @@ class AIStrategyService:
                 'description': 'AI辅助的超跌反弹策略',
                 'category': 'ai_enhanced',
                 'complexity': 'high',
-                'risk_level': 'high'
+                'risk_level': 'high',
+                'default_params': {'oversold_rsi': 30, 'oversold_threshold': -10}
             }
         ]
 
     def run_strategy(self, strategy_id: str, market_data: MarketData,
                     params: Dict = None, ai_context: Dict = None) -> StrategySignal:
-        """运行指定策略"""
+        """运行指定策略
+
+        market_data 可以是 MarketData（按完整历史计算指标），也可以是
+        IndicatorEngine.snapshot() 返回的增量指标快照（不回看历史）。
+        """
         if strategy_id not in self.strategies:
             raise ValueError(f"未知策略: {strategy_id}")
 
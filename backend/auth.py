@@ -5,9 +5,11 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, AsyncSessionLocal
 from models import User
+from user_cache import user_cache, UserSnapshot
 
 # 加载环境变量
 try:
@@ -76,30 +78,37 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """获取当前用户"""
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> UserSnapshot:
+    """获取当前用户（优先读取用户缓存）"""
     token = credentials.credentials
     email = verify_token(token)
 
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户不存在",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    return user
+    cached_user = user_cache.get(email)
+    if cached_user is not None:
+        return cached_user
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户不存在",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        snapshot = UserSnapshot.from_user(user)
+
+    user_cache.set(snapshot)
+    return snapshot
 
-def admin_required(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
+async def admin_required(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> UserSnapshot:
     """管理员权限验证"""
     # 这里简化处理，实际应该有单独的管理员认证
-    user = get_current_user(credentials, db)
+    user = await get_current_user(credentials)
     if not user.email.endswith("@admin.com"):  # 简单的管理员判断
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,225 @@
+"""
+向量化回测 - 一次算出策略在整段历史上的信号序列并模拟成交
+
+signal_series 对每根K线给出与 AIStrategyService.run_strategy（只用截至该K线的数据）
+相同的信号方向和置信度，全部为整段数组运算，无逐K线循环。
+simulate 按信号K线的收盘价成交，每次换手收取手续费，统计收益、最大回撤、胜率和夏普比率。
+"""
+
+import math
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from ai_strategy_service import Indicators
+from prediction_cache import timeframe_seconds
+
+# 与订单页面一致的0.1%手续费
+FEE_RATE = 0.001
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+def _aligned(values: np.ndarray, n: int) -> np.ndarray:
+    """valid模式的指标补齐到K线长度，第t个值只依赖截至第t根K线的数据"""
+    aligned = np.full(n, np.nan)
+    if len(values):
+        aligned[n - len(values):] = values
+    return aligned
+
+
+def _previous(values: np.ndarray) -> np.ndarray:
+    return np.concatenate(([np.nan], values[:-1]))
+
+
+def _price_change(prices: np.ndarray) -> np.ndarray:
+    change = np.zeros(len(prices))
+    change[1:] = (prices[1:] - prices[:-1]) / prices[:-1] * 100
+    return change
+
+
+def _volume_ratio(ind: Indicators, n: int) -> np.ndarray:
+    average = _aligned(ind['volume_ma20'], n)
+    volumes = ind['volumes']
+    # 均线不足或非正时与单次计算一样取1
+    return np.divide(volumes, average, out=np.ones(n), where=average > 0)
+
+
+def ma_cross_signals(ind: Indicators, params: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """均线交叉策略的信号序列"""
+    params = params or {'short_period': 5, 'long_period': 20}
+    n = len(ind['prices'])
+    short = _aligned(ind[f"ma{params['short_period']}"], n)
+    long = _aligned(ind[f"ma{params['long_period']}"], n)
+    previous_short, previous_long = _previous(short), _previous(long)
+
+    buy = (short > long) & (previous_short <= previous_long)
+    sell = (short < long) & (previous_short >= previous_long)
+    direction = np.where(buy, 1, np.where(sell, -1, 0)).astype(np.int8)
+    with np.errstate(invalid='ignore'):
+        confidence = np.minimum(0.8, np.abs(short - long) / long * 10)
+    return direction, np.where(direction != 0, confidence, 0.0)
+
+
+def momentum_reversal_signals(ind: Indicators, params: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """动量反转策略的信号序列（只产生买入信号）"""
+    params = params or {'oversold_rsi': 30, 'oversold_threshold': -10}
+    prices = ind['prices']
+    n = len(prices)
+    price_change = _price_change(prices)
+    rsi = _aligned(ind['rsi'], n)
+    volume_ratio = _volume_ratio(ind, n)
+
+    oversold = (price_change < params['oversold_threshold']) & (rsi < params['oversold_rsi'])
+    price_factor = np.minimum(1.0, np.abs(price_change) / 20.0)
+    rsi_factor = np.where(rsi < 20, 0.9, np.where(rsi < 30, 0.7, np.where(rsi < 40, 0.5, 1.0)))
+    volume_factor = np.minimum(1.0, volume_ratio / 2.0)
+    probability = np.minimum(0.95, price_factor * 0.4 + rsi_factor * 0.4 + volume_factor * 0.2)
+
+    buy = oversold & (probability > 0.6)
+    return buy.astype(np.int8), np.where(buy, probability, 0.0)
+
+
+def ai_adjusted_confidence(ind: Indicators, direction: np.ndarray, confidence: np.ndarray) -> np.ndarray:
+    """按市场情绪、风险和趋势强度调整置信度（对应 _adjust_signal_with_ai）"""
+    prices = ind['prices']
+    n = len(prices)
+    rsi = _aligned(ind['rsi'], n)
+    volume_ratio = _volume_ratio(ind, n)
+    price_change = _price_change(prices)
+
+    # 情绪评分
+    score = (rsi > 50).astype(int) + (volume_ratio > 1.5) + (price_change > 2)
+
+    # 风险等级：0低 1中 2高，与单次分析相同的覆盖顺序
+    risk = np.where((rsi > 80) | (rsi < 20), 2, 0)
+    move = np.abs(price_change)
+    risk = np.where(move > 15, 2, np.where(move > 8, 1, risk))
+    risk = np.where(volume_ratio > 3, 1, risk)
+
+    # 趋势强度：2强 1中 0弱 -1未知
+    ma5, ma20, ma50 = (_aligned(ind[name], n) for name in ('ma5', 'ma20', 'ma50'))
+    with np.errstate(invalid='ignore'):
+        up = (ma5 > ma20) & (ma20 > ma50)
+        down = (ma5 < ma20) & (ma20 < ma50)
+        spread = np.abs(ma5 - ma50) / ma50
+    strength = np.where(up | down, np.where(spread > 0.1, 2, 1), 0)
+    strength = np.where(np.isnan(ma50), -1, strength)
+
+    adjustment = 0.1 * (((direction == 1) & (score >= 2)) | ((direction == -1) & (score <= 0)))
+    adjustment = adjustment + np.where(risk == 2, -0.2, np.where(risk == 0, 0.1, 0.0))
+    adjustment = adjustment + np.where(strength == 2, 0.15, np.where(strength == 0, -0.1, 0.0))
+    return np.where(direction != 0, np.clip(confidence + adjustment, 0.1, 0.95), 0.0)
+
+
+# 策略 -> (基础信号函数, 是否AI增强)
+SIGNAL_GENERATORS: Dict[str, Tuple[Callable, bool]] = {
+    'ma_cross': (ma_cross_signals, False),
+    'momentum_reversal': (momentum_reversal_signals, False),
+    'ai_enhanced_ma': (ma_cross_signals, True),
+    'ai_enhanced_momentum': (momentum_reversal_signals, True)
+}
+
+
+def signal_series(strategy_id: str, prices, volumes=None,
+                  params: Optional[Dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """整段历史的信号方向（1买入 -1卖出 0观望）和置信度
+
+    K线表没有成交量时 volumes 传 None，成交量比率恒为1。
+    """
+    if strategy_id not in SIGNAL_GENERATORS:
+        raise ValueError(f"未知策略: {strategy_id}")
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.ones(len(prices)) if volumes is None else np.asarray(volumes, dtype=np.float64)
+    ind = Indicators(SimpleNamespace(prices=prices, volumes=volumes))
+
+    generator, ai_enhanced = SIGNAL_GENERATORS[strategy_id]
+    direction, confidence = generator(ind, params)
+    if ai_enhanced:
+        confidence = ai_adjusted_confidence(ind, direction, confidence)
+    return direction, confidence
+
+
+def positions_from_signals(direction: np.ndarray, confidence: np.ndarray, min_confidence: float = 0.0,
+                           allow_short: bool = False, max_hold: Optional[int] = None) -> np.ndarray:
+    """信号 -> 每根K线收盘后的持仓（1多 -1空 0空仓）
+
+    买入信号开多（或由空翻多），卖出信号平多（allow_short时翻空），
+    置信度低于 min_confidence 的信号忽略，max_hold 为最长持仓K线数。
+    """
+    n = len(direction)
+    index = np.arange(n)
+    active = (direction != 0) & (confidence >= min_confidence)
+    last_buy = np.maximum.accumulate(np.where(active & (direction > 0), index, -1))
+    last_sell = np.maximum.accumulate(np.where(active & (direction < 0), index, -1))
+
+    long = last_buy > last_sell
+    short = (last_sell > last_buy) if allow_short else np.zeros(n, dtype=bool)
+    if max_hold:
+        long &= index - last_buy < max_hold
+        short &= index - last_sell < max_hold
+    return long.astype(np.float64) - short
+
+
+def simulate(prices, positions: np.ndarray, fee: float = FEE_RATE, timeframe: str = '1m',
+             initial_capital: float = 10000.0) -> Dict:
+    """按收盘价成交模拟资金曲线并统计指标"""
+    prices = np.asarray(prices, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.float64)
+    n = len(prices)
+    if n < 2:
+        raise ValueError("K线数量不足")
+
+    gross = positions[:-1] * (prices[1:] / prices[:-1] - 1)
+    turnover = np.abs(np.diff(positions, prepend=0.0))
+    bar_returns = np.concatenate(([0.0], gross))
+    net = (1 + bar_returns) * (1 - fee * turnover) - 1
+    equity = initial_capital * np.cumprod(1 + net)
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    # 手续费按成交时（当根K线收益计入后）的资金计算
+    fees = fee * turnover * np.concatenate(([initial_capital], equity[:-1])) * (1 + bar_returns)
+
+    # 持仓不变的连续K线为一段，非空仓段为一笔交易；开平仓手续费计入对应交易
+    change = np.concatenate(([True], positions[1:] != positions[:-1]))
+    segment = np.cumsum(change) - 1
+    segments = segment[-1] + 1
+    trade_log = np.bincount(segment[:-1], weights=np.log1p(gross), minlength=segments)
+    entries = change & (positions != 0)
+    trade_log += np.bincount(segment[entries], weights=np.log1p(-fee * np.abs(positions[entries])), minlength=segments)
+    exits = np.flatnonzero(change[1:] & (positions[:-1] != 0)) + 1
+    trade_log += np.bincount(segment[exits - 1], weights=np.log1p(-fee * np.abs(positions[exits - 1])), minlength=segments)
+    trade_returns = np.expm1(trade_log[positions[change] != 0])
+
+    period_returns = net[1:]
+    std = period_returns.std()
+    periods_per_year = SECONDS_PER_YEAR / timeframe_seconds(timeframe)
+    sharpe = float(period_returns.mean() / std * math.sqrt(periods_per_year)) if std > 0 else 0.0
+
+    return {
+        'bars': n,
+        'trades': int(len(trade_returns)),
+        'win_rate': round(float((trade_returns > 0).mean()), 4) if len(trade_returns) else None,
+        'total_return': round(float(equity[-1] / initial_capital - 1), 6),
+        'pnl': round(float(equity[-1] - initial_capital), 2),
+        'final_equity': round(float(equity[-1]), 2),
+        'fees_paid': round(float(fees.sum()), 2),
+        'max_drawdown': round(float(drawdown.max()), 6),
+        'sharpe': round(sharpe, 4),
+        'exposure': round(float(np.abs(positions).mean()), 4)
+    }
+
+
+def run_backtest(strategy_id: str, prices, volumes=None, params: Optional[Dict] = None,
+                 timeframe: str = '1m', fee: float = FEE_RATE, min_confidence: float = 0.0,
+                 allow_short: bool = False, max_hold: Optional[int] = None,
+                 initial_capital: float = 10000.0) -> Dict:
+    """对一段收盘价序列回测策略"""
+    direction, confidence = signal_series(strategy_id, prices, volumes, params)
+    positions = positions_from_signals(direction, confidence, min_confidence, allow_short, max_hold)
+    result = simulate(prices, positions, fee, timeframe, initial_capital)
+    result.update({
+        'strategy': strategy_id,
+        'timeframe': timeframe,
+        'signals': int(np.count_nonzero(direction))
+    })
+    return result
@@ -0,0 +1,105 @@
+"""
+异步批量写入 - 把审计类记录移出请求路径
+
+请求处理中只把记录放入内存队列，后台任务按批量或时间间隔
+一次性写入数据库，避免每个请求单独提交一次事务。
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from database import AsyncSessionLocal
+
+
+class BatchWriter:
+    """按批写入单张表的后台写入器"""
+
+    def __init__(self, model, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_queue_size: int = 10000):
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.written = 0
+        self._task: Optional[asyncio.Task] = None
+        self._writing: Optional[asyncio.Future] = None
+
+    def submit(self, record: Dict):
+        """提交一条记录（不阻塞请求）"""
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning(f"{self.model.__tablename__} 写入队列已满，丢弃记录")
+
+    def start(self):
+        """启动后台写入任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务并写入剩余记录"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writing is not None and not self._writing.done():
+            # 等待进行中的批次写完
+            await self._writing
+        await self.flush()
+
+    async def flush(self):
+        """立即写入队列中的所有记录"""
+        while not self.queue.empty():
+            batch = self._drain(self.batch_size)
+            await self._write(batch)
+
+    async def _run(self):
+        while True:
+            try:
+                # 等待第一条记录，再在间隔内尽量凑满一批
+                first = await self.queue.get()
+                try:
+                    await asyncio.sleep(self.flush_interval)
+                except asyncio.CancelledError:
+                    # 停止时把已取出的记录放回队列，由stop()中的flush写入
+                    self._requeue(first)
+                    raise
+                batch = [first] + self._drain(self.batch_size - 1)
+                # 停止时不打断进行中的写入
+                self._writing = asyncio.ensure_future(self._write(batch))
+                await asyncio.shield(self._writing)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"{self.model.__tablename__} 批量写入任务异常: {e}")
+
+    def _requeue(self, record: Dict):
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _drain(self, limit: int) -> List[Dict]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: List[Dict]):
+        if not batch:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(self.model), batch)
+                await db.commit()
+            self.written += len(batch)
+        except Exception as e:
+            logging.error(f"{self.model.__tablename__} 批量写入失败({len(batch)}条): {e}")
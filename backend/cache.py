@@ -0,0 +1,183 @@
+"""
+异步缓存 - 基于连接池的异步Redis客户端
+
+所有Redis访问都通过异步客户端完成，不阻塞事件循环；多键读取通过
+pipeline在一次网络往返内完成。Redis不可用时透明退化为进程内TTL缓存，
+并在一段时间后重新尝试Redis。
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import redis.asyncio as aioredis
+
+
+class LocalTTLCache:
+    """进程内TTL缓存（Redis不可用时的备用存储）"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data: Dict[str, Tuple[Optional[float], str]] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        if len(self._data) >= self.max_size and key not in self._data:
+            self._evict()
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def _evict(self):
+        now = time.monotonic()
+        for key, (expires_at, _) in list(self._data.items()):
+            if expires_at is not None and expires_at < now:
+                del self._data[key]
+        if len(self._data) >= self.max_size:
+            # 仍然已满时淘汰最早写入的一半
+            for key in list(self._data)[:self.max_size // 2]:
+                del self._data[key]
+
+
+class AsyncCache:
+    """异步Redis缓存，带进程内备用缓存"""
+
+    def __init__(self, redis_url: str, max_connections: int = 50, retry_interval: float = 30.0):
+        self.pool = aioredis.ConnectionPool.from_url(
+            redis_url,
+            decode_responses=True,
+            max_connections=max_connections,
+            socket_connect_timeout=1,
+            socket_timeout=2
+        )
+        self.redis = aioredis.Redis(connection_pool=self.pool)
+        self.local = LocalTTLCache()
+        self.retry_interval = retry_interval
+        self._redis_down_until = 0.0
+
+    @property
+    def redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_down(self, error: Exception):
+        logging.warning(f"Redis不可用，使用进程内缓存 {self.retry_interval:.0f}s: {error}")
+        self._redis_down_until = time.monotonic() + self.retry_interval
+
+    async def get(self, key: str) -> Optional[str]:
+        if self.redis_available:
+            try:
+                return await self.redis.get(key)
+            except aioredis.RedisError as e:
+                self._mark_down(e)
+        return self.local.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        if self.redis_available:
+            try:
+                await self.redis.set(key, value, px=int(ttl * 1000) if ttl else None)
+                return
+            except aioredis.RedisError as e:
+                self._mark_down(e)
+        self.local.set(key, value, ttl)
+
+    async def set_nx(self, key: str, value: str, ttl: float) -> bool:
+        """键不存在时写入并返回True（多worker间的租约）；Redis不可用时只在本进程内互斥"""
+        if self.redis_available:
+            try:
+                return bool(await self.redis.set(key, value, px=int(ttl * 1000), nx=True))
+            except aioredis.RedisError as e:
+                self._mark_down(e)
+        if self.local.get(key) is not None:
+            return False
+        self.local.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self.local.delete(key)
+        if self.redis_available:
+            try:
+                await self.redis.delete(key)
+            except aioredis.RedisError as e:
+                self._mark_down(e)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """一次pipeline往返读取多个键"""
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        if self.redis_available:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.get(key)
+                    values = await pipe.execute()
+                return dict(zip(keys, values))
+            except aioredis.RedisError as e:
+                self._mark_down(e)
+
+        return {key: self.local.get(key) for key in keys}
+
+    async def set_many(self, mapping: Dict[str, str], ttl: Optional[float] = None):
+        """一次pipeline往返写入多个键"""
+        if not mapping:
+            return
+
+        if self.redis_available:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for key, value in mapping.items():
+                        pipe.set(key, value, px=int(ttl * 1000) if ttl else None)
+                    await pipe.execute()
+                return
+            except aioredis.RedisError as e:
+                self._mark_down(e)
+
+        for key, value in mapping.items():
+            self.local.set(key, value, ttl)
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        value = await self.get(key)
+        return json.loads(value) if value else None
+
+    async def get_many_json(self, keys: Iterable[str]) -> Dict[str, Optional[Any]]:
+        values = await self.get_many(keys)
+        return {key: json.loads(value) if value else None for key, value in values.items()}
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[float] = None):
+        await self.set(key, json.dumps(value), ttl)
+
+    async def ping(self) -> bool:
+        """检查Redis连接（不受退化状态影响）"""
+        try:
+            await self.redis.ping()
+            self._redis_down_until = 0.0
+            return True
+        except aioredis.RedisError as e:
+            self._mark_down(e)
+            raise
+
+    async def close(self):
+        await self.redis.aclose()
+        await self.pool.disconnect()
+
+
+def create_cache() -> AsyncCache:
+    """根据环境变量创建缓存"""
+    return AsyncCache(
+        os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    )
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -20,3 +21,36 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
+
+def to_async_url(url: str) -> str:
+    """把同步数据库URL转换为异步驱动URL（SQLite用aiosqlite，PostgreSQL用asyncpg）"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+def create_async_db_engine(url: str):
+    """创建异步数据库引擎，连接池参数可通过环境变量调整"""
+    async_url = to_async_url(url)
+    if async_url.startswith("sqlite"):
+        # SQLite为本地文件，连接开销很小，不需要连接池调优
+        return create_async_engine(async_url)
+
+    return create_async_engine(
+        async_url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=True
+    )
+
+# 异步数据库（供FastAPI异步处理函数使用，不阻塞事件循环）
+async_engine = create_async_db_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as session:
+        yield session
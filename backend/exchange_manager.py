@@ -38,8 +38,10 @@ class MarketData:
         }
 
 class ExchangeDataManager:
-    def __init__(self):
+    def __init__(self, indicator_engine=None):
         self.market_data: Dict[str, Dict[str, MarketData]] = {}
+        # 可选的增量指标引擎，每次行情更新后送入各交易对的聚合价格
+        self.indicator_engine = indicator_engine
         self.websocket_connections = {}
         self.symbols = ['BTCUSDT', 'ETHUSDT']
         self.connection_status = {}  # 连接状态跟踪
@@ -243,6 +245,8 @@ class ExchangeDataManager:
                         
                         # 更新基础价格（模拟价格波动）
                         base_prices[symbol] = current_price
+
+                    self.update_indicators(symbol)
                 
                 await asyncio.sleep(2)  # 每2秒更新一次
                 
@@ -250,6 +254,14 @@ class ExchangeDataManager:
                 logging.error(f"Simulate market data error: {e}")
                 await asyncio.sleep(5)
     
+    def update_indicators(self, symbol: str):
+        """把交易对的聚合行情送入增量指标引擎"""
+        if self.indicator_engine is None:
+            return
+        aggregated = self.get_aggregated_data(symbol)
+        if aggregated:
+            self.indicator_engine.update(symbol, time.time(), aggregated['avg_price'])
+
     def get_latest_market_data(self) -> Dict:
         """获取最新市场数据"""
         result = {}
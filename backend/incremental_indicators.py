@@ -0,0 +1,260 @@
+"""
+增量技术指标 - 每根新K线O(1)更新的有状态指标
+
+IndicatorEngine 为每个 (交易对, 时间框架) 把行情更新聚合成K线，K线收盘时把收盘价
+推给该K线周期的 IncrementalIndicators。snapshot() 返回与 AIStrategyService 指标字典同名的
+最新值（序列指标只保留最近两根，足够判断交叉），策略可直接据此出信号而无需回看历史。
+指标只基于已收盘的K线。行情源只提供24小时滚动成交量，得不到每根K线的成交量，
+成交量比率与K线表回测一样按1处理。
+"""
+
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from prediction_cache import bar_bounds
+from price_history import snapshot_price
+
+# 默认维护的时间框架和均线周期
+DEFAULT_TIMEFRAMES = ("1m", "5m", "15m", "1h")
+DEFAULT_MA_PERIODS = (5, 10, 20, 50)
+
+
+class SMA:
+    """简单移动平均（滑动窗口 + 累计和）"""
+
+    __slots__ = ("period", "window", "total", "value")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: deque = deque()
+        self.total = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        if len(self.window) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+
+class EMA:
+    """指数移动平均，第一个值作为初始值（与批量实现一致）"""
+
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, period: int):
+        self.alpha = 2 / (period + 1)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class RSI:
+    """Wilder平滑RSI：前period个涨跌幅取简单平均，之后按 (avg*(n-1)+x)/n 平滑"""
+
+    __slots__ = ("period", "previous", "count", "avg_gain", "avg_loss", "value")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous: Optional[float] = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        if self.previous is None:
+            self.previous = x
+            return None
+        delta = x - self.previous
+        self.previous = x
+        gain = max(delta, 0.0)
+        loss = max(-delta, 0.0)
+
+        if self.count < self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            self.count += 1
+            if self.count < self.period:
+                return None
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        self.value = 100 - 100 / (1 + self.avg_gain / (self.avg_loss + 1e-10))
+        return self.value
+
+
+class MACD:
+    """MACD = EMA(fast) - EMA(slow)，信号线为MACD的EMA"""
+
+    __slots__ = ("fast", "slow", "signal_ema", "macd", "signal", "histogram")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal_ema = EMA(signal)
+        self.macd: Optional[float] = None
+        self.signal: Optional[float] = None
+        self.histogram: Optional[float] = None
+
+    def update(self, x: float):
+        self.macd = self.fast.update(x) - self.slow.update(x)
+        self.signal = self.signal_ema.update(self.macd)
+        self.histogram = self.macd - self.signal
+
+
+class Bollinger:
+    """布林带，滑动窗口的均值和平方偏差和用Welford方式增减，避免大数相减"""
+
+    __slots__ = ("period", "std_dev", "window", "mean", "m2", "upper", "middle", "lower")
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.period = period
+        self.std_dev = std_dev
+        self.window: deque = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.upper: Optional[float] = None
+        self.middle: Optional[float] = None
+        self.lower: Optional[float] = None
+
+    def update(self, x: float):
+        self.window.append(x)
+        if len(self.window) > self.period:
+            y = self.window.popleft()
+            previous_mean = self.mean
+            self.mean += (x - y) / self.period
+            self.m2 += (x - y) * (x - self.mean + y - previous_mean)
+        else:
+            delta = x - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (x - self.mean)
+
+        if len(self.window) == self.period:
+            std = math.sqrt(max(self.m2 / self.period, 0.0))
+            self.middle = self.mean
+            self.upper = self.mean + std * self.std_dev
+            self.lower = self.mean - std * self.std_dev
+
+
+class IncrementalIndicators:
+    """单个 (交易对, 时间框架) 的全部增量指标"""
+
+    def __init__(self, ma_periods: Iterable[int] = DEFAULT_MA_PERIODS):
+        self.mas = {period: SMA(period) for period in ma_periods}
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.bollinger = Bollinger(20, 2)
+        self.bars = 0
+        self.close: Optional[float] = None
+        self.previous_close: Optional[float] = None
+        # 序列指标最近两根K线的值
+        self._recent: Dict[str, deque] = {}
+
+    def update(self, close: float):
+        """推入一根已收盘K线"""
+        self.previous_close, self.close = self.close, close
+        self.bars += 1
+        for period, sma in self.mas.items():
+            self._remember(f"ma{period}", sma.update(close))
+        self._remember("rsi", self.rsi.update(close))
+        self.macd.update(close)
+        self._remember("macd", self.macd.macd)
+        self._remember("macd_signal", self.macd.signal)
+        self._remember("macd_histogram", self.macd.histogram)
+        self.bollinger.update(close)
+        self._remember("bb_upper", self.bollinger.upper)
+        self._remember("bb_middle", self.bollinger.middle)
+        self._remember("bb_lower", self.bollinger.lower)
+
+    def _remember(self, name: str, value: Optional[float]):
+        if value is not None:
+            self._recent.setdefault(name, deque(maxlen=2)).append(value)
+
+    def _series(self, name: str) -> np.ndarray:
+        return np.array(self._recent.get(name, ()), dtype=np.float64)
+
+    def snapshot(self) -> Dict:
+        """当前状态，键与 AIStrategyService 的指标一致"""
+        if self.close is None:
+            return {}
+        snapshot = {f"ma{period}": self._series(f"ma{period}") for period in self.mas}
+        snapshot.update({
+            "rsi": self._series("rsi"),
+            "bollinger_bands": {
+                "upper": self._series("bb_upper"),
+                "middle": self._series("bb_middle"),
+                "lower": self._series("bb_lower")
+            },
+            "macd": {
+                "macd": self._series("macd"),
+                "signal": self._series("macd_signal"),
+                "histogram": self._series("macd_histogram")
+            },
+            "volume_ratio": 1.0,
+            "current_price": self.close,
+            "price_change": (
+                (self.close - self.previous_close) / self.previous_close * 100 if self.previous_close else 0
+            ),
+            "bars": self.bars
+        })
+        return snapshot
+
+
+class IndicatorEngine:
+    """按 (交易对, 时间框架) 聚合K线并维护增量指标"""
+
+    def __init__(self, timeframes: Iterable[str] = DEFAULT_TIMEFRAMES,
+                 ma_periods: Iterable[int] = DEFAULT_MA_PERIODS):
+        self.timeframes = tuple(timeframes)
+        self.ma_periods = tuple(ma_periods)
+        self._states: Dict[Tuple[str, str], IncrementalIndicators] = {}
+        # (交易对, 时间框架) -> (当前K线开盘时间, 最新价格)
+        self._bars: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    def update(self, symbol: str, timestamp: float, price: float):
+        """记录一次行情更新，K线切换时把上一根K线推给指标"""
+        if not price or price <= 0:
+            return
+        for timeframe in self.timeframes:
+            key = (symbol, timeframe)
+            bar_open = bar_bounds(timeframe, timestamp)[0]
+            current = self._bars.get(key)
+            if current is not None and bar_open < current[0]:
+                # 乱序的旧数据直接丢弃
+                continue
+            if current is not None and bar_open > current[0]:
+                self._state(key).update(current[1])
+            self._bars[key] = (bar_open, price)
+
+    def update_from_market_data(self, market_data: Dict[str, Dict[str, Dict]]):
+        """用行情快照（交易对 -> 交易所 -> 行情）更新，价格取各交易所均价"""
+        now = time.time()
+        for symbol, exchanges in market_data.items():
+            point = snapshot_price(exchanges, now)
+            if point is not None:
+                self.update(symbol, *point)
+
+    def _state(self, key: Tuple[str, str]) -> IncrementalIndicators:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = IncrementalIndicators(self.ma_periods)
+        return state
+
+    def get(self, symbol: str, timeframe: str) -> Optional[IncrementalIndicators]:
+        return self._states.get((symbol, timeframe))
+
+    def snapshot(self, symbol: str, timeframe: str) -> Dict:
+        """最新指标快照，尚无已收盘K线时返回空字典"""
+        state = self._states.get((symbol, timeframe))
+        return state.snapshot() if state else {}
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+行情采集进程 - 多worker部署时单独运行
+
+维护唯一一组交易所连接，把行情发布到Redis pub/sub，
+同时记录分钟K线并回填到期预测的结果：
+    MARKET_BROKER=redis INGEST_MODE=external uvicorn main:app --workers 4
+    MARKET_BROKER=redis python ingest_worker.py
+"""
+
+import asyncio
+import logging
+import os
+
+from exchange_manager import ExchangeDataManager
+from cache import create_cache
+from market_broker import create_market_broker, publish_market_data
+from batch_writer import BatchWriter
+from price_history import KlineRecorder
+from models import Kline
+from prediction_resolver import PredictionResolver
+
+# 加载环境变量
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv是可选的
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+
+    exchange_manager = ExchangeDataManager()
+    cache = create_cache()
+    broker = create_market_broker()
+    interval = float(os.getenv("MARKET_PUBLISH_INTERVAL", "1"))
+    kline_writer = BatchWriter(Kline)
+    resolver = PredictionResolver()
+
+    await exchange_manager.start_all_connections()
+    kline_writer.start()
+    resolver.start()
+    logging.info("行情采集进程已启动")
+
+    try:
+        await publish_market_data(exchange_manager, broker, interval, cache=cache,
+                                  kline_recorder=KlineRecorder(kline_writer))
+    finally:
+        await resolver.stop()
+        await kline_writer.stop()
+        await broker.close()
+        await cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
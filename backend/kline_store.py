@@ -0,0 +1,54 @@
+"""
+K线存储 - 读取采集端记录的分钟K线
+
+应用启动时用最近的K线预热价格历史，离线训练脚本读取全部K线。
+写入由 price_history.KlineRecorder 经批量写入器完成。
+"""
+
+import logging
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import Kline
+
+
+async def load_recent_klines(minutes: int) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """读取最近若干分钟的K线，按交易对返回（开盘时间, 收盘价）数组"""
+    since = int(time.time()) - minutes * 60
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Kline.symbol, Kline.open_time, Kline.close)
+            .where(Kline.interval == "1m", Kline.open_time >= since)
+            .order_by(Kline.symbol, Kline.open_time)
+        )
+        rows: List = result.all()
+
+    series: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if not rows:
+        return series
+
+    symbols = np.array([row[0] for row in rows])
+    times = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    closes = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    # 行已按交易对排序，按交易对切分
+    boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+    for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(rows)]):
+        series[str(symbols[start])] = (times[start:end], closes[start:end])
+    logging.info(f"已加载 {len(rows)} 条K线用于预热价格历史")
+    return series
+
+
+def load_klines_sync(session, symbol: str, since: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """同步读取单个交易对的全部分钟K线（离线训练脚本使用）"""
+    rows = session.execute(
+        select(Kline.open_time, Kline.close)
+        .where(Kline.symbol == symbol, Kline.interval == "1m", Kline.open_time >= since)
+        .order_by(Kline.open_time)
+    ).all()
+    times = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    closes = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+    return times, closes
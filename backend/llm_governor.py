@@ -0,0 +1,184 @@
+"""
+LLM并发管控 - 按会员等级排队的DEEPSEEK调用准入
+
+全局限制同时进行的LLM调用数，超出的请求按会员等级优先级排队
+（premium > pro > basic > trial > 后台预热，同级先到先得）。
+队列满时淘汰优先级最低的等待者，排队超时的请求同样被拒绝，
+被拒绝的调用方抛出 LLMOverloaded，由预测服务降级为技术分析结果。
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from quota_service import membership_value
+
+# 会员等级优先级，数值越小越先获得LLM调用
+TIER_PRIORITY = {
+    "premium": 0,
+    "pro": 1,
+    "basic": 2,
+    "trial": 3,
+    "warm": 4
+}
+
+# 各等级最长排队时间（秒），超过后降级
+TIER_MAX_WAIT = {
+    "premium": 10.0,
+    "pro": 6.0,
+    "basic": 3.0,
+    "trial": 1.5,
+    # 预热没有用户在等待，只在LLM空闲时执行，可以排队更久
+    "warm": 30.0
+}
+
+# 后台预热任务使用的等级，优先级最低
+WARM_TIER = "warm"
+
+# 未知等级按最低的会员等级处理
+_LOWEST_TIER = "trial"
+
+
+class LLMOverloaded(Exception):
+    """LLM调用被拒绝（队列已满或排队超时）"""
+
+
+class LLMGovernor:
+    """带优先级队列的LLM并发上限"""
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 64,
+                 max_wait: Optional[Dict[str, float]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = dict(TIER_MAX_WAIT)
+        if max_wait:
+            self.max_wait.update(max_wait)
+
+        self.active = 0
+        # 堆元素: (优先级, 序号, future, 等级)；被移除的等待者通过future状态惰性跳过
+        self._waiters: List = []
+        self._seq = itertools.count()
+
+        # 指标
+        self._stats = {
+            tier: {"admitted": 0, "shed": 0, "wait_times": deque(maxlen=500)}
+            for tier in TIER_PRIORITY
+        }
+
+    def _tier(self, membership_level) -> str:
+        tier = membership_value(membership_level) if membership_level is not None else _LOWEST_TIER
+        return tier if tier in TIER_PRIORITY else _LOWEST_TIER
+
+    def priority(self, membership_level) -> int:
+        """会员等级对应的优先级（数值越小越高）"""
+        return TIER_PRIORITY[self._tier(membership_level)]
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for entry in self._waiters if not entry[2].done())
+
+    @asynccontextmanager
+    async def slot(self, membership_level=None):
+        """获取一个LLM调用名额，退出时释放"""
+        await self.acquire(membership_level)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, membership_level=None):
+        """排队获取调用名额，被拒绝时抛出 LLMOverloaded"""
+        tier = self._tier(membership_level)
+        priority = TIER_PRIORITY[tier]
+        queued_at = time.perf_counter()
+
+        if self.active < self.max_concurrency and self.queued == 0:
+            self.active += 1
+            self._admit(tier, 0.0)
+            return
+
+        if self.queued >= self.max_queue:
+            # 队列已满：新请求优先级更高时淘汰最低优先级的等待者，否则拒绝新请求
+            pending = [entry for entry in self._waiters if not entry[2].done()]
+            worst = max(pending, key=lambda entry: (entry[0], entry[1]))
+            if worst[0] <= priority:
+                self._shed(tier)
+                raise LLMOverloaded("LLM队列已满")
+            worst[2].set_exception(LLMOverloaded("被更高优先级请求挤出LLM队列"))
+            self._shed(worst[3])
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future, tier))
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait[tier])
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # 超时的同时恰好获得名额
+                self._admit(tier, time.perf_counter() - queued_at)
+                return
+            future.cancel()
+            self._shed(tier)
+            raise LLMOverloaded(f"LLM排队超时({self.max_wait[tier]}s)")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # 已分配的名额归还给下一个等待者
+                self.release()
+            else:
+                future.cancel()
+            raise
+
+        self._admit(tier, time.perf_counter() - queued_at)
+
+    def release(self):
+        """释放名额并按优先级唤醒等待者"""
+        self.active -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.active < self.max_concurrency and self._waiters:
+            _, _, future, _ = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(None)
+
+    def _admit(self, tier: str, wait_time: float):
+        self._stats[tier]["admitted"] += 1
+        self._stats[tier]["wait_times"].append(wait_time)
+
+    def _shed(self, tier: str):
+        self._stats[tier]["shed"] += 1
+
+    def get_metrics(self) -> Dict:
+        """获取并发、排队和各等级的排队耗时指标"""
+        tiers = {}
+        for tier, stats in self._stats.items():
+            waits = sorted(stats["wait_times"])
+            tiers[tier] = {
+                "admitted": stats["admitted"],
+                "shed": stats["shed"],
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "tiers": tiers
+        }
+
+
+def create_llm_governor() -> LLMGovernor:
+    """根据环境变量创建LLM并发管控器"""
+    return LLMGovernor(
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        max_queue=int(os.getenv("LLM_MAX_QUEUE", "64"))
+    )
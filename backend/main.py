@@ -1,22 +1,42 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 import uvicorn
 import asyncio
 import json
 import logging
 from typing import List, Dict, Optional
-import redis
 from datetime import datetime, timedelta
 import os
+import time
+from dataclasses import asdict
 
-from database import engine, SessionLocal, Base
-from models import User, Order, PaymentQRCode, UsageRecord
+import numpy as np
+
+from sqlalchemy import select, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import engine, async_engine, AsyncSessionLocal, get_async_db, Base
+from models import User, Order, PaymentQRCode, UsageRecord, Kline, PredictionResult
 from auth import get_current_user, create_access_token, verify_password, get_password_hash
+from user_cache import UserSnapshot, user_cache, create_user_cache_broadcaster
 from exchange_manager import ExchangeDataManager
+from cache import create_cache
+from market_broker import create_market_broker, publish_market_data, MarketSnapshot
 from prediction_service import PredictionService
+from ai_strategy_service import AIStrategyService, MarketData
+from prediction_cache import PredictionCache
+from price_history import PriceHistory, KlineRecorder
+from incremental_indicators import IndicatorEngine
+from kline_store import load_recent_klines
+from prediction_outcomes import build_prediction_records
+from prediction_resolver import PredictionResolver, load_accuracy
+from prediction_warmer import PopularityTracker, create_prediction_warmer
 from payment_service import PaymentService
+from quota_service import QuotaService
+from batch_writer import BatchWriter
+from password_hasher import create_password_hasher
 from rate_limiter import RateLimitMiddleware, check_rate_limit
 from schemas import (
     UserRegister, UserLogin, PredictionRequest, OrderCreate,
@@ -50,13 +70,48 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
-# Redis连接
-redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+# 异步Redis连接池（Redis不可用时自动退化为进程内缓存）
+app_cache = create_cache()
+
+# 行情采集模式：embedded 由本进程连接交易所；external 由 ingest_worker.py 单独采集
+INGEST_MODE = os.getenv("INGEST_MODE", "embedded").lower()
+
+SUPPORTED_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT', 'DOGEUSDT', 'DOTUSDT', 'LINKUSDT', 'MATICUSDT']
 
 # 全局服务实例
-exchange_manager = ExchangeDataManager()
-prediction_service = PredictionService()
+# 各交易对、时间框架的增量技术指标：embedded 模式由交易所数据管理器更新，external 模式由行情订阅更新
+indicator_engine = IndicatorEngine()
+exchange_manager = ExchangeDataManager(indicator_engine=indicator_engine) if INGEST_MODE == "embedded" else None
+market_broker = create_market_broker()
+market_snapshot = MarketSnapshot()
+price_history = PriceHistory()
+prediction_service = PredictionService(prediction_cache=PredictionCache(app_cache), price_history=price_history)
 payment_service = PaymentService()
+strategy_service = AIStrategyService()
+# 统计热门预测，K线收盘后提前计算并写入预测缓存
+prediction_popularity = PopularityTracker()
+prediction_warmer = create_prediction_warmer(prediction_service, market_snapshot, prediction_popularity,
+                                             lease_store=app_cache)
+
+async def load_daily_usage(user_id: int, since: datetime) -> int:
+    """统计用户指定时间以来的使用次数（仅在配额计数器初始化时调用）"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(func.count(UsageRecord.id)).where(
+                UsageRecord.user_id == user_id,
+                UsageRecord.timestamp >= since
+            )
+        )
+        return result.scalar_one()
+
+quota_service = QuotaService(usage_loader=load_daily_usage, redis_client=app_cache.redis)
+usage_audit = BatchWriter(UsageRecord)
+kline_writer = BatchWriter(Kline)
+prediction_audit = BatchWriter(PredictionResult)
+prediction_resolver = PredictionResolver()
+password_hasher = create_password_hasher(get_password_hash, verify_password)
+# 多worker部署时通过Redis广播用户缓存失效（USER_CACHE_PUBSUB=true）
+user_cache_broadcaster = create_user_cache_broadcaster(user_cache)
 
 # 健康检查端点
 @app.get("/health")
@@ -64,9 +119,8 @@ async def health_check():
     """健康检查端点"""
     try:
         # 检查数据库连接
-        db = SessionLocal()
-        db.execute("SELECT 1")
-        db.close()
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         logging.error(f"Database health check failed: {e}")
@@ -74,15 +128,24 @@ async def health_check():
 
     # 检查Redis连接
     try:
-        redis_client.ping()
+        await app_cache.ping()
         redis_status = "healthy"
     except Exception as e:
         logging.error(f"Redis health check failed: {e}")
         redis_status = "unhealthy"
 
+    # 检查行情代理
+    try:
+        await market_broker.ping()
+        broker_status = "healthy"
+    except Exception as e:
+        logging.error(f"Market broker health check failed: {e}")
+        broker_status = "unhealthy"
+
     # 检查服务状态
     services_status = {
-        "exchange_manager": "healthy" if exchange_manager else "unhealthy",
+        "market_broker": broker_status,
+        "market_feed": "healthy" if market_snapshot.updated_at else "unhealthy",
         "prediction_service": "healthy" if prediction_service else "unhealthy",
         "payment_service": "healthy" if payment_service else "unhealthy"
     }
@@ -101,6 +164,12 @@ async def health_check():
             "redis": redis_status,
             **services_status
         },
+        "auth_pool": password_hasher.get_metrics(),
+        "prediction_cache": prediction_service.prediction_cache.get_stats(),
+        "prediction_warmer": prediction_warmer.get_stats(),
+        "prediction_audit": {"written": prediction_audit.written, "dropped": prediction_audit.dropped},
+        "llm": prediction_service.get_llm_stats(),
+        "llm_governor": prediction_service.llm_governor.get_metrics(),
         "version": "1.0.0"
     }
 
@@ -143,39 +212,82 @@ async def startup_event():
     """应用启动时初始化"""
     logging.basicConfig(level=logging.INFO)
 
-    # 启动交易所数据管理器
-    asyncio.create_task(exchange_manager.start_all_connections())
+    # 用已记录的分钟K线预热价格历史，重启后技术分析和AI模型无需重新积累数据
+    try:
+        for symbol, (times, closes) in (await load_recent_klines(price_history.capacity)).items():
+            price_history.load(symbol, times, closes)
+    except Exception as e:
+        logging.error(f"预热价格历史失败: {e}")
+
+    if exchange_manager is not None:
+        # 启动交易所数据管理器，并把行情发布到代理（同时记录分钟K线并回填到期预测）
+        kline_writer.start()
+        prediction_resolver.start()
+        asyncio.create_task(exchange_manager.start_all_connections())
+        asyncio.create_task(publish_market_data(exchange_manager, market_broker, cache=app_cache,
+                                                kline_recorder=KlineRecorder(kline_writer)))
 
-    # 启动数据广播任务
+    # 订阅行情并分发给本worker的WebSocket客户端
     asyncio.create_task(broadcast_market_data())
 
+    # 启动使用记录和预测记录的异步批量写入
+    usage_audit.start()
+    prediction_audit.start()
+    if user_cache_broadcaster is not None:
+        user_cache_broadcaster.start()
+
+    # 创建DEEPSEEK长连接客户端
+    await prediction_service.startup()
+
+    # K线收盘后预热热门预测
+    if os.getenv("PREDICTION_WARMER", "true").lower() in ("1", "true", "yes"):
+        prediction_warmer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时释放资源"""
+    await prediction_warmer.stop()
+    if user_cache_broadcaster is not None:
+        await user_cache_broadcaster.stop()
+    await usage_audit.stop()
+    await prediction_audit.stop()
+    await prediction_resolver.stop()
+    await kline_writer.stop()
+    await prediction_service.shutdown()
+    await quota_service.close()
+    await market_broker.close()
+    await app_cache.close()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
 async def broadcast_market_data():
-    """广播市场数据给所有WebSocket客户端"""
+    """订阅行情代理，广播市场数据给本worker的所有WebSocket客户端"""
     while True:
         try:
-            # 获取最新市场数据
-            market_data = exchange_manager.get_latest_market_data()
-            if market_data and manager.active_connections:
-                message = {
-                    "type": "market_update",
-                    "data": market_data,
-                    "timestamp": datetime.now().isoformat()
-                }
-                await manager.broadcast(json.dumps(message))
-
-            await asyncio.sleep(1)  # 每秒广播一次
+            # 先用代理保存的最新快照初始化，避免新worker启动后无数据
+            latest = await market_broker.get_latest()
+            if latest:
+                market_snapshot.update(latest)
+                price_history.update_from_market_data(market_snapshot.get_latest_market_data())
+                if exchange_manager is None:
+                    indicator_engine.update_from_market_data(market_snapshot.get_latest_market_data())
+
+            async for message in market_broker.subscribe():
+                market_snapshot.update(message)
+                # 本地价格历史供技术分析使用
+                latest_market_data = market_snapshot.get_latest_market_data()
+                price_history.update_from_market_data(latest_market_data)
+                if exchange_manager is None:
+                    indicator_engine.update_from_market_data(latest_market_data)
+                if manager.active_connections:
+                    # 消息在采集端已序列化，这里原样转发
+                    await manager.broadcast(message)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logging.error(f"Broadcast error: {e}")
             await asyncio.sleep(5)
 
-# 依赖注入
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # WebSocket端点
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -184,7 +296,7 @@ async def websocket_endpoint(websocket: WebSocket):
         # 发送初始数据
         initial_data = {
             "type": "initial_data",
-            "data": exchange_manager.get_latest_market_data(),
+            "data": market_snapshot.get_latest_market_data(),
             "timestamp": datetime.now().isoformat()
         }
         await websocket.send_text(json.dumps(initial_data))
@@ -206,24 +318,29 @@ async def websocket_endpoint(websocket: WebSocket):
 
 # 用户认证相关API
 @app.post("/api/auth/register", response_model=TokenResponse)
-async def register(user_data: UserRegister, request: Request, db = Depends(get_db)):
+async def register(user_data: UserRegister, request: Request, db: AsyncSession = Depends(get_async_db)):
     """用户注册"""
     # 速率限制检查
     check_rate_limit(request, "auth/register")
 
     try:
         # 检查用户是否已存在
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        existing_user = (await db.execute(
+            select(User.id).where(User.email == user_data.email)
+        )).first()
         if existing_user:
             raise HTTPException(status_code=400, detail="邮箱已被注册")
 
         # 检查用户名是否已存在
-        existing_username = db.query(User).filter(User.username == user_data.username).first()
+        existing_username = (await db.execute(
+            select(User.id).where(User.username == user_data.username)
+        )).first()
         if existing_username:
             raise HTTPException(status_code=400, detail="用户名已被使用")
 
         # 创建新用户
-        hashed_password = get_password_hash(user_data.password)
+        # 在独立线程池中计算bcrypt，避免阻塞事件循环
+        hashed_password = await password_hasher.hash(user_data.password)
         user = User(
             username=user_data.username,
             email=user_data.email,
@@ -234,21 +351,16 @@ async def register(user_data: UserRegister, request: Request, db = Depends(get_d
         )
 
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
         # 生成访问令牌
         access_token = create_access_token(data={"sub": user.email})
 
-        # 创建用户响应对象
-        user_response = UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            phone=user.phone,
-            membership_level=user.membership_level,
-            created_at=user.created_at
-        )
+        # 创建用户响应对象，并预热认证缓存
+        snapshot = UserSnapshot.from_user(user)
+        user_cache.set(snapshot)
+        user_response = UserResponse(**asdict(snapshot))
 
         return TokenResponse(
             access_token=access_token,
@@ -263,28 +375,24 @@ async def register(user_data: UserRegister, request: Request, db = Depends(get_d
         raise HTTPException(status_code=500, detail="注册失败，请稍后重试")
 
 @app.post("/api/auth/login", response_model=TokenResponse)
-async def login(login_data: UserLogin, request: Request, db = Depends(get_db)):
+async def login(login_data: UserLogin, request: Request, db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
     # 速率限制检查
     check_rate_limit(request, "auth/login")
 
     try:
-        user = db.query(User).filter(User.email == login_data.email).first()
+        result = await db.execute(select(User).where(User.email == login_data.email))
+        user = result.scalar_one_or_none()
 
-        if not user or not verify_password(login_data.password, user.password_hash):
+        if not user or not await password_hasher.verify(login_data.password, user.password_hash):
             raise HTTPException(status_code=401, detail="邮箱或密码错误")
 
         access_token = create_access_token(data={"sub": user.email})
 
-        # 创建用户响应对象
-        user_response = UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            phone=user.phone,
-            membership_level=user.membership_level,
-            created_at=user.created_at
-        )
+        # 创建用户响应对象，并预热认证缓存
+        snapshot = UserSnapshot.from_user(user)
+        user_cache.set(snapshot)
+        user_response = UserResponse(**asdict(snapshot))
 
         return TokenResponse(
             access_token=access_token,
@@ -302,16 +410,15 @@ async def login(login_data: UserLogin, request: Request, db = Depends(get_db)):
 @app.get("/api/market/data/{symbol}")
 async def get_market_data(symbol: str):
     """获取指定交易对的市场数据"""
-    data = exchange_manager.get_symbol_data(symbol)
+    data = market_snapshot.get_symbol_data(symbol)
     return {"success": True, "data": data}
 
 @app.get("/api/market/data")
 async def get_all_market_data():
     """获取所有支持交易对的市场数据"""
     all_data = {}
-    supported_symbols = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT', 'ADAUSDT', 'DOGEUSDT', 'DOTUSDT', 'LINKUSDT', 'MATICUSDT']
-    for symbol in supported_symbols:
-        data = exchange_manager.get_symbol_data(symbol)
+    for symbol in SUPPORTED_SYMBOLS:
+        data = market_snapshot.get_symbol_data(symbol)
         if data:
             all_data[symbol] = data
     return {"success": True, "data": all_data}
@@ -319,38 +426,52 @@ async def get_all_market_data():
 @app.get("/api/market/aggregated/{symbol}")
 async def get_aggregated_data(symbol: str):
     """获取聚合市场数据"""
-    key = f"aggregated:{symbol}"
-    data = redis_client.get(key)
+    data = await app_cache.get_json(f"aggregated:{symbol}")
     if data:
-        return {"success": True, "data": json.loads(data)}
+        return {"success": True, "data": data}
     return {"success": False, "message": "数据不可用"}
 
+@app.get("/api/market/aggregated")
+async def get_aggregated_data_batch(symbols: str):
+    """批量获取聚合市场数据（symbols以逗号分隔，一次往返读取）"""
+    symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()][:50]
+    values = await app_cache.get_many_json(f"aggregated:{symbol}" for symbol in symbol_list)
+    data = {
+        symbol: values[f"aggregated:{symbol}"]
+        for symbol in symbol_list
+        if values.get(f"aggregated:{symbol}")
+    }
+    return {"success": bool(data), "data": data}
+
 # 预测相关API
 @app.post("/api/prediction/predict", response_model=PredictionResponse)
 async def make_prediction(
     prediction_data: PredictionRequest,
     request: Request,
-    current_user: User = Depends(get_current_user),
-    db = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user)
 ):
     """进行价格预测"""
     # 速率限制检查
     check_rate_limit(request, "prediction/predict")
 
+    quota = None
     try:
-        # 检查用户配额
-        quota_check = check_user_quota(current_user, db)
-        if not quota_check["allowed"]:
+        # 原子地检查并扣减用户配额
+        quota = await quota_service.consume(current_user.id, current_user.membership_level)
+        if not quota["allowed"]:
             return PredictionResponse(
                 success=False,
                 predictions={},
-                message=quota_check["message"],
-                quota_remaining=quota_check["remaining"]
+                message=quota["message"],
+                quota_remaining=quota["remaining"]
             )
 
+        prediction_popularity.record(prediction_data.symbol, prediction_data.timeframes)
+
         # 获取市场数据
-        market_data = exchange_manager.get_symbol_data(prediction_data.symbol)
+        market_data = market_snapshot.get_symbol_data(prediction_data.symbol)
         if not market_data:
+            await quota_service.refund(current_user.id, current_user.membership_level, quota.get("day"))
             return PredictionResponse(
                 success=False,
                 predictions={},
@@ -361,78 +482,161 @@ async def make_prediction(
         predictions = await prediction_service.predict(
             prediction_data.symbol,
             prediction_data.timeframes,
-            market_data
+            market_data,
+            membership_level=current_user.membership_level
         )
 
-        # 记录使用
-        record_usage(current_user.id, "prediction", db)
-
-        # 获取剩余配额
-        remaining_quota = get_remaining_quota(current_user, db)
+        # 异步记录使用情况和预测结果
+        record_usage(current_user.id, "prediction", quota["remaining"])
+        record_predictions(current_user.id, prediction_data.symbol, predictions, market_data)
 
         return PredictionResponse(
             success=True,
             predictions=predictions,
             message="预测完成",
-            quota_remaining=remaining_quota
+            quota_remaining=get_remaining_quota(quota)
         )
 
     except Exception as e:
         logging.error(f"预测失败: {e}")
+        if quota and quota["allowed"]:
+            await quota_service.refund(current_user.id, current_user.membership_level, quota.get("day"))
         return PredictionResponse(
             success=False,
             predictions={},
             message="预测服务暂时不可用，请稍后重试"
         )
 
-def check_user_quota(user: User, db) -> Dict:
-    """检查用户配额"""
-    quota_limits = {
-        "trial": 50,
-        "basic": 200,
-        "pro": 500,
-        "premium": float('inf')
-    }
+@app.post("/api/prediction/stream")
+async def stream_prediction(
+    prediction_data: PredictionRequest,
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """流式预测（SSE）：先推送初步结果，LLM分析完成后推送最终结果"""
+    # 速率限制检查
+    check_rate_limit(request, "prediction/predict")
 
-    limit = quota_limits.get(user.membership_level, 0)
+    # 原子地检查并扣减用户配额
+    quota = await quota_service.consume(current_user.id, current_user.membership_level)
+    if not quota["allowed"]:
+        raise HTTPException(status_code=429, detail=quota["message"])
 
-    if user.membership_level == "premium":
-        return {
-            "allowed": True,
-            "remaining": float('inf'),
-            "message": "无限制"
-        }
+    prediction_popularity.record(prediction_data.symbol, prediction_data.timeframes)
+    market_data = market_snapshot.get_symbol_data(prediction_data.symbol)
+    if not market_data:
+        await quota_service.refund(current_user.id, current_user.membership_level, quota.get("day"))
+        raise HTTPException(status_code=503, detail="市场数据暂时不可用，请稍后重试")
 
-    # 检查今日使用次数
-    today = datetime.now().date()
-    daily_usage = db.query(UsageRecord).filter(
-        UsageRecord.user_id == user.id,
-        UsageRecord.timestamp >= today
-    ).count()
+    record_usage(current_user.id, "prediction", quota["remaining"])
 
-    remaining = max(0, limit - daily_usage)
-    allowed = daily_usage < limit
+    async def event_stream():
+        yield sse_event("quota", {"quota_remaining": get_remaining_quota(quota)})
+        delivered = False
+        try:
+            async for event in prediction_service.predict_stream(
+                prediction_data.symbol,
+                prediction_data.timeframes,
+                market_data,
+                membership_level=current_user.membership_level
+            ):
+                # 截止时间到达时的部分结果中DEEPSEEK仍是占位结果，不记录
+                if event["event"] == "final" and not event.get("partial"):
+                    record_predictions(current_user.id, prediction_data.symbol,
+                                       {event["timeframe"]: event["prediction"]}, market_data)
+                delivered = delivered or event["event"] == "final"
+                yield sse_event(event.pop("event"), event)
+        except Exception as e:
+            logging.error(f"流式预测失败: {e}")
+            # 配额在开始推送前已扣减，未推送任何最终结果时退还
+            if not delivered:
+                await quota_service.refund(current_user.id, current_user.membership_level, quota.get("day"))
+            yield sse_event("error", {"message": "预测服务暂时不可用，请稍后重试", "quota_refunded": not delivered})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    return {
-        "allowed": allowed,
-        "remaining": remaining,
-        "message": f"今日剩余 {remaining} 次预测" if allowed else "今日预测次数已用完"
-    }
+@app.get("/api/prediction/accuracy")
+async def get_prediction_accuracy(
+    symbol: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """各交易对、时间框架和模型的预测命中率（由回填任务增量维护）"""
+    data = await load_accuracy(symbol.upper() if symbol else None, timeframe)
+    return {"success": True, "data": data}
 
-def get_remaining_quota(user: User, db) -> int:
-    """获取剩余配额"""
-    quota_check = check_user_quota(user, db)
-    return quota_check["remaining"] if isinstance(quota_check["remaining"], int) else 999999
-
-def record_usage(user_id: int, usage_type: str, db):
-    """记录使用情况"""
-    usage = UsageRecord(
-        user_id=user_id,
-        prediction_type=usage_type,
-        timestamp=datetime.now()
-    )
-    db.add(usage)
-    db.commit()
+# 策略相关API
+@app.get("/api/strategy/signals")
+async def get_strategy_signals(
+    symbols: Optional[str] = None,
+    strategies: Optional[str] = None,
+    timeframe: str = "1m",
+    count: int = 200,
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """交易对 × 策略的信号矩阵（symbols/strategies以逗号分隔，默认全部），附各阶段耗时
+
+    每个交易对的指标只计算一次，所有策略共享。增量指标引擎已积累足够K线时直接使用其快照（只含已收盘K线），
+    否则按价格历史计算（最后一根为未收盘K线）；两者都不含成交量，成交量比率按1处理。
+    """
+    symbol_list = [s.strip().upper() for s in symbols.split(",") if s.strip()][:50] if symbols else SUPPORTED_SYMBOLS
+    strategy_list = [s.strip() for s in strategies.split(",") if s.strip()] if strategies else None
+
+    started = time.perf_counter()
+    market_data = {}
+    sources = {}
+    try:
+        for symbol in symbol_list:
+            snapshot = indicator_engine.snapshot(symbol, timeframe) if timeframe in indicator_engine.timeframes else {}
+            if snapshot.get("bars", 0) > max(indicator_engine.ma_periods):
+                market_data[symbol] = snapshot
+                sources[symbol] = "incremental"
+                continue
+            bar_opens, closes = price_history.bars(symbol, timeframe, max(2, min(count, 1000)))
+            if len(closes):
+                sources[symbol] = "history"
+                market_data[symbol] = MarketData(
+                    prices=closes,
+                    volumes=np.ones(len(closes)),
+                    timestamps=[datetime.fromtimestamp(int(t)) for t in bar_opens],
+                    symbol=symbol
+                )
+        load_ms = round((time.perf_counter() - started) * 1000, 3)
+        result = strategy_service.evaluate_all(market_data, strategy_list)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    data = {
+        symbol: {strategy_id: asdict(signal) for strategy_id, signal in row.items()}
+        for symbol, row in result["signals"].items()
+    }
+    return {"success": True, "data": data, "sources": sources, "timing_ms": dict(result["timing_ms"], load=load_ms)}
+
+def sse_event(event: str, data: Dict) -> str:
+    """格式化一条SSE事件"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def get_remaining_quota(quota: Dict) -> int:
+    """获取剩余配额（不限次数时返回999999）"""
+    return quota["remaining"] if isinstance(quota["remaining"], int) else 999999
+
+def record_predictions(user_id: int, symbol: str, predictions: Dict, market_data: Dict):
+    """记录已返回的预测（写入批量队列，到期后由回填任务判定结果）"""
+    for record in build_prediction_records(user_id, symbol, predictions, market_data):
+        prediction_audit.submit(record)
+
+def record_usage(user_id: int, usage_type: str, remaining_quota: Optional[int] = None):
+    """记录使用情况（写入批量队列，不阻塞请求）"""
+    usage_audit.submit({
+        "user_id": user_id,
+        "prediction_type": usage_type,
+        "timestamp": datetime.now(),
+        "remaining_quota": remaining_quota
+    })
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
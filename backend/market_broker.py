@@ -0,0 +1,169 @@
+"""
+行情消息代理 - 拆分行情采集与WebSocket分发
+
+单个采集进程（ExchangeDataManager）把行情快照发布到代理，
+任意数量的API worker订阅后向各自的WebSocket客户端分发。
+多worker部署使用Redis pub/sub，单进程部署使用进程内代理。
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+MARKET_CHANNEL = "market:updates"
+LATEST_SNAPSHOT_KEY = "market:latest"
+
+
+class LocalMarketBroker:
+    """进程内行情代理（单进程部署或未配置Redis时使用）"""
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: List[asyncio.Queue] = []
+        self._latest: Optional[str] = None
+
+    async def publish(self, message: str):
+        """发布一条已序列化的行情消息"""
+        self._latest = message
+        for queue in self._subscribers:
+            if queue.full():
+                # 消费过慢时丢弃最旧的消息，只保留最新行情
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def get_latest(self) -> Optional[str]:
+        """获取最近一次发布的消息"""
+        return self._latest
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """订阅行情消息"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            if queue in self._subscribers:
+                self._subscribers.remove(queue)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self):
+        self._subscribers.clear()
+
+
+class RedisMarketBroker:
+    """基于Redis pub/sub的行情代理（多worker部署）"""
+
+    def __init__(self, redis_url: str, snapshot_ttl: int = 60):
+        self.redis_url = redis_url
+        self.snapshot_ttl = snapshot_ttl
+        # pub/sub长期占用连接且读取无超时，因此不与缓存共享连接池
+        self.redis = aioredis.from_url(redis_url, decode_responses=True)
+
+    async def publish(self, message: str):
+        """发布行情消息，同时保存最新快照供新worker初始化"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(LATEST_SNAPSHOT_KEY, message, ex=self.snapshot_ttl)
+            pipe.publish(MARKET_CHANNEL, message)
+            await pipe.execute()
+
+    async def get_latest(self) -> Optional[str]:
+        return await self.redis.get(LATEST_SNAPSHOT_KEY)
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(MARKET_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message and message.get("type") == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.unsubscribe(MARKET_CHANNEL)
+            await pubsub.aclose()
+
+    async def ping(self) -> bool:
+        return await self.redis.ping()
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_market_broker():
+    """根据环境变量创建行情代理
+
+    MARKET_BROKER=redis 时使用 REDIS_URL 指定的Redis，否则使用进程内代理。
+    """
+    broker_type = os.getenv("MARKET_BROKER", "local").lower()
+    if broker_type == "redis":
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        logging.info(f"行情代理: Redis pub/sub ({redis_url})")
+        return RedisMarketBroker(redis_url)
+
+    logging.info("行情代理: 进程内")
+    return LocalMarketBroker()
+
+
+def build_market_message(market_data: Dict) -> str:
+    """构建行情广播消息（只序列化一次，各worker原样转发）"""
+    return json.dumps({
+        "type": "market_update",
+        "data": market_data,
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+class MarketSnapshot:
+    """worker本地的最新行情快照，接口与ExchangeDataManager的读取方法一致"""
+
+    def __init__(self):
+        self.market_data: Dict[str, Dict[str, Dict]] = {}
+        self.updated_at: Optional[str] = None
+
+    def update(self, message: str):
+        """用代理消息更新快照"""
+        payload = json.loads(message)
+        self.market_data = payload.get("data") or {}
+        self.updated_at = payload.get("timestamp")
+
+    def get_latest_market_data(self) -> Dict:
+        return self.market_data
+
+    def get_symbol_data(self, symbol: str) -> Dict:
+        return self.market_data.get(symbol, {})
+
+
+async def publish_market_data(exchange_manager, broker, interval: float = 1.0, cache=None,
+                              kline_recorder=None):
+    """采集端：定时把ExchangeDataManager的最新行情发布到代理
+
+    提供cache时，同时把各交易对的聚合数据批量写入缓存（aggregated:{symbol}）；
+    提供kline_recorder时，同时记录分钟K线。
+    """
+    while True:
+        try:
+            market_data = exchange_manager.get_latest_market_data()
+            if market_data:
+                await broker.publish(build_market_message(market_data))
+
+                if cache is not None:
+                    await cache.set_many({
+                        f"aggregated:{symbol}": json.dumps(exchange_manager.get_aggregated_data(symbol))
+                        for symbol in market_data
+                    }, ttl=max(interval * 10, 10))
+
+                if kline_recorder is not None:
+                    kline_recorder.update(market_data)
+
+            await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Market publish error: {e}")
+            await asyncio.sleep(5)
@@ -1,10 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 
-Base = declarative_base()
+from database import Base
 
 class MembershipLevel(enum.Enum):
     trial = "trial"
@@ -79,7 +78,7 @@ class Order(Base):
     # 关系
     user = relationship("User", back_populates="orders")
     qrcode = relationship("PaymentQRCode")
-    proof = relationship("PaymentProof")
+    proof = relationship("PaymentProof", foreign_keys=[proof_id])
 
 class PaymentQRCode(Base):
     __tablename__ = "payment_qrcodes"
@@ -108,7 +107,7 @@ class PaymentProof(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关系
-    order = relationship("Order")
+    order = relationship("Order", foreign_keys=[order_id])
     reviewer = relationship("AdminUser")
 
 class UsageRecord(Base):
@@ -165,6 +164,20 @@ class MarketData(Base):
     open_interest = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+class Kline(Base):
+    __tablename__ = "klines"
+    
+    # 采集端按分钟记录的各交易所均价收盘价，用于训练本地AI模型和预热价格历史
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String(20), nullable=False)
+    interval = Column(String(10), nullable=False, default="1m")
+    open_time = Column(Integer, nullable=False)  # Unix秒
+    close = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_klines_symbol_open_time", "symbol", "open_time"),
+    )
+
 class PredictionResult(Base):
     __tablename__ = "prediction_results"
     
@@ -173,10 +186,29 @@ class PredictionResult(Base):
     symbol = Column(String(20), nullable=False)
     timeframe = Column(String(10), nullable=False)
     prediction_time = Column(DateTime, default=datetime.utcnow)
+    model = Column(String(30), default="combined")  # combined, technical_analysis, ai_model, deepseek
     predicted_direction = Column(String(10))  # up, down
     predicted_price = Column(Float)
     confidence = Column(Float)
+    base_price = Column(Float)  # 预测时的各交易所均价
+    target_time = Column(Integer, index=True)  # 预测到期时间（Unix秒）
     actual_price = Column(Float)
-    actual_direction = Column(String(10))
+    actual_direction = Column(String(10))  # up, down, neutral；无行情数据时为unknown
     is_correct = Column(Boolean)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class PredictionAccuracy(Base):
+    __tablename__ = "prediction_accuracy"
+    
+    # 按 (交易对, 时间框架, 模型) 增量维护的命中计数，由结果回填任务更新
+    id = Column(Integer, primary_key=True, index=True)
+    symbol = Column(String(20), nullable=False)
+    timeframe = Column(String(10), nullable=False)
+    model = Column(String(30), nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_prediction_accuracy_key", "symbol", "timeframe", "model", unique=True),
+    )
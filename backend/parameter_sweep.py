@@ -0,0 +1,235 @@
+"""
+策略参数搜索 - 进程池并行的网格/随机搜索与滚动前进（walk-forward）验证
+
+价格（和成交量）数组只写入一次共享内存，工作进程在初始化时以零拷贝方式映射，
+每个任务只传参数。每组参数在整段历史上计算一次信号和持仓（信号只依赖历史数据），
+再按各折的训练/测试区间分别统计；每折用训练区间最优的参数评估紧随其后的测试区间。
+结果按训练区间平均得分排序，保存为JSON。
+"""
+
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backtester import FEE_RATE, positions_from_signals, signal_series, simulate
+
+DEFAULT_SWEEP_DIR = os.getenv("SWEEP_RESULTS_DIR", os.path.join(os.path.dirname(__file__), "sweep_results"))
+
+_MA_SPACE = {'short_period': list(range(3, 21)), 'long_period': list(range(10, 101, 5))}
+_MOMENTUM_SPACE = {'oversold_rsi': list(range(15, 45, 5)), 'oversold_threshold': [-15, -12, -10, -8, -6, -4, -3]}
+
+# 各策略的参数搜索空间
+PARAM_SPACES: Dict[str, Dict[str, List]] = {
+    'ma_cross': _MA_SPACE,
+    'momentum_reversal': _MOMENTUM_SPACE,
+    'ai_enhanced_ma': _MA_SPACE,
+    'ai_enhanced_momentum': _MOMENTUM_SPACE
+}
+
+
+def _valid(params: Dict) -> bool:
+    return params.get('short_period', 0) < params.get('long_period', 1)
+
+
+def grid_params(strategy_id: str) -> List[Dict]:
+    """参数空间的全部组合（均线策略要求短周期小于长周期）"""
+    space = PARAM_SPACES[strategy_id]
+    names = list(space)
+    combos = (dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names)))
+    return [params for params in combos if _valid(params)]
+
+
+def random_params(strategy_id: str, count: int, seed: int = 0) -> List[Dict]:
+    """从网格中不放回随机抽取count组参数"""
+    grid = grid_params(strategy_id)
+    index = np.random.default_rng(seed).choice(len(grid), size=min(count, len(grid)), replace=False)
+    return [grid[i] for i in sorted(index)]
+
+
+def walk_forward_splits(n: int, folds: int = 4, train_multiple: int = 3) -> List[Tuple[int, int, int]]:
+    """滚动前进切分 -> [(训练开始, 训练结束=测试开始, 测试结束)]
+
+    测试区间长度 n // (folds + train_multiple)，训练区间为其 train_multiple 倍，
+    各折依次向后滚动一个测试区间，测试区间互不重叠且都在训练区间之后。
+    """
+    test = n // (folds + train_multiple)
+    if test < 2:
+        raise ValueError("K线数量不足以切分")
+    train = test * train_multiple
+    return [(i * test, i * test + train, i * test + train + test) for i in range(folds)]
+
+
+# 工作进程内的共享数组
+_shared: Dict = {}
+
+
+def _attach(name: str) -> SharedMemory:
+    """在工作进程中映射创建方的共享内存，不登记到resource_tracker（删除由创建方负责）"""
+    try:
+        # Python 3.13+
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # 更早的版本映射时总会登记。POSIX上进程池的子进程（fork/spawn/forkserver）都继承创建方的
+        # resource_tracker，重复登记是幂等的；Windows不跟踪共享内存
+        return SharedMemory(name=name)
+
+
+def _init_worker(name: str, rows: int, length: int):
+    shm = _attach(name)
+    data = np.ndarray((rows, length), dtype=np.float64, buffer=shm.buf)
+    _shared.update(shm=shm, prices=data[0], volumes=data[1] if rows > 1 else None)
+
+
+def _fill(shm: SharedMemory, prices: np.ndarray, volumes):
+    data = np.ndarray((1 if volumes is None else 2, len(prices)), dtype=np.float64, buffer=shm.buf)
+    data[0] = prices
+    if volumes is not None:
+        data[1] = np.asarray(volumes, dtype=np.float64)
+
+
+def _evaluate(task: Tuple) -> Dict:
+    """在共享价格上回测一组参数，返回每折训练/测试区间的统计"""
+    strategy_id, params, splits, options = task
+    end = splits[-1][2]
+    prices = _shared['prices'][:end]
+    volumes = _shared['volumes'][:end] if _shared['volumes'] is not None else None
+
+    direction, confidence = signal_series(strategy_id, prices, volumes, params)
+    positions = positions_from_signals(
+        direction, confidence, options['min_confidence'], options['allow_short'], options['max_hold']
+    )
+    folds = []
+    for start, middle, stop in splits:
+        folds.append({
+            'train': simulate(prices[start:middle], positions[start:middle], options['fee'], options['timeframe']),
+            'test': simulate(prices[middle:stop], positions[middle:stop], options['fee'], options['timeframe'])
+        })
+    return {'params': params, 'folds': folds}
+
+
+def _score(metrics: Dict, objective: str, min_trades: int) -> float:
+    """目标值，交易次数不足或无法计算时为负无穷"""
+    value = metrics.get(objective)
+    if value is None or metrics['trades'] < min_trades:
+        return float('-inf')
+    return float(value)
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    finite = [value for value in values if np.isfinite(value)]
+    return round(float(np.mean(finite)), 6) if len(finite) == len(values) and finite else None
+
+
+def run_sweep(strategy_id: str, prices, volumes=None, search: str = 'grid', samples: int = 50,
+              folds: int = 4, train_multiple: int = 3, objective: str = 'sharpe', min_trades: int = 5,
+              workers: Optional[int] = None, timeframe: str = '1m', fee: float = FEE_RATE,
+              min_confidence: float = 0.0, allow_short: bool = False, max_hold: Optional[int] = None,
+              seed: int = 0) -> Dict:
+    """并行搜索策略参数并做滚动前进验证"""
+    if strategy_id not in PARAM_SPACES:
+        raise ValueError(f"未知策略: {strategy_id}")
+    candidates = grid_params(strategy_id) if search == 'grid' else random_params(strategy_id, samples, seed)
+    prices = np.asarray(prices, dtype=np.float64)
+    splits = walk_forward_splits(len(prices), folds, train_multiple)
+    options = {'fee': fee, 'timeframe': timeframe, 'min_confidence': min_confidence,
+               'allow_short': allow_short, 'max_hold': max_hold}
+    workers = workers or os.cpu_count() or 1
+
+    rows = 1 if volumes is None else 2
+    started = time.perf_counter()
+    shm = SharedMemory(create=True, size=rows * len(prices) * 8)
+    try:
+        _fill(shm, prices, volumes)
+        tasks = [(strategy_id, params, splits, options) for params in candidates]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, rows, len(prices))) as pool:
+            evaluations = list(pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    ranked = []
+    for evaluation in evaluations:
+        train_scores = [_score(fold['train'], objective, min_trades) for fold in evaluation['folds']]
+        test_scores = [_score(fold['test'], objective, min_trades) for fold in evaluation['folds']]
+        ranked.append({
+            'params': evaluation['params'],
+            'train_score': _mean(train_scores),
+            'test_score': _mean(test_scores),
+            'train_scores': train_scores,
+            'test_scores': test_scores,
+            'folds': evaluation['folds']
+        })
+
+    # 每折选训练区间最优的参数，评估其测试区间（样本外）；
+    # 没有任何参数满足交易次数要求的折不选参数，也不计入样本外收益
+    walk_forward = []
+    for i, split in enumerate(splits):
+        best = max(ranked, key=lambda entry: entry['train_scores'][i])
+        if not np.isfinite(best['train_scores'][i]):
+            walk_forward.append({'split': list(split), 'params': None, 'train_score': None, 'test': None})
+            continue
+        walk_forward.append({
+            'split': list(split),
+            'params': best['params'],
+            'train_score': best['train_scores'][i],
+            'test': best['folds'][i]['test']
+        })
+    valid_folds = [fold for fold in walk_forward if fold['test'] is not None]
+    out_of_sample = float(np.prod([1 + fold['test']['total_return'] for fold in valid_folds]) - 1)
+
+    ranked.sort(key=lambda entry: entry['train_score'] if entry['train_score'] is not None else float('-inf'),
+                reverse=True)
+    for entry in ranked:
+        del entry['train_scores'], entry['test_scores'], entry['folds']
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"{strategy_id} 参数搜索完成: {len(candidates)} 组参数, {len(splits)} 折, {workers} 进程, 用时 {elapsed:.1f}s")
+    return {
+        'strategy': strategy_id,
+        'search': search,
+        'objective': objective,
+        'evaluated': len(candidates),
+        'bars': len(prices),
+        'timeframe': timeframe,
+        'workers': workers,
+        'elapsed_s': round(elapsed, 2),
+        # 最近一个训练区间上最优的参数，作为后续使用的推荐参数（该折没有有效参数时为None）
+        'recommended': walk_forward[-1]['params'],
+        'walk_forward': walk_forward,
+        'valid_folds': len(valid_folds),
+        'out_of_sample_return': round(out_of_sample, 6) if valid_folds else None,
+        'ranked': ranked
+    }
+
+
+def save_sweep(result: Dict, directory: str = DEFAULT_SWEEP_DIR) -> str:
+    """保存搜索结果（先写临时文件再替换）"""
+    os.makedirs(directory, exist_ok=True)
+    result = dict(result, created_at=int(time.time()))
+    path = os.path.join(directory, f"{result['strategy']}_{result['created_at']}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_latest_sweep(strategy_id: str, directory: str = DEFAULT_SWEEP_DIR) -> Optional[Dict]:
+    """读取某策略最近一次的搜索结果"""
+    if not os.path.isdir(directory):
+        return None
+    files = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(f"{strategy_id}_") and name.endswith(".json")
+    )
+    if not files:
+        return None
+    with open(os.path.join(directory, files[-1]), encoding="utf-8") as f:
+        return json.load(f)
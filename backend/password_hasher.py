@@ -0,0 +1,111 @@
+"""
+密码哈希线程池 - 把bcrypt计算移出事件循环
+
+bcrypt每次计算耗时数十到数百毫秒，直接在async处理函数中调用会阻塞
+WebSocket广播。这里使用独立的有界线程池执行（bcrypt计算期间释放GIL），
+排队请求超过上限时直接拒绝，避免登录高峰拖垮行情推送。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from fastapi import HTTPException
+
+
+class PasswordHasher:
+    """有界的异步密码哈希执行器"""
+
+    def __init__(self, hash_func: Callable[[str], str], verify_func: Callable[[str, str], bool],
+                 max_workers: int = 2, max_pending: int = 32):
+        self.hash_func = hash_func
+        self.verify_func = verify_func
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+        # 指标
+        self.pending = 0
+        self.running = 0
+        self._running_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.total_queue_time = 0.0
+        self.max_queue_time = 0.0
+        self.total_run_time = 0.0
+
+    async def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return await self._submit(self.hash_func, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """验证密码"""
+        return await self._submit(self.verify_func, plain_password, hashed_password)
+
+    async def _submit(self, func: Callable, *args):
+        # 准入控制：排队+执行中的任务超过上限时拒绝
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="认证服务繁忙，请稍后重试",
+                headers={"Retry-After": "1"}
+            )
+
+        self.pending += 1
+        submitted_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            with self._running_lock:
+                self.running += 1
+            try:
+                return func(*args), started_at - submitted_at, time.perf_counter() - started_at
+            finally:
+                with self._running_lock:
+                    self.running -= 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, queue_time, run_time = await loop.run_in_executor(self._executor, run)
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self.total_queue_time += queue_time
+        self.max_queue_time = max(self.max_queue_time, queue_time)
+        self.total_run_time += run_time
+        return result
+
+    def get_metrics(self) -> Dict:
+        """获取线程池指标"""
+        completed = max(self.completed, 1)
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": max(0, self.pending - self.running),
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_queue_ms": round(self.total_queue_time / completed * 1000, 2),
+            "max_queue_ms": round(self.max_queue_time * 1000, 2),
+            "avg_hash_ms": round(self.total_run_time / completed * 1000, 2)
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+def create_password_hasher(hash_func: Callable[[str], str],
+                           verify_func: Callable[[str, str], bool]) -> PasswordHasher:
+    """根据环境变量创建密码哈希执行器"""
+    return PasswordHasher(
+        hash_func,
+        verify_func,
+        max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+        max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    )
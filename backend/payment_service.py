@@ -7,6 +7,7 @@ import json
 from datetime import datetime
 from sqlalchemy.orm import Session
 from models import PaymentQRCode, Order, PaymentProof, User
+from user_cache import user_cache
 import logging
 
 class PaymentService:
@@ -215,6 +216,8 @@ class PaymentService:
             if user:
                 user.membership_level = plan_type
                 db.commit()
+                # 会员等级变化后立即失效认证缓存
+                user_cache.invalidate(user_id=user.id)
                 logging.info(f"User {user_id} membership activated: {plan_type}")
                 
         except Exception as e:
@@ -0,0 +1,148 @@
+"""
+共享预测缓存 - 同一根K线内的相同预测只计算一次
+
+缓存键为 (交易对, 时间框架, K线开盘时间)，在K线收盘时过期。
+同一进程内并发的相同请求合并为一次计算；多worker之间通过Redis共享结果。
+合并的计算以第一个请求的优先级运行，若结果被降级（如LLM按该优先级被限流），
+优先级更高的等待者按自己的优先级重新计算，不接受低优先级请求的降级结果。
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# 时间框架对应的秒数
+TIMEFRAME_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+    "1w": 604800
+}
+
+# 周线按周一00:00(UTC)开盘，Unix纪元为周四，需偏移4天
+_BAR_OFFSETS = {"1w": 4 * 86400}
+
+
+def timeframe_seconds(timeframe: str) -> int:
+    """时间框架转换为秒数"""
+    if timeframe not in TIMEFRAME_SECONDS:
+        raise ValueError(f"不支持的时间框架: {timeframe}")
+    return TIMEFRAME_SECONDS[timeframe]
+
+
+def bar_offset(timeframe: str) -> int:
+    """K线开盘时间相对Unix纪元的偏移（秒）"""
+    return _BAR_OFFSETS.get(timeframe, 0)
+
+
+def bar_bounds(timeframe: str, now: Optional[float] = None) -> Tuple[int, int]:
+    """计算当前K线的开盘和收盘时间（Unix秒，UTC对齐）"""
+    if now is None:
+        now = time.time()
+    length = timeframe_seconds(timeframe)
+    offset = bar_offset(timeframe)
+    bar_open = int((now - offset) // length * length + offset)
+    return bar_open, bar_open + length
+
+
+class PredictionCache:
+    """按K线缓存预测结果，并合并并发的相同计算"""
+
+    def __init__(self, store=None, prefix: str = "prediction"):
+        # store 需提供 get_json/set_json（如 cache.AsyncCache），为空时只做进程内合并
+        self.store = store
+        self.prefix = prefix
+        # 合并键 -> (计算任务, 发起请求的优先级)
+        self._inflight: Dict[str, Tuple[asyncio.Future, Optional[int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.recomputed = 0
+
+    def key(self, symbol: str, timeframe: str, bar_open: int) -> str:
+        return f"{self.prefix}:{symbol}:{timeframe}:{bar_open}"
+
+    async def get_or_compute(self, symbol: str, timeframe: str,
+                             compute: Callable[[], Awaitable[Dict]],
+                             now: Optional[float] = None, priority: Optional[int] = None) -> Dict:
+        """读取当前K线的缓存预测，未命中时计算并缓存到K线收盘
+
+        priority 为请求的优先级（数值越小越高，如 llm_governor.TIER_PRIORITY），为空时不区分。
+        """
+        bar_open, bar_close = bar_bounds(timeframe, now)
+        key = self.key(symbol, timeframe, bar_open)
+
+        result, owner = await self._coalesce(key, key, bar_close, compute, priority)
+        if result.get("degraded") and priority is not None and owner is not None and priority < owner:
+            # 同一优先级的等待者仍然合并为一次计算
+            self.recomputed += 1
+            result, _ = await self._coalesce(f"{key}#{priority}", key, bar_close, compute, priority)
+        return result
+
+    async def _coalesce(self, inflight_key: str, key: str, bar_close: int,
+                        compute: Callable[[], Awaitable[Dict]],
+                        priority: Optional[int]) -> Tuple[Dict, Optional[int]]:
+        """等待进行中的相同计算或发起新计算 -> (结果, 计算所用的优先级)"""
+        entry = self._inflight.get(inflight_key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            # 计算在独立任务中进行，发起请求被取消时不影响其他等待者
+            task = asyncio.ensure_future(self._load_or_compute(key, bar_close, compute))
+            entry = self._inflight[inflight_key] = (task, priority)
+            task.add_done_callback(lambda t, k=inflight_key: self._finish(k, t))
+
+        task, owner = entry
+        return await asyncio.shield(task), owner
+
+    async def _load_or_compute(self, key: str, bar_close: int,
+                               compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        result = await self._load(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = await compute()
+        ttl = bar_close - time.time()
+        # 降级结果（模型超时、LLM被限流或请求失败）只返回给本次请求，不在整根K线内共享
+        if ttl > 0 and not result.get("degraded"):
+            await self._save(key, result, ttl)
+        return result
+
+    def _finish(self, key: str, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # 标记异常已读取，避免所有等待者都已取消时产生警告
+            task.exception()
+
+    def get_stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "recomputed": self.recomputed,
+            "inflight": len(self._inflight)
+        }
+
+    async def _load(self, key: str) -> Optional[Dict]:
+        if self.store is None:
+            return None
+        try:
+            return await self.store.get_json(key)
+        except Exception as e:
+            logging.warning(f"读取预测缓存失败: {e}")
+            return None
+
+    async def _save(self, key: str, result: Dict, ttl: float):
+        if self.store is None:
+            return
+        try:
+            await self.store.set_json(key, result, ttl)
+        except Exception as e:
+            logging.warning(f"写入预测缓存失败: {e}")
@@ -0,0 +1,116 @@
+"""
+预测结果记录与判定
+
+build_prediction_records 把一次预测展开为每个模型一行的记录（综合结果 + 各子模型）；
+resolve_outcomes 用分钟K线批量判定到期预测的实际方向和是否命中。
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from prediction_cache import timeframe_seconds
+
+# 实际涨跌幅在此范围内视为横盘（neutral）
+NEUTRAL_BAND = 0.001
+# 到期时间之前最近一根K线的最大间隔（秒），超过则认为缺少行情数据
+KLINE_TOLERANCE = 300
+
+# 预测详情中的子模型名
+DETAIL_MODELS = {
+    "technical": "technical_analysis",
+    "ai_model": "ai_model",
+    "deepseek": "deepseek"
+}
+
+
+def base_price(market_data: Dict) -> Optional[float]:
+    """预测时的各交易所均价"""
+    prices = [data["price"] for data in market_data.values() if data.get("price")]
+    return sum(prices) / len(prices) if prices else None
+
+
+def is_model_prediction(result: Optional[Dict]) -> bool:
+    """子模型是否给出了实际预测（超时/降级、未训练或进行中的占位结果置信度为0，不计入准确率）"""
+    return bool(result) and not result.get("degraded") and bool(result.get("confidence"))
+
+
+def is_combined_prediction(prediction: Dict) -> bool:
+    """综合结果是否可计入准确率（DEEPSEEK降级时综合结果只剩其他模型的占位权重，不记录）"""
+    deepseek = prediction.get("details", {}).get("deepseek")
+    return not (deepseek and deepseek.get("degraded"))
+
+
+def build_prediction_records(user_id: Optional[int], symbol: str, predictions: Dict[str, Dict],
+                             market_data: Dict, now: Optional[float] = None) -> List[Dict]:
+    """展开为待写入prediction_results的记录（每个时间框架 × 每个模型一行）"""
+    price = base_price(market_data)
+    if price is None:
+        return []
+    now = time.time() if now is None else now
+    # prediction_time 列为不带时区的UTC时间
+    prediction_time = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None)
+
+    records = []
+    for timeframe, prediction in predictions.items():
+        target_time = int(now) + timeframe_seconds(timeframe)
+        entries = [("combined", prediction)] if is_combined_prediction(prediction) else []
+        entries += [
+            (model, prediction["details"][key])
+            for key, model in DETAIL_MODELS.items()
+            if is_model_prediction(prediction.get("details", {}).get(key))
+        ]
+        for model, result in entries:
+            records.append({
+                "user_id": user_id,
+                "symbol": symbol,
+                "timeframe": timeframe,
+                "model": model,
+                "prediction_time": prediction_time,
+                "predicted_direction": result.get("direction", "neutral"),
+                "predicted_price": result.get("target_price") or None,
+                "confidence": result.get("confidence"),
+                "base_price": price,
+                "target_time": target_time
+            })
+    return records
+
+
+def resolve_outcomes(target_times: np.ndarray, base_prices: np.ndarray, predicted: np.ndarray,
+                     kline_times: np.ndarray, kline_closes: np.ndarray) -> Dict[str, np.ndarray]:
+    """批量判定预测结果（同一交易对）
+
+    实际价格取到期时间前最后一根已收盘分钟K线的收盘价（kline_times 升序），
+    缺少行情数据的预测实际方向为unknown、是否命中为None。
+    """
+    target_times = np.asarray(target_times, dtype=np.int64)
+    kline_times = np.asarray(kline_times, dtype=np.int64)
+    # 开盘时间 <= 到期时间-60 的K线在到期前已收盘
+    index = np.searchsorted(kline_times, target_times - 60, side="right") - 1
+    safe_index = np.clip(index, 0, max(len(kline_times) - 1, 0))
+    if len(kline_times):
+        found = (index >= 0) & (kline_times[safe_index] >= target_times - 60 - KLINE_TOLERANCE)
+        actual = np.where(found, np.asarray(kline_closes, dtype=np.float64)[safe_index], np.nan)
+    else:
+        found = np.zeros(len(target_times), dtype=bool)
+        actual = np.full(len(target_times), np.nan)
+
+    change = actual / np.asarray(base_prices, dtype=np.float64) - 1
+    direction = np.where(change > NEUTRAL_BAND, "up", np.where(change < -NEUTRAL_BAND, "down", "neutral"))
+    direction = np.where(found, direction, "unknown")
+    return {
+        "actual_price": actual,
+        "actual_direction": direction,
+        "is_correct": np.where(found, direction == np.asarray(predicted), None),
+        "found": found
+    }
+
+
+def summarize_accuracy(rows: List[Dict]) -> List[Dict]:
+    """计数行 -> 带命中率的结果"""
+    return [
+        dict(row, hit_rate=round(row["correct"] / row["total"], 4) if row["total"] else None)
+        for row in rows
+    ]
@@ -0,0 +1,162 @@
+"""
+预测结果回填 - 批量判定到期预测并增量更新命中计数
+
+后台任务定期取出一批已到期、未判定的预测，按交易对一次读取覆盖这些到期时间的分钟K线，
+用 resolve_outcomes 向量化判定后按主键批量更新，并在同一事务中累加 prediction_accuracy 计数。
+与K线记录一样，只应在唯一的行情采集端运行。
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert, select, update
+
+from database import AsyncSessionLocal
+from models import Kline, PredictionAccuracy, PredictionResult
+from prediction_outcomes import KLINE_TOLERANCE, resolve_outcomes, summarize_accuracy
+
+
+class PredictionResolver:
+    """到期预测的批量回填任务"""
+
+    def __init__(self, interval: float = 30.0, batch_size: int = 2000, settle: int = 120):
+        self.interval = interval
+        self.batch_size = batch_size
+        # 到期后等待K线写入的时间（秒）
+        self.settle = settle
+        self.resolved = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台回填任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # 一次积压多批时连续处理，处理完再等待
+                while await self.resolve_once() >= self.batch_size:
+                    pass
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"预测结果回填失败: {e}")
+                await asyncio.sleep(self.interval)
+
+    async def resolve_once(self, now: Optional[int] = None) -> int:
+        """判定一批到期预测，返回本批处理的行数"""
+        now = int(time.time()) if now is None else now
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(
+                    PredictionResult.id, PredictionResult.symbol, PredictionResult.timeframe,
+                    PredictionResult.model, PredictionResult.predicted_direction,
+                    PredictionResult.base_price, PredictionResult.target_time
+                )
+                .where(
+                    PredictionResult.actual_direction.is_(None),
+                    PredictionResult.target_time.is_not(None),
+                    PredictionResult.target_time <= now - self.settle
+                )
+                .order_by(PredictionResult.target_time)
+                .limit(self.batch_size)
+            )).all()
+            if not rows:
+                return 0
+
+            updates: List[Dict] = []
+            counters: Dict[Tuple[str, str, str], List[int]] = defaultdict(lambda: [0, 0])
+            by_symbol: Dict[str, List] = defaultdict(list)
+            for row in rows:
+                by_symbol[row.symbol].append(row)
+
+            for symbol, symbol_rows in by_symbol.items():
+                targets = np.array([row.target_time for row in symbol_rows], dtype=np.int64)
+                kline_rows = (await db.execute(
+                    select(Kline.open_time, Kline.close)
+                    .where(
+                        Kline.symbol == symbol,
+                        Kline.interval == "1m",
+                        Kline.open_time >= int(targets.min()) - 60 - KLINE_TOLERANCE,
+                        Kline.open_time <= int(targets.max())
+                    )
+                    .order_by(Kline.open_time)
+                )).all()
+
+                outcomes = resolve_outcomes(
+                    targets,
+                    [row.base_price for row in symbol_rows],
+                    [row.predicted_direction for row in symbol_rows],
+                    [kline.open_time for kline in kline_rows],
+                    [kline.close for kline in kline_rows]
+                )
+
+                for i, row in enumerate(symbol_rows):
+                    found = bool(outcomes["found"][i])
+                    is_correct = bool(outcomes["is_correct"][i]) if found else None
+                    updates.append({
+                        "id": row.id,
+                        "actual_price": float(outcomes["actual_price"][i]) if found else None,
+                        "actual_direction": str(outcomes["actual_direction"][i]),
+                        "is_correct": is_correct
+                    })
+                    if found:
+                        counter = counters[(symbol, row.timeframe, row.model or "combined")]
+                        counter[0] += 1
+                        counter[1] += int(is_correct)
+
+            # 按主键批量更新
+            await db.execute(update(PredictionResult), updates)
+            await self._add_counts(db, counters)
+            await db.commit()
+
+        self.resolved += len(rows)
+        return len(rows)
+
+    async def _add_counts(self, db, counters: Dict[Tuple[str, str, str], List[int]]):
+        """在同一事务中累加命中计数（键数量 = 交易对 × 时间框架 × 模型，通常很少）"""
+        for (symbol, timeframe, model), (total, correct) in counters.items():
+            result = await db.execute(
+                update(PredictionAccuracy)
+                .where(
+                    PredictionAccuracy.symbol == symbol,
+                    PredictionAccuracy.timeframe == timeframe,
+                    PredictionAccuracy.model == model
+                )
+                .values(total=PredictionAccuracy.total + total, correct=PredictionAccuracy.correct + correct)
+            )
+            if result.rowcount == 0:
+                await db.execute(insert(PredictionAccuracy).values(
+                    symbol=symbol, timeframe=timeframe, model=model, total=total, correct=correct
+                ))
+
+
+async def load_accuracy(symbol: Optional[str] = None, timeframe: Optional[str] = None) -> List[Dict]:
+    """读取增量维护的命中计数"""
+    query = select(
+        PredictionAccuracy.symbol, PredictionAccuracy.timeframe, PredictionAccuracy.model,
+        PredictionAccuracy.total, PredictionAccuracy.correct
+    ).order_by(PredictionAccuracy.symbol, PredictionAccuracy.timeframe, PredictionAccuracy.model)
+    if symbol:
+        query = query.where(PredictionAccuracy.symbol == symbol)
+    if timeframe:
+        query = query.where(PredictionAccuracy.timeframe == timeframe)
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    return summarize_accuracy([dict(row._mapping) for row in rows])
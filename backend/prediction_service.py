@@ -1,13 +1,22 @@
 import asyncio
+import importlib.util
 import json
 import random
+import re
+import time
 import numpy as np
 import os
-from typing import Dict, List, Optional
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 import httpx
 
+from prediction_cache import PredictionCache
+from llm_governor import LLMOverloaded, create_llm_governor
+from price_history import PriceHistory, trend_features
+from ai_model import AIModel
+
 # 加载环境变量
 try:
     from dotenv import load_dotenv
@@ -15,111 +24,357 @@ try:
 except ImportError:
     pass  # dotenv是可选的
 
+# HTTP/2需要可选依赖h2（pip install httpx[http2]），缺失时退回HTTP/1.1长连接
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class LLMUnavailable(Exception):
+    """DEEPSEEK请求失败（超时、HTTP错误或网络异常）"""
+
 class PredictionService:
-    def __init__(self):
+    # 未配置DEEPSEEK_API_KEY时使用的模拟响应
+    MOCK_RESPONSES = [
+        "基于当前技术指标分析，预计价格将上涨，置信度75%。RSI指标显示超卖状态，MACD出现金叉信号。",
+        "市场情绪偏向谨慎，预计价格将下跌，置信度68%。成交量萎缩，支撑位面临考验。",
+        "当前市场处于震荡状态，短期内可能保持横盘，置信度60%。等待明确的突破信号。"
+    ]
+
+    # 各模型的单任务超时（秒），超时只影响该模型自身的贡献
+    DEFAULT_MODEL_TIMEOUTS = {
+        "technical_analysis": 1.0,
+        "ai_model": 2.0,
+        "deepseek": 30.0
+    }
+
+    # 技术分析使用的K线数量，少于最少K线数时退回24小时涨跌幅判断
+    TECHNICAL_LOOKBACK = 60
+    TECHNICAL_MIN_BARS = 5
+
+    def __init__(self, prediction_cache: Optional[PredictionCache] = None, llm_governor=None,
+                 price_history: Optional[PriceHistory] = None):
         self.deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
         if not self.deepseek_api_key:
             logging.warning("DEEPSEEK_API_KEY not found in environment variables. AI predictions will use mock data.")
         self.deepseek_url = "https://api.deepseek.com/v1/chat/completions"
-
-    async def predict(self, symbol: str, timeframes: List[str], market_data: Dict) -> Dict:
-        """进行价格预测"""
-        predictions = {}
-
-        for timeframe in timeframes:
+        # 同一K线内相同 (交易对, 时间框架) 的预测在所有用户间共享
+        self.prediction_cache = prediction_cache or PredictionCache()
+        # 单次预测请求内同时运行的模型任务上限
+        self.max_concurrency = int(os.getenv("PREDICTION_MAX_CONCURRENCY", "8"))
+        self.model_timeouts = dict(self.DEFAULT_MODEL_TIMEOUTS)
+        self.model_timeouts["deepseek"] = float(os.getenv("DEEPSEEK_TIMEOUT", self.model_timeouts["deepseek"]))
+        # 共享的DEEPSEEK HTTP客户端（应用启动时创建，关闭时释放）
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self.llm_call_timings = deque(maxlen=200)
+        # LLM调用的全局并发上限与按会员等级的优先级排队
+        self.llm_governor = llm_governor or create_llm_governor()
+        # 行情广播循环写入的本地价格历史
+        self.price_history = price_history or PriceHistory()
+        # 离线训练的本地模型（内存映射），未训练时AI模型不参与判断
+        try:
+            self.ai_model = AIModel.load()
+            if self.ai_model is None:
+                logging.warning("未找到AI模型文件，请运行 train_ai_model.py 训练")
+        except Exception as e:
+            logging.error(f"加载AI模型失败: {e}")
+            self.ai_model = None
+        # 流式预测的整体截止时间（秒），到期未完成的LLM分析不再等待
+        self.stream_deadline = float(os.getenv("PREDICTION_STREAM_DEADLINE", "10"))
+        # 多时间框架请求合并为一次DEEPSEEK调用（解析失败时退回逐个时间框架调用）
+        self.deepseek_batch_enabled = os.getenv("DEEPSEEK_BATCH", "true").lower() in ("1", "true", "yes")
+
+    async def startup(self):
+        """创建长连接HTTP客户端"""
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.model_timeouts["deepseek"], connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv("DEEPSEEK_MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(os.getenv("DEEPSEEK_MAX_KEEPALIVE", "10")),
+                    keepalive_expiry=60.0
+                )
+            )
+            if not HTTP2_AVAILABLE:
+                logging.info("未安装h2，DEEPSEEK客户端使用HTTP/1.1长连接")
+
+    async def shutdown(self):
+        """关闭HTTP客户端"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    async def predict(self, symbol: str, timeframes: List[str], market_data: Dict,
+                      membership_level=None) -> Dict:
+        """进行价格预测（所有时间框架 × 模型并发执行，LLM调用按会员等级排队）"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        priority = self.llm_governor.priority(membership_level)
+        deepseek_batch = None
+        if self.deepseek_batch_enabled and len(timeframes) > 1:
+            deepseek_batch = _DeepSeekBatch(self, symbol, timeframes, market_data, membership_level)
+
+        async def predict_cached(timeframe: str) -> Dict:
             try:
-                # 获取技术分析预测
-                technical_prediction = await self.technical_analysis_prediction(symbol, timeframe, market_data)
-
-                # 获取AI模型预测
-                ai_prediction = await self.ai_model_prediction(symbol, timeframe, market_data)
-
-                # 获取DEEPSEEK分析
-                deepseek_analysis = await self.deepseek_analysis(symbol, timeframe, market_data)
-
-                # 综合预测结果
-                final_prediction = self.combine_predictions(
-                    technical_prediction,
-                    ai_prediction,
-                    deepseek_analysis
+                return await self.prediction_cache.get_or_compute(
+                    symbol,
+                    timeframe,
+                    lambda: self.predict_timeframe(symbol, timeframe, market_data, semaphore,
+                                                   deepseek_batch, membership_level=membership_level),
+                    priority=priority
                 )
-
-                predictions[timeframe] = final_prediction
-
             except Exception as e:
                 logging.error(f"Prediction error for {symbol} {timeframe}: {e}")
                 # 返回默认预测
-                predictions[timeframe] = {
+                return self._default_prediction()
+
+        results = await asyncio.gather(*(predict_cached(timeframe) for timeframe in timeframes))
+        return dict(zip(timeframes, results))
+
+    async def predict_stream(self, symbol: str, timeframes: List[str], market_data: Dict,
+                             deadline: Optional[float] = None, membership_level=None) -> AsyncIterator[Dict]:
+        """流式预测：先推送技术分析和AI模型的初步结果，再推送LLM修正后的最终结果
+
+        事件依次为 preliminary（不含LLM）、final（含LLM或截止时间到达时的降级结果）和 done。
+        截止时间到达后未完成的LLM分析在后台继续，结果仍写入预测缓存。
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (self.stream_deadline if deadline is None else deadline)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        priority = self.llm_governor.priority(membership_level)
+        deepseek_batch = None
+        if self.deepseek_batch_enabled and len(timeframes) > 1:
+            deepseek_batch = _DeepSeekBatch(self, symbol, timeframes, market_data, membership_level)
+
+        events: asyncio.Queue = asyncio.Queue()
+        preliminary: Dict[str, Dict] = {}
+
+        def on_preliminary(timeframe: str, prediction: Dict):
+            preliminary[timeframe] = prediction
+            events.put_nowait({"event": "preliminary", "timeframe": timeframe, "prediction": prediction})
+
+        async def run_timeframe(timeframe: str):
+            try:
+                prediction = await self.prediction_cache.get_or_compute(
+                    symbol,
+                    timeframe,
+                    lambda: self.predict_timeframe(symbol, timeframe, market_data, semaphore,
+                                                   deepseek_batch, on_preliminary, membership_level),
+                    priority=priority
+                )
+            except Exception as e:
+                logging.error(f"Prediction error for {symbol} {timeframe}: {e}")
+                prediction = preliminary.get(timeframe) or self._default_prediction()
+            events.put_nowait({"event": "final", "timeframe": timeframe, "prediction": prediction})
+
+        tasks = [asyncio.ensure_future(run_timeframe(timeframe)) for timeframe in timeframes]
+        finished = set()
+        try:
+            while len(finished) < len(timeframes):
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(events.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if event["event"] == "final":
+                    finished.add(event["timeframe"])
+                elif event["timeframe"] in finished:
+                    # 命中缓存的时间框架不会再推送初步结果
+                    continue
+                yield event
+
+            # 截止时间到达：未完成的时间框架以初步结果作为最终结果
+            for timeframe in timeframes:
+                if timeframe not in finished:
+                    prediction = preliminary.get(timeframe) or self._default_prediction()
+                    yield {"event": "final", "timeframe": timeframe, "prediction": prediction, "partial": True}
+            yield {"event": "done", "timeframes": list(timeframes)}
+        finally:
+            # 只取消本请求的等待，共享的缓存计算在后台继续
+            for task in tasks:
+                task.cancel()
+
+    def _default_prediction(self) -> Dict:
+        return {
+            "direction": "neutral",
+            "probability": 50.0,
+            "confidence": 0.3,
+            "target_price": 0.0,
+            "reasoning": "预测服务暂时不可用"
+        }
+
+    async def predict_timeframe(self, symbol: str, timeframe: str, market_data: Dict,
+                                semaphore: Optional[asyncio.Semaphore] = None,
+                                deepseek_batch: Optional["_DeepSeekBatch"] = None,
+                                on_preliminary=None, membership_level=None) -> Dict:
+        """计算单个时间框架的预测（不经过缓存），三个模型并发执行
+
+        on_preliminary(timeframe, prediction) 在技术分析和AI模型完成、LLM结果到达前调用。
+        """
+        if deepseek_batch is not None:
+            deepseek_coro = deepseek_batch.get(timeframe)
+        else:
+            deepseek_coro = self.deepseek_analysis(symbol, timeframe, market_data, membership_level)
+
+        async def fast_models():
+            technical, ai = await asyncio.gather(
+                # 技术分析预测
+                self._run_model("technical_analysis", self.technical_analysis_prediction(symbol, timeframe, market_data), semaphore),
+                # AI模型预测
+                self._run_model("ai_model", self.ai_model_prediction(symbol, timeframe, market_data), semaphore)
+            )
+            if on_preliminary is not None:
+                pending = {
                     "direction": "neutral",
                     "probability": 50.0,
-                    "confidence": 0.3,
-                    "target_price": 0.0,
-                    "reasoning": "预测服务暂时不可用"
+                    "confidence": 0.0,
+                    "reasoning": "DEEPSEEK分析进行中",
+                    "method": "deepseek"
                 }
+                on_preliminary(timeframe, self.combine_predictions(technical, ai, pending))
+            return technical, ai
+
+        (technical_prediction, ai_prediction), deepseek_analysis = await asyncio.gather(
+            fast_models(),
+            # DEEPSEEK分析
+            self._run_model("deepseek", deepseek_coro, semaphore)
+        )
+
+        # 综合预测结果
+        return self.combine_predictions(
+            technical_prediction,
+            ai_prediction,
+            deepseek_analysis
+        )
+
+    async def _run_model(self, method: str, coro, semaphore: Optional[asyncio.Semaphore] = None) -> Dict:
+        """在并发上限和超时控制下运行单个模型，失败时返回零置信度的中性结果"""
+        try:
+            if semaphore is None:
+                return await asyncio.wait_for(coro, self.model_timeouts[method])
+            async with semaphore:
+                return await asyncio.wait_for(coro, self.model_timeouts[method])
+        except asyncio.TimeoutError:
+            logging.warning(f"{method} 预测超时({self.model_timeouts[method]}s)")
+            reasoning = f"{method} 超时"
+        except LLMOverloaded as e:
+            logging.warning(f"{method} 已降级: {e}")
+            reasoning = f"{method} 负载过高，已降级为技术分析"
+        except LLMUnavailable as e:
+            logging.warning(f"{method} 服务不可用: {e}")
+            reasoning = f"{method} 服务暂时不可用，已降级为技术分析"
+        except Exception as e:
+            logging.error(f"{method} 预测失败: {e}")
+            reasoning = f"{method} 暂时不可用"
+        finally:
+            # 未被调度的协程需要显式关闭
+            coro.close()
 
-        return predictions
+        return self._degraded_result(method, reasoning)
+
+    @staticmethod
+    def _degraded_result(method: str, reasoning: str) -> Dict:
+        """模型失败时的零置信度中性结果"""
+        return {
+            "direction": "neutral",
+            "probability": 50.0,
+            "confidence": 0.0,
+            "reasoning": reasoning,
+            "method": method,
+            # 降级结果不写入预测缓存，也不记录为预测
+            "degraded": True
+        }
 
     async def technical_analysis_prediction(self, symbol: str, timeframe: str, market_data: Dict) -> Dict:
-        """技术分析预测"""
-        # 模拟技术分析计算
-        await asyncio.sleep(0.1)  # 模拟计算时间
+        """技术分析预测（基于价格历史的趋势、波动率和动量特征）"""
+        _, closes = self.price_history.bars(symbol, timeframe, self.TECHNICAL_LOOKBACK)
+        if len(closes) < self.TECHNICAL_MIN_BARS:
+            return self._change_based_prediction(market_data)
 
-        # 简化的技术分析逻辑
-        prices = []
-        for exchange, data in market_data.items():
-            if data.get('price'):
-                prices.append(data['price'])
+        features = trend_features(closes)
+        # 趋势和动量合成为[-1, 1]的得分
+        score = float(np.tanh(0.5 * features["trend"] + 0.5 * features["momentum"]))
 
-        if not prices:
-            return {"direction": "neutral", "probability": 50.0, "confidence": 0.3}
+        if score > 0.15:
+            direction = "up"
+        elif score < -0.15:
+            direction = "down"
+        else:
+            direction = "neutral"
+
+        # 历史越完整置信度越高
+        coverage = min(features["bars"] / self.TECHNICAL_LOOKBACK, 1.0)
+
+        return {
+            "direction": direction,
+            "probability": round(50.0 + 40.0 * abs(score), 2) if direction != "neutral" else 50.0,
+            "confidence": round(0.3 + 0.5 * coverage * abs(score), 3),
+            "features": {key: round(float(value), 6) for key, value in features.items()},
+            "method": "technical_analysis"
+        }
 
-        avg_price = sum(prices) / len(prices)
-        price_volatility = np.std(prices) if len(prices) > 1 else 0
+    def _change_based_prediction(self, market_data: Dict) -> Dict:
+        """价格历史不足时，按各交易所24小时涨跌幅均值判断"""
+        changes = [data.get("change_percent_24h", 0) for data in market_data.values() if data.get("price")]
+        if not changes:
+            return {"direction": "neutral", "probability": 50.0, "confidence": 0.3, "method": "technical_analysis"}
 
-        # 基于价格波动性的简单预测
-        if price_volatility > avg_price * 0.01:  # 高波动
-            direction = "up" if random.random() > 0.5 else "down"
-            probability = random.uniform(60, 80)
-        else:  # 低波动
+        change = sum(changes) / len(changes)
+        if change > 1.0:
+            direction = "up"
+        elif change < -1.0:
+            direction = "down"
+        else:
             direction = "neutral"
-            probability = random.uniform(45, 55)
 
         return {
             "direction": direction,
-            "probability": probability,
-            "confidence": min(price_volatility * 100, 0.8),
+            "probability": 55.0 if direction != "neutral" else 50.0,
+            "confidence": 0.2,
             "method": "technical_analysis"
         }
 
     async def ai_model_prediction(self, symbol: str, timeframe: str, market_data: Dict) -> Dict:
         """AI模型预测"""
-        # 模拟AI模型计算
-        await asyncio.sleep(0.2)
-
-        # 简化的AI预测逻辑
-        timeframe_weights = {
-            "1m": 0.6,
-            "5m": 0.7,
-            "15m": 0.75,
-            "30m": 0.8,
-            "1h": 0.85
-        }
-
-        base_confidence = timeframe_weights.get(timeframe, 0.7)
-
-        # 模拟AI预测结果
-        directions = ["up", "down", "neutral"]
-        direction = random.choices(directions, weights=[0.4, 0.4, 0.2])[0]
-        probability = random.uniform(55, 85)
-
+        return self.ai_model_predict_many([(symbol, timeframe)])[0]
+
+    def ai_model_predict_many(self, requests: List[Tuple[str, str]]) -> List[Dict]:
+        """批量AI模型预测：一次矩阵运算为多个 (交易对, 时间框架) 打分"""
+        if self.ai_model is None:
+            return [self._ai_model_unavailable("AI模型未训练") for _ in requests]
+
+        windows = []
+        for symbol, timeframe in requests:
+            # 与训练一致，只用已收盘K线
+            _, closes = self.price_history.closed_bars(symbol, timeframe, self.ai_model.window)
+            windows.append(closes if len(closes) == self.ai_model.window else None)
+
+        results = []
+        for scored in self.ai_model.predict_many(windows):
+            if scored is None:
+                results.append(self._ai_model_unavailable("价格历史不足"))
+                continue
+            results.append({
+                "direction": scored["direction"],
+                "probability": scored["probability"],
+                # 最大类别概率越突出置信度越高
+                "confidence": round(min(scored["probability"] / 100, 0.9), 3),
+                "probabilities": scored["probabilities"],
+                "method": "ai_model"
+            })
+        return results
+
+    def _ai_model_unavailable(self, reasoning: str) -> Dict:
         return {
-            "direction": direction,
-            "probability": probability,
-            "confidence": base_confidence,
+            "direction": "neutral",
+            "probability": 50.0,
+            "confidence": 0.0,
+            "reasoning": reasoning,
             "method": "ai_model"
         }
 
-    async def deepseek_analysis(self, symbol: str, timeframe: str, market_data: Dict) -> Dict:
+    async def deepseek_analysis(self, symbol: str, timeframe: str, market_data: Dict,
+                                membership_level=None) -> Dict:
         """DEEPSEEK大模型分析"""
         try:
             # 构建市场数据摘要
@@ -142,20 +397,91 @@ class PredictionService:
             """
 
             # 调用DEEPSEEK API（这里使用模拟响应）
-            response = await self.call_deepseek_api(prompt)
+            response = await self.call_deepseek_api(prompt, membership_level=membership_level)
 
             # 解析响应
             return self.parse_deepseek_response(response)
 
+        except (LLMOverloaded, LLMUnavailable):
+            raise
         except Exception as e:
             logging.error(f"DEEPSEEK analysis error: {e}")
-            return {
-                "direction": "neutral",
-                "probability": 50.0,
-                "confidence": 0.4,
-                "reasoning": "DEEPSEEK分析暂时不可用",
+            return self._degraded_result("deepseek", "DEEPSEEK分析暂时不可用")
+
+    async def deepseek_analysis_batch(self, symbol: str, timeframes: List[str], market_data: Dict,
+                                      membership_level=None) -> Dict[str, Dict]:
+        """DEEPSEEK大模型分析（一次请求覆盖全部时间框架，JSON输出）
+
+        返回解析成功的时间框架结果，缺失的时间框架由调用方退回单独分析。
+        """
+        market_summary = self.build_market_summary(symbol, market_data)
+        example = {tf: {"direction": "up|down|neutral", "probability": 0, "reasoning": "..."} for tf in timeframes[:1]}
+
+        prompt = f"""
+            作为专业的加密货币分析师，请分别分析{symbol}在以下时间框架内的价格走势：{", ".join(timeframes)}。
+
+            当前市场数据：
+            {market_summary}
+
+            请从技术面、市场情绪、价格趋势和风险四个角度综合判断，
+            对每个时间框架给出预测方向（up/down/neutral）、置信度（0-100）和简要理由。
+            只输出JSON对象，键为时间框架，例如：
+            {json.dumps(example, ensure_ascii=False)}
+            """
+
+        if not self.deepseek_api_key:
+            # 如果没有API密钥，使用模拟响应（一次调用的耗时）
+            async with self.llm_governor.slot(membership_level):
+                await asyncio.sleep(0.5)
+            response = json.dumps({
+                timeframe: self._mock_batch_item(random.choice(self.MOCK_RESPONSES))
+                for timeframe in timeframes
+            }, ensure_ascii=False)
+        else:
+            response = await self.call_deepseek_api(prompt, max_tokens=200 + 150 * len(timeframes),
+                                                    json_mode=True, membership_level=membership_level)
+
+        return self.parse_deepseek_batch_response(response, timeframes)
+
+    def _mock_batch_item(self, text: str) -> Dict:
+        parsed = self.parse_deepseek_response(text)
+        return {"direction": parsed["direction"], "probability": parsed["probability"], "reasoning": text}
+
+    def parse_deepseek_batch_response(self, response: str, timeframes: List[str]) -> Dict[str, Dict]:
+        """解析批量JSON响应，无法解析的时间框架不出现在结果中"""
+        # 兼容模型在JSON外包裹```json代码块或说明文字
+        match = re.search(r"\{.*\}", response, re.S)
+        if not match:
+            logging.warning("DEEPSEEK批量响应不是JSON，退回逐个时间框架分析")
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            logging.warning("DEEPSEEK批量响应JSON解析失败，退回逐个时间框架分析")
+            return {}
+        if not isinstance(data, dict):
+            return {}
+
+        results = {}
+        for timeframe in timeframes:
+            item = data.get(timeframe)
+            if not isinstance(item, dict):
+                continue
+            direction = str(item.get("direction", "")).lower()
+            if direction not in ("up", "down", "neutral"):
+                continue
+            try:
+                probability = float(str(item.get("probability", 60)).rstrip("%"))
+            except ValueError:
+                probability = 60.0
+            results[timeframe] = {
+                "direction": direction,
+                "probability": min(max(probability, 0.0), 100.0),
+                "confidence": 0.8,
+                "reasoning": str(item.get("reasoning", "")),
                 "method": "deepseek"
             }
+        return results
 
     def build_market_summary(self, symbol: str, market_data: Dict) -> str:
         """构建市场数据摘要"""
@@ -171,17 +497,18 @@ class PredictionService:
 
         return "\n".join(summary_lines)
 
-    async def call_deepseek_api(self, prompt: str) -> str:
-        """调用DEEPSEEK API"""
+    async def call_deepseek_api(self, prompt: str, max_tokens: int = 1000, json_mode: bool = False,
+                                membership_level=None) -> str:
+        """调用DEEPSEEK API（经LLM并发管控排队，被拒绝时抛出 LLMOverloaded，请求失败时抛出 LLMUnavailable）"""
+        async with self.llm_governor.slot(membership_level):
+            return await self._request_deepseek(prompt, max_tokens, json_mode)
+
+    async def _request_deepseek(self, prompt: str, max_tokens: int, json_mode: bool) -> str:
+        """发送DEEPSEEK请求"""
         if not self.deepseek_api_key:
             # 如果没有API密钥，使用模拟响应
             await asyncio.sleep(0.5)  # 模拟API调用时间
-            mock_responses = [
-                "基于当前技术指标分析，预计价格将上涨，置信度75%。RSI指标显示超卖状态，MACD出现金叉信号。",
-                "市场情绪偏向谨慎，预计价格将下跌，置信度68%。成交量萎缩，支撑位面临考验。",
-                "当前市场处于震荡状态，短期内可能保持横盘，置信度60%。等待明确的突破信号。"
-            ]
-            return random.choice(mock_responses)
+            return random.choice(self.MOCK_RESPONSES)
 
         try:
             headers = {
@@ -192,36 +519,83 @@ class PredictionService:
             payload = {
                 "model": "deepseek-chat",
                 "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 1000,
+                "max_tokens": max_tokens,
                 "temperature": 0.7
             }
-
-            # 设置30秒超时
-            timeout = httpx.Timeout(30.0)
-
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(
-                    self.deepseek_url,
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-
-        except httpx.TimeoutException:
+            if json_mode:
+                payload["response_format"] = {"type": "json_object"}
+
+            if self.http_client is None:
+                await self.startup()
+
+            timing = {}
+            started = time.perf_counter()
+
+            async def trace(event_name: str, info: Dict):
+                # 记录连接建立和首字节时间（复用连接时没有connect事件）
+                elapsed = time.perf_counter() - started
+                if event_name in ("connection.connect_tcp.started", "connection.start_tls.complete"):
+                    timing[event_name] = elapsed
+                elif event_name.endswith("receive_response_headers.complete"):
+                    timing["ttfb"] = elapsed
+
+            response = await self.http_client.post(
+                self.deepseek_url,
+                headers=headers,
+                json=payload,
+                extensions={"trace": trace}
+            )
+            response.raise_for_status()
+
+            result = response.json()
+            self._record_call_timing(timing, time.perf_counter() - started, response.http_version)
+            return result["choices"][0]["message"]["content"]
+
+        except httpx.TimeoutException as e:
             logging.error("DEEPSEEK API请求超时")
-            return "API请求超时，使用技术分析：市场处于震荡状态，建议谨慎操作"
+            raise LLMUnavailable("DEEPSEEK API请求超时") from e
         except httpx.HTTPStatusError as e:
             logging.error(f"DEEPSEEK API HTTP错误: {e.response.status_code}")
-            return "API服务暂时不可用，使用技术分析：建议关注关键支撑阻力位"
+            raise LLMUnavailable(f"DEEPSEEK API HTTP错误: {e.response.status_code}") from e
         except httpx.RequestError as e:
             logging.error(f"DEEPSEEK API网络错误: {e}")
-            return "网络连接异常，使用技术分析：建议等待网络恢复后重试"
-        except Exception as e:
-            logging.error(f"DEEPSEEK API调用失败: {e}")
-            return "技术分析显示市场处于震荡状态，建议谨慎操作"
+            raise LLMUnavailable(f"DEEPSEEK API网络错误: {e}") from e
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            logging.error(f"DEEPSEEK API响应格式异常: {e}")
+            raise LLMUnavailable(f"DEEPSEEK API响应格式异常: {e}") from e
+
+    def _record_call_timing(self, timing: Dict, total: float, http_version: str):
+        """记录单次LLM调用的连接、首字节和总耗时（毫秒）"""
+        connect_started = timing.get("connection.connect_tcp.started")
+        connect_done = timing.get("connection.start_tls.complete")
+        call_timing = {
+            "connect_ms": round((connect_done - connect_started) * 1000, 1)
+            if connect_started is not None and connect_done is not None else 0.0,
+            "ttfb_ms": round(timing.get("ttfb", total) * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "reused_connection": connect_started is None,
+            "http_version": http_version
+        }
+        self.llm_call_timings.append(call_timing)
+        logging.debug(f"DEEPSEEK调用耗时: {call_timing}")
+
+    def get_llm_stats(self) -> Dict:
+        """最近LLM调用的耗时统计"""
+        timings = list(self.llm_call_timings)
+        if not timings:
+            return {"calls": 0}
+
+        def avg(field):
+            return round(sum(t[field] for t in timings) / len(timings), 1)
+
+        return {
+            "calls": len(timings),
+            "avg_connect_ms": avg("connect_ms"),
+            "avg_ttfb_ms": avg("ttfb_ms"),
+            "avg_total_ms": avg("total_ms"),
+            "connection_reuse_rate": round(sum(t["reused_connection"] for t in timings) / len(timings), 3),
+            "last": timings[-1]
+        }
 
     def parse_deepseek_response(self, response: str) -> Dict:
         """解析DEEPSEEK响应"""
@@ -236,7 +610,6 @@ class PredictionService:
             direction = "neutral"
 
         # 提取置信度
-        import re
         confidence_match = re.search(r'(\d+)%', response)
         probability = float(confidence_match.group(1)) if confidence_match else 60.0
 
@@ -299,7 +672,7 @@ class PredictionService:
         else:
             target_price = base_price / price_count
 
-        return {
+        result = {
             "direction": final_direction,
             "probability": min(final_probability, 95.0),  # 限制最大概率
             "confidence": min(total_confidence, 0.9),
@@ -311,3 +684,51 @@ class PredictionService:
                 "deepseek": deepseek
             }
         }
+        if any(pred.get("degraded") for pred in predictions):
+            result["degraded"] = True
+        return result
+
+
+class _DeepSeekBatch:
+    """单次预测请求内共享的批量DEEPSEEK调用
+
+    第一个需要DEEPSEEK结果的时间框架触发批量请求，其余时间框架等待同一结果；
+    批量结果缺失的时间框架退回单独的 deepseek_analysis。请求被拒绝或DEEPSEEK不可用时
+    不再逐个时间框架重试，由 _run_model 降级为中性结果。
+    """
+
+    def __init__(self, service: PredictionService, symbol: str, timeframes: List[str], market_data: Dict,
+                 membership_level=None):
+        self.service = service
+        self.membership_level = membership_level
+        self.symbol = symbol
+        self.timeframes = list(timeframes)
+        self.market_data = market_data
+        self._task: Optional[asyncio.Future] = None
+
+    async def get(self, timeframe: str) -> Dict:
+        if self._task is None:
+            self._task = asyncio.ensure_future(
+                self.service.deepseek_analysis_batch(self.symbol, self.timeframes, self.market_data,
+                                                     self.membership_level)
+            )
+            self._task.add_done_callback(_consume_exception)
+        try:
+            # 单个时间框架超时不应取消其他时间框架共享的批量请求
+            results = await asyncio.shield(self._task)
+        except (LLMOverloaded, LLMUnavailable):
+            # 被拒绝或服务不可用时不再逐个时间框架重试，避免故障期间放大请求量
+            raise
+        except Exception as e:
+            logging.warning(f"DEEPSEEK批量分析失败: {e}")
+            results = {}
+
+        if timeframe in results:
+            return results[timeframe]
+        return await self.service.deepseek_analysis(self.symbol, timeframe, self.market_data, self.membership_level)
+
+
+def _consume_exception(task: asyncio.Future):
+    # 所有等待者都已超时时，避免批量任务的异常产生未读取警告
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,175 @@
+"""
+预测预热 - K线收盘后立即为热门 (交易对, 时间框架) 计算预测
+
+PopularityTracker 按分钟统计最近一段时间的请求次数；PredictionWarmer 在每个时间框架
+K线收盘后，为该时间框架下最热门的交易对提前计算预测并写入共享的预测缓存，
+用户请求因此大多直接命中缓存。多个worker各自运行预热任务，每个 (交易对, 时间框架, K线)
+先用 SET NX 抢占共享租约，只有抢到的worker计算，其他worker随后直接读取缓存。
+预热请求在LLM队列中使用单独的 warm 等级：优先级低于所有会员，但排队时间更长，不会因短暂拥塞被丢弃。
+
+热度在每个worker内独立统计，请求分散到多个worker时，min_count 相当于按单个worker的请求数计算
+（N个worker大致需要 N 倍的总请求量），多worker部署可相应调低 PREDICTION_WARM_MIN_REQUESTS。
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from llm_governor import WARM_TIER
+from prediction_cache import TIMEFRAME_SECONDS, bar_bounds
+
+
+class PopularityTracker:
+    """最近window秒内各 (交易对, 时间框架) 的请求次数"""
+
+    def __init__(self, window: int = 3600, bucket_seconds: int = 60):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        # (分钟开始时间, 计数)
+        self._buckets: deque = deque()
+
+    def record(self, symbol: str, timeframes: Iterable[str], now: Optional[float] = None):
+        """记录一次预测请求"""
+        now = time.time() if now is None else now
+        bucket = int(now // self.bucket_seconds * self.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != bucket:
+            self._buckets.append((bucket, Counter()))
+            self._expire(now)
+        counts = self._buckets[-1][1]
+        for timeframe in timeframes:
+            counts[(symbol, timeframe)] += 1
+
+    def top(self, n: int, min_count: int = 1, now: Optional[float] = None,
+            timeframes: Optional[Iterable[str]] = None) -> List[Tuple[Tuple[str, str], int]]:
+        """请求次数最多的n个 (交易对, 时间框架)，指定timeframes时只在这些时间框架内排名"""
+        self._expire(time.time() if now is None else now)
+        total = Counter()
+        for _, counts in self._buckets:
+            total.update(counts)
+        if timeframes is not None:
+            allowed = set(timeframes)
+            total = Counter({pair: count for pair, count in total.items() if pair[1] in allowed})
+        return [(pair, count) for pair, count in total.most_common(n) if count >= min_count]
+
+    def _expire(self, now: float):
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+
+
+class PredictionWarmer:
+    """K线收盘后预热热门预测"""
+
+    def __init__(self, prediction_service, market_snapshot, tracker: PopularityTracker,
+                 top_n: int = 20, min_count: int = 2, delay: float = 1.0, lease_store=None):
+        self.prediction_service = prediction_service
+        self.market_snapshot = market_snapshot
+        self.tracker = tracker
+        # lease_store 需提供 set_nx（如 cache.AsyncCache），为空时不做跨worker去重
+        self.lease_store = lease_store
+        self.top_n = top_n
+        self.min_count = min_count
+        # 收盘后等待行情更新到新K线的时间（秒）
+        self.delay = delay
+        self.runs = 0
+        self.warmed = 0
+        self.leased_elsewhere = 0
+        self.last_run_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """启动后台预热任务"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                now = time.time()
+                closes = {timeframe: bar_bounds(timeframe, now)[1] for timeframe in TIMEFRAME_SECONDS}
+                next_close = min(closes.values())
+                await asyncio.sleep(max(next_close - now, 0) + self.delay)
+                await self.warm([timeframe for timeframe, close in closes.items() if close == next_close])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"预测预热失败: {e}")
+                await asyncio.sleep(self.delay)
+
+    async def warm(self, timeframes: List[str]) -> int:
+        """为刚收盘的时间框架预热热门交易对，返回预热的 (交易对, 时间框架) 数"""
+        by_symbol: Dict[str, List[str]] = {}
+        # 只在刚收盘的时间框架内排名，避免1m/5m等高频时间框架挤占长周期的名额
+        for (symbol, timeframe), _ in self.tracker.top(self.top_n, self.min_count, timeframes=timeframes):
+            if await self._acquire_lease(symbol, timeframe):
+                by_symbol.setdefault(symbol, []).append(timeframe)
+        if not by_symbol:
+            return 0
+
+        started = time.perf_counter()
+        jobs = []
+        count = 0
+        for symbol, symbol_timeframes in by_symbol.items():
+            market_data = self.market_snapshot.get_symbol_data(symbol)
+            if market_data:
+                jobs.append(self.prediction_service.predict(symbol, symbol_timeframes, market_data,
+                                                            membership_level=WARM_TIER))
+                count += len(symbol_timeframes)
+        await asyncio.gather(*jobs)
+
+        self.runs += 1
+        self.warmed += count
+        self.last_run_ms = round((time.perf_counter() - started) * 1000, 1)
+        logging.info(f"已预热 {count} 个预测，用时 {self.last_run_ms}ms")
+        return count
+
+    async def _acquire_lease(self, symbol: str, timeframe: str) -> bool:
+        """抢占当前K线的预热租约，已被其他worker抢占时返回False"""
+        if self.lease_store is None:
+            return True
+        bar_open, bar_close = bar_bounds(timeframe)
+        ttl = max(bar_close - time.time(), 1)
+        try:
+            acquired = await self.lease_store.set_nx(f"prediction_warm:{symbol}:{timeframe}:{bar_open}", "1", ttl)
+        except Exception as e:
+            logging.warning(f"获取预热租约失败: {e}")
+            return True
+        if not acquired:
+            self.leased_elsewhere += 1
+        return acquired
+
+    def get_stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "warmed": self.warmed,
+            "leased_elsewhere": self.leased_elsewhere,
+            "last_run_ms": self.last_run_ms,
+            "popular": [
+                {"symbol": symbol, "timeframe": timeframe, "requests": count}
+                for (symbol, timeframe), count in self.tracker.top(self.top_n, self.min_count)
+            ]
+        }
+
+
+def create_prediction_warmer(prediction_service, market_snapshot, tracker: PopularityTracker,
+                             lease_store=None) -> PredictionWarmer:
+    """根据环境变量创建预测预热任务"""
+    return PredictionWarmer(
+        prediction_service,
+        market_snapshot,
+        tracker,
+        lease_store=lease_store,
+        top_n=int(os.getenv("PREDICTION_WARM_TOP_N", "20")),
+        min_count=int(os.getenv("PREDICTION_WARM_MIN_REQUESTS", "2"))
+    )
@@ -0,0 +1,208 @@
+"""
+价格历史 - 每个交易对一个按分钟聚合的NumPy环形缓冲区
+
+行情广播循环把各交易所的最新价格（均价）写入缓冲区，同一分钟内只保留最后价格，
+任意时间框架的K线收盘价由分钟序列向量化聚合得到。
+技术分析的趋势、波动率和动量特征全部基于这些收盘价向量化计算。
+采集端用 KlineRecorder 把同样的分钟收盘价写入klines表。
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from prediction_cache import bar_bounds, bar_offset, timeframe_seconds
+
+
+def snapshot_price(exchanges: Dict[str, Dict], now: float) -> Optional[Tuple[float, float]]:
+    """单个交易对的行情快照 -> (时间戳秒, 各交易所均价)，无有效价格时返回None"""
+    prices = [data["price"] for data in exchanges.values() if data.get("price")]
+    if not prices:
+        return None
+    timestamps = [data.get("timestamp") or 0 for data in exchanges.values()]
+    timestamp = max(timestamps) / 1000 if max(timestamps) else now
+    return timestamp, sum(prices) / len(prices)
+
+
+class _SymbolBuffer:
+    """单个交易对的分钟收盘价环形缓冲区"""
+
+    __slots__ = ("times", "prices", "start", "size")
+
+    def __init__(self, capacity: int):
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.prices = np.zeros(capacity, dtype=np.float64)
+        self.start = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.times)
+
+    def append(self, bucket: int, price: float):
+        if self.size:
+            last = (self.start + self.size - 1) % self.capacity
+            if bucket == self.times[last]:
+                # 同一分钟内只保留最后价格
+                self.prices[last] = price
+                return
+            if bucket < self.times[last]:
+                # 乱序的旧数据直接丢弃
+                return
+
+        if self.size < self.capacity:
+            index = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            # 缓冲区已满，覆盖最旧的数据
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[index] = bucket
+        self.prices[index] = price
+
+    def tail(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """按时间顺序返回最近count个点"""
+        count = min(count, self.size)
+        end = self.start + self.size
+        index = np.arange(end - count, end)
+        return self.times.take(index, mode="wrap"), self.prices.take(index, mode="wrap")
+
+
+class PriceHistory:
+    """各交易对的价格历史"""
+
+    def __init__(self, capacity: int = 10080, resolution: int = 60):
+        # 默认保存7天的分钟数据
+        self.capacity = capacity
+        self.resolution = resolution
+        self._buffers: Dict[str, _SymbolBuffer] = {}
+
+    def append(self, symbol: str, timestamp: float, price: float):
+        """记录一个价格点（timestamp为Unix秒）"""
+        if not price or price <= 0:
+            return
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            buffer = self._buffers[symbol] = _SymbolBuffer(self.capacity)
+        buffer.append(int(timestamp // self.resolution * self.resolution), float(price))
+
+    def load(self, symbol: str, times: np.ndarray, prices: np.ndarray):
+        """批量导入历史分钟收盘价（启动时从K线表预热）"""
+        for timestamp, price in zip(times, prices):
+            self.append(symbol, float(timestamp), float(price))
+
+    def update_from_market_data(self, market_data: Dict[str, Dict[str, Dict]]):
+        """用行情快照（交易对 -> 交易所 -> 行情）更新历史，价格取各交易所均价"""
+        now = time.time()
+        for symbol, exchanges in market_data.items():
+            point = snapshot_price(exchanges, now)
+            if point is not None:
+                self.append(symbol, *point)
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def size(self, symbol: str) -> int:
+        buffer = self._buffers.get(symbol)
+        return buffer.size if buffer else 0
+
+    def bars(self, symbol: str, timeframe: str, count: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+        """返回最近count根K线的开盘时间和收盘价（最后一根为当前未收盘K线的最新价）"""
+        buffer = self._buffers.get(symbol)
+        if buffer is None or buffer.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        per_bar = max(timeframe_seconds(timeframe) // self.resolution, 1)
+        times, prices = buffer.tail((count + 1) * per_bar)
+        bar_opens, closes = resample_closes(times, prices, timeframe)
+        return bar_opens[-count:], closes[-count:]
+
+    def closed_bars(self, symbol: str, timeframe: str, count: int = 100,
+                    now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """返回最近count根已收盘K线（与训练使用的K线一致，不含当前未收盘K线）"""
+        bar_opens, closes = self.bars(symbol, timeframe, count + 1)
+        bar_opens, closes = drop_open_bar(bar_opens, closes, timeframe, now)
+        return bar_opens[-count:], closes[-count:]
+
+
+class KlineRecorder:
+    """把行情快照聚合为分钟K线并提交给批量写入器
+
+    只应在唯一的行情采集端（ingest_worker 或 embedded 模式）中运行。
+    """
+
+    def __init__(self, writer, resolution: int = 60):
+        self.writer = writer
+        self.resolution = resolution
+        # 交易对 -> (当前分钟开盘时间, 最新价格)
+        self._current: Dict[str, Tuple[int, float]] = {}
+
+    def update(self, market_data: Dict[str, Dict[str, Dict]]):
+        """用行情快照更新，分钟切换时提交上一分钟的收盘价"""
+        now = time.time()
+        for symbol, exchanges in market_data.items():
+            point = snapshot_price(exchanges, now)
+            if point is None:
+                continue
+            timestamp, price = point
+            bucket = int(timestamp // self.resolution * self.resolution)
+
+            current = self._current.get(symbol)
+            if current is not None and bucket > current[0]:
+                self.writer.submit({
+                    "symbol": symbol,
+                    "interval": "1m",
+                    "open_time": current[0],
+                    "close": current[1]
+                })
+            if current is None or bucket >= current[0]:
+                self._current[symbol] = (bucket, price)
+
+
+def resample_closes(times: np.ndarray, prices: np.ndarray, timeframe: str) -> Tuple[np.ndarray, np.ndarray]:
+    """把按时间排序的价格序列聚合为指定时间框架的K线（开盘时间, 收盘价）"""
+    if len(times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    length = timeframe_seconds(timeframe)
+    offset = bar_offset(timeframe)
+    bar_opens = (np.asarray(times, dtype=np.int64) - offset) // length * length + offset
+    # 每根K线取最后一个点作为收盘价
+    last = np.flatnonzero(np.diff(bar_opens))
+    index = np.append(last, len(bar_opens) - 1)
+    return bar_opens[index], np.asarray(prices, dtype=np.float64)[index]
+
+
+def drop_open_bar(bar_opens: np.ndarray, closes: np.ndarray, timeframe: str,
+                  now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """去掉尚未收盘的最后一根K线"""
+    if len(bar_opens) and bar_opens[-1] >= bar_bounds(timeframe, now)[0]:
+        return bar_opens[:-1], closes[:-1]
+    return bar_opens, closes
+
+
+def trend_features(closes: np.ndarray) -> Dict[str, float]:
+    """由收盘价序列计算趋势、波动率和动量特征
+
+    - trend: 对数价格线性回归拟合的区间涨跌幅，按随机游走的期望波动（σ·√n）归一化
+    - volatility: 对数收益率标准差
+    - momentum: 最近10根K线的对数涨跌幅，按波动率归一化
+    """
+    log_prices = np.log(closes)
+    returns = np.diff(log_prices)
+    volatility = float(returns.std()) if len(returns) > 1 else 0.0
+
+    x = np.arange(len(log_prices), dtype=np.float64)
+    x -= x.mean()
+    slope = float(np.dot(x, log_prices - log_prices.mean()) / np.dot(x, x))
+
+    lookback = min(10, len(returns))
+    momentum = float(log_prices[-1] - log_prices[-1 - lookback])
+
+    scale = volatility if volatility > 0 else 1e-9
+    return {
+        "trend": slope * np.sqrt(len(log_prices)) / scale,
+        "volatility": volatility,
+        "momentum": momentum / (scale * np.sqrt(lookback)),
+        "bars": len(closes)
+    }
@@ -0,0 +1,184 @@
+"""
+预测配额服务 - 常数时间的每日配额计数
+
+每个用户每天一个Redis计数器，检查与扣减通过Lua脚本原子完成，
+计数器在当天结束时过期。Redis不可用时退化为进程内计数。
+计数器首次创建时从usage_records加载当日已用次数，之后不再扫描该表。
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import redis.asyncio as aioredis
+
+# 各会员等级每日配额，None 表示不限次数
+QUOTA_LIMITS = {
+    "trial": 50,
+    "basic": 200,
+    "pro": 500,
+    "premium": None
+}
+
+# 原子检查并扣减：计数器不存在且未提供初始值时返回 -1，由调用方加载初始值后重试
+_CONSUME_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    if ARGV[3] == '' then
+        return {-1, 0}
+    end
+    redis.call('SET', KEYS[1], ARGV[3], 'NX')
+    redis.call('EXPIREAT', KEYS[1], ARGV[2])
+    current = redis.call('GET', KEYS[1])
+end
+current = tonumber(current)
+if current >= tonumber(ARGV[1]) then
+    return {0, current}
+end
+current = redis.call('INCR', KEYS[1])
+return {1, current}
+"""
+
+# 退还一次配额：只在计数器存在且大于0时扣减，避免创建没有过期时间的负数计数器
+_REFUND_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]))
+if current and current > 0 then
+    return redis.call('DECR', KEYS[1])
+end
+return -1
+"""
+
+
+def membership_value(level) -> str:
+    """会员等级统一为字符串（兼容数据库中的Enum值）"""
+    return getattr(level, "value", level) or "trial"
+
+
+class QuotaService:
+    """每日预测配额服务"""
+
+    def __init__(self, redis_url: Optional[str] = None,
+                 usage_loader: Optional[Callable[[int, datetime], Awaitable[int]]] = None,
+                 retry_interval: float = 30.0,
+                 redis_client: Optional[aioredis.Redis] = None):
+        # 可传入共享连接池的客户端；否则自行创建
+        self._owns_redis = redis_client is None
+        self.redis = redis_client or aioredis.from_url(
+            redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            decode_responses=True,
+            socket_connect_timeout=1
+        )
+        self.usage_loader = usage_loader
+        self.retry_interval = retry_interval
+        self._script = self.redis.register_script(_CONSUME_SCRIPT)
+        self._refund_script = self.redis.register_script(_REFUND_SCRIPT)
+        self._redis_down_until = 0.0
+        # Redis不可用时的进程内计数: (user_id, 日期) -> 已用次数
+        self._local_counts: Dict[Tuple[int, str], int] = {}
+        self._local_day = ""
+
+    async def consume(self, user_id: int, membership_level) -> Dict:
+        """原子地检查并扣减一次配额，结果中的 day 为扣减所在的日期（退还时传回）"""
+        level = membership_value(membership_level)
+        limit = QUOTA_LIMITS.get(level, 0)
+
+        if limit is None:
+            return {"allowed": True, "remaining": None, "message": "无限制"}
+
+        now = datetime.now()
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                allowed, used = await self._consume_redis(user_id, limit, now)
+                return self._result(allowed, limit, used, now)
+            except aioredis.RedisError as e:
+                logging.warning(f"配额Redis不可用，使用进程内计数: {e}")
+                self._redis_down_until = time.monotonic() + self.retry_interval
+
+        allowed, used = await self._consume_local(user_id, limit, now)
+        return self._result(allowed, limit, used, now)
+
+    async def refund(self, user_id: int, membership_level, day: Optional[str] = None):
+        """退还一次配额（预测未能完成时调用）
+
+        day 为 consume 结果中的日期，跨越午夜的请求退还到扣减当天的计数器；为空时按今天处理。
+        """
+        if QUOTA_LIMITS.get(membership_value(membership_level), 0) is None:
+            return
+
+        day = day or datetime.now().strftime("%Y%m%d")
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                await self._refund_script(keys=[self._key(user_id, day)])
+                return
+            except aioredis.RedisError as e:
+                logging.warning(f"配额退还失败: {e}")
+
+        key = (user_id, day)
+        if self._local_counts.get(key, 0) > 0:
+            self._local_counts[key] -= 1
+
+    async def close(self):
+        if self._owns_redis:
+            await self.redis.aclose()
+
+    async def _consume_redis(self, user_id: int, limit: int, now: datetime) -> Tuple[bool, int]:
+        key = self._key(user_id, now.strftime("%Y%m%d"))
+        expire_at = int(self._end_of_day(now).timestamp())
+
+        status, used = await self._script(keys=[key], args=[limit, expire_at, ""])
+        if status == -1:
+            # 当天首次使用，从审计记录加载已用次数作为初始值
+            initial = await self._load_usage(user_id, now)
+            status, used = await self._script(keys=[key], args=[limit, expire_at, initial])
+
+        return status == 1, int(used)
+
+    async def _consume_local(self, user_id: int, limit: int, now: datetime) -> Tuple[bool, int]:
+        day = now.strftime("%Y%m%d")
+        if day != self._local_day:
+            self._local_counts.clear()
+            self._local_day = day
+
+        key = (user_id, day)
+        if key not in self._local_counts:
+            initial = await self._load_usage(user_id, now)
+            self._local_counts.setdefault(key, initial)
+
+        used = self._local_counts[key]
+        if used >= limit:
+            return False, used
+
+        self._local_counts[key] = used + 1
+        return True, used + 1
+
+    async def _load_usage(self, user_id: int, now: datetime) -> int:
+        if self.usage_loader is None:
+            return 0
+        try:
+            return int(await self.usage_loader(user_id, self._start_of_day(now)))
+        except Exception as e:
+            logging.error(f"加载用户 {user_id} 当日用量失败: {e}")
+            return 0
+
+    def _result(self, allowed: bool, limit: int, used: int, now: datetime) -> Dict:
+        remaining = max(0, limit - used)
+        return {
+            "allowed": allowed,
+            "remaining": remaining,
+            "day": now.strftime("%Y%m%d"),
+            "message": f"今日剩余 {remaining} 次预测" if allowed else "今日预测次数已用完"
+        }
+
+    @staticmethod
+    def _key(user_id: int, day: str) -> str:
+        return f"quota:{user_id}:{day}"
+
+    @staticmethod
+    def _start_of_day(now: datetime) -> datetime:
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def _end_of_day(cls, now: datetime) -> datetime:
+        return cls._start_of_day(now) + timedelta(days=1)
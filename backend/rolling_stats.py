@@ -0,0 +1,94 @@
+"""
+滚动窗口统计 - 长度为n的序列上一次算出所有窗口的结果，耗时与窗口长度无关
+
+结果与 mode='valid' 一致：第i个值对应 values[i:i+period]，共 n-period+1 个，
+序列短于窗口时返回空数组。均值/方差基于前缀和；为避免大数相减的精度损失，
+窗口按起点分块，每块减去块内均值后单独累加，误差只与局部波动有关，
+长期趋势（价格远离整体均值）不会放大误差。最值使用 van Herk/Gil-Werman 分块前缀/后缀最值。
+所有函数都沿最后一维计算，二维输入（交易对 × K线）一次得到每行的结果。
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 每块至少包含的窗口数（且不少于4倍窗口长度，使块间重叠部分的额外开销不超过1/4）
+BLOCK = 1024
+
+
+def _prepare(values, period: int) -> np.ndarray:
+    if period < 1:
+        raise ValueError("period必须为正整数")
+    return np.asarray(values, dtype=np.float64)
+
+
+def _empty(values: np.ndarray) -> np.ndarray:
+    return np.empty(values.shape[:-1] + (0,))
+
+
+def _local_sums(values: np.ndarray, period: int, squares: bool = False):
+    """各窗口以所在块均值为基准的 (和, 平方和, 基准)"""
+    leading, n = values.shape[:-1], values.shape[-1]
+    count = n - period + 1
+    block = min(max(BLOCK, 4 * period), count)
+    blocks = -(-count // block)
+    # 补齐到整块，补上的窗口最后丢弃
+    padded = np.empty(leading + (blocks * block + period - 1,))
+    padded[..., :n] = values
+    padded[..., n:] = values[..., -1:]
+    segments = sliding_window_view(padded, block + period - 1, axis=-1)[..., ::block, :]
+    anchor = segments.mean(axis=-1, keepdims=True)
+    centered = segments - anchor
+    zeros = np.zeros(centered.shape[:-1] + (1,))
+
+    def window_sums(x: np.ndarray) -> np.ndarray:
+        cumsum = np.concatenate((zeros, np.cumsum(x, axis=-1)), axis=-1)
+        return (cumsum[..., period:] - cumsum[..., :block]).reshape(leading + (-1,))[..., :count]
+
+    anchors = np.broadcast_to(anchor, anchor.shape[:-1] + (block,)).reshape(leading + (-1,))[..., :count]
+    return window_sums(centered), window_sums(centered * centered) if squares else None, anchors
+
+
+def rolling_mean(values, period: int) -> np.ndarray:
+    """滚动均值"""
+    values = _prepare(values, period)
+    if values.shape[-1] < period:
+        return _empty(values)
+    sums, _, anchors = _local_sums(values, period)
+    return sums / period + anchors
+
+
+def rolling_var(values, period: int, ddof: int = 0) -> np.ndarray:
+    """滚动方差（ddof=0 与 np.var 一致）"""
+    values = _prepare(values, period)
+    if values.shape[-1] < period:
+        return _empty(values)
+    sums, squares, _ = _local_sums(values, period, squares=True)
+    var = (squares - sums * sums / period) / (period - ddof)
+    # 舍入误差可能产生极小的负数
+    return np.maximum(var, 0.0)
+
+
+def rolling_std(values, period: int, ddof: int = 0) -> np.ndarray:
+    """滚动标准差（ddof=0 与 np.std 一致）"""
+    return np.sqrt(rolling_var(values, period, ddof))
+
+
+def rolling_max(values, period: int) -> np.ndarray:
+    """滚动最大值"""
+    values = _prepare(values, period)
+    n = values.shape[-1]
+    if n < period:
+        return _empty(values)
+    # 按窗口长度分块，每个窗口 = 前一块的后缀最大值 与 后一块的前缀最大值
+    leading = values.shape[:-1]
+    padded = np.full(leading + (-(-n // period) * period,), -np.inf)
+    padded[..., :n] = values
+    blocks = padded.reshape(leading + (-1, period))
+    prefix = np.maximum.accumulate(blocks, axis=-1).reshape(padded.shape)
+    suffix = np.maximum.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)
+    return np.maximum(suffix[..., :n - period + 1], prefix[..., period - 1:n])
+
+
+def rolling_min(values, period: int) -> np.ndarray:
+    """滚动最小值"""
+    return -rolling_max(-_prepare(values, period), period)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+回测策略
+
+从klines表读取分钟K线，按时间框架重采样后对 AIStrategyService 的策略做向量化回测：
+    python run_backtest.py --symbol BTCUSDT --strategies ma_cross ai_enhanced_ma --timeframe 15m
+K线表不含成交量，成交量比率按1处理。
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from backtester import FEE_RATE, SIGNAL_GENERATORS, run_backtest
+from database import SessionLocal
+from kline_store import load_klines_sync
+from price_history import resample_closes
+
+# 加载环境变量
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv是可选的
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回测交易策略")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--strategies", nargs="+", default=list(SIGNAL_GENERATORS), choices=list(SIGNAL_GENERATORS))
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--days", type=float, default=0, help="只回测最近N天（0为全部）")
+    parser.add_argument("--fee", type=float, default=FEE_RATE)
+    parser.add_argument("--min-confidence", type=float, default=0.0)
+    parser.add_argument("--allow-short", action="store_true")
+    parser.add_argument("--max-hold", type=int, default=None, help="最长持仓K线数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    since = int(time.time() - args.days * 86400) if args.days else 0
+    with SessionLocal() as session:
+        times, closes = load_klines_sync(session, args.symbol, since)
+    _, bars = resample_closes(times, closes, args.timeframe)
+    if len(bars) < 60:
+        raise SystemExit(f"K线不足（{len(bars)}），请先运行采集进程积累K线")
+
+    for strategy_id in args.strategies:
+        started = time.perf_counter()
+        result = run_backtest(
+            strategy_id, bars, timeframe=args.timeframe, fee=args.fee,
+            min_confidence=args.min_confidence, allow_short=args.allow_short, max_hold=args.max_hold
+        )
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        print(json.dumps(dict(result, symbol=args.symbol), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
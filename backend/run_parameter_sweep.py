@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+策略参数搜索
+
+从klines表读取分钟K线，按时间框架重采样后在进程池中搜索策略参数并做滚动前进验证，
+排序结果保存到 SWEEP_RESULTS_DIR（默认 backend/sweep_results）：
+    python run_parameter_sweep.py --symbol BTCUSDT --strategies ma_cross --timeframe 15m --search random --samples 100
+K线表不含成交量，成交量比率按1处理。
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from backtester import FEE_RATE
+from database import SessionLocal
+from kline_store import load_klines_sync
+from parameter_sweep import DEFAULT_SWEEP_DIR, PARAM_SPACES, run_sweep, save_sweep
+from price_history import resample_closes
+
+# 加载环境变量
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv是可选的
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索交易策略参数")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--strategies", nargs="+", default=list(PARAM_SPACES), choices=list(PARAM_SPACES))
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--days", type=float, default=0, help="只使用最近N天（0为全部）")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--samples", type=int, default=50, help="随机搜索的参数组数")
+    parser.add_argument("--folds", type=int, default=4)
+    parser.add_argument("--train-multiple", type=int, default=3, help="训练区间为测试区间的倍数")
+    parser.add_argument("--objective", choices=["sharpe", "total_return"], default="sharpe")
+    parser.add_argument("--min-trades", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认CPU核数）")
+    parser.add_argument("--fee", type=float, default=FEE_RATE)
+    parser.add_argument("--min-confidence", type=float, default=0.0)
+    parser.add_argument("--allow-short", action="store_true")
+    parser.add_argument("--max-hold", type=int, default=None, help="最长持仓K线数")
+    parser.add_argument("--output", default=DEFAULT_SWEEP_DIR)
+    parser.add_argument("--top", type=int, default=5, help="输出排名前N的参数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    since = int(time.time() - args.days * 86400) if args.days else 0
+    with SessionLocal() as session:
+        times, closes = load_klines_sync(session, args.symbol, since)
+    _, bars = resample_closes(times, closes, args.timeframe)
+
+    for strategy_id in args.strategies:
+        try:
+            result = run_sweep(
+                strategy_id, bars, search=args.search, samples=args.samples, folds=args.folds,
+                train_multiple=args.train_multiple, objective=args.objective, min_trades=args.min_trades,
+                workers=args.workers, timeframe=args.timeframe, fee=args.fee,
+                min_confidence=args.min_confidence, allow_short=args.allow_short, max_hold=args.max_hold
+            )
+        except ValueError as e:
+            raise SystemExit(f"K线不足（{len(bars)}），请先运行采集进程积累K线: {e}")
+        result['symbol'] = args.symbol
+        path = save_sweep(result, args.output)
+        summary = {key: result[key] for key in ('strategy', 'evaluated', 'elapsed_s', 'recommended', 'out_of_sample_return')}
+        print(json.dumps(dict(summary, symbol=args.symbol, top=result['ranked'][:args.top], saved=path), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+离线训练本地AI模型
+
+从klines表读取分钟K线，按各时间框架重采样后构建窗口特征，
+训练多分类逻辑回归并保存到 AI_MODEL_DIR（默认 backend/ai_model）：
+    python train_ai_model.py --symbols BTCUSDT ETHUSDT --timeframes 1m 5m 15m 1h
+应用进程在启动时以内存映射方式加载模型。
+"""
+
+import argparse
+import logging
+
+import numpy as np
+
+from ai_model import CLASSES, build_dataset, model_dir, save_model, softmax, train_softmax
+from database import SessionLocal
+from kline_store import load_klines_sync
+from price_history import drop_open_bar, resample_closes
+
+# 加载环境变量
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # dotenv是可选的
+
+
+def collect_dataset(symbols, timeframes, horizon: int, threshold: float, validation: float):
+    """汇总所有交易对和时间框架的样本，每组按时间顺序切出末尾的验证集"""
+    train, valid = ([], []), ([], [])
+    with SessionLocal() as session:
+        for symbol in symbols:
+            times, closes = load_klines_sync(session, symbol)
+            for timeframe in timeframes:
+                _, bars = drop_open_bar(*resample_closes(times, closes, timeframe), timeframe)
+                x, y = build_dataset(bars, horizon, threshold)
+                logging.info(f"{symbol} {timeframe}: {len(bars)} 根K线, {len(y)} 个样本")
+                split = int(len(y) * (1 - validation))
+                train[0].append(x[:split])
+                train[1].append(y[:split])
+                valid[0].append(x[split:])
+                valid[1].append(y[split:])
+    return [np.concatenate(part) for part in train], [np.concatenate(part) for part in valid]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练本地AI预测模型")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--timeframes", nargs="+", default=["1m", "5m", "15m", "1h"])
+    parser.add_argument("--horizon", type=int, default=1, help="预测未来几根K线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="方向判定阈值（窗口波动率的倍数）")
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--validation", type=float, default=0.2, help="按时间顺序留出的验证集比例")
+    parser.add_argument("--output", default=None, help="模型目录，默认为 AI_MODEL_DIR 或 backend/ai_model")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    (train_x, train_y), (valid_x, valid_y) = collect_dataset(
+        args.symbols, args.timeframes, args.horizon, args.threshold, args.validation
+    )
+    if len(train_y) < 100:
+        raise SystemExit(f"样本不足（{len(train_y)}），请先运行采集进程积累K线")
+
+    weights = train_softmax(train_x, train_y, epochs=args.epochs)
+
+    accuracy = None
+    if len(valid_y):
+        predicted = softmax(valid_x @ weights[:-1] + weights[-1]).argmax(axis=1)
+        accuracy = round(float((predicted == valid_y).mean()), 4)
+    distribution = {name: int((train_y == i).sum()) for i, name in enumerate(CLASSES)}
+    logging.info(f"训练样本: {len(train_y)}，类别分布: {distribution}，验证集准确率: {accuracy}")
+
+    output = args.output or model_dir()
+    save_model(weights, {
+        "symbols": args.symbols,
+        "timeframes": args.timeframes,
+        "horizon": args.horizon,
+        "threshold": args.threshold,
+        "samples": len(train_y),
+        "validation_accuracy": accuracy
+    }, output)
+    logging.info(f"模型已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
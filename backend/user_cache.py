@@ -0,0 +1,222 @@
+"""
+认证用户缓存 - 避免每个认证请求都按邮箱查询users表
+
+缓存键为JWT中的sub（邮箱），值为用户信息快照，短TTL过期。
+用户记录被更新（如会员激活）或删除时主动失效。缓存在每个worker内独立，
+多worker部署设置 USER_CACHE_PUBSUB=true 后，事务提交时通过Redis pub/sub通知所有worker失效；
+未开启时其他worker最多在TTL（默认30秒）内仍使用旧的会员等级。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import User
+
+USER_INVALIDATION_CHANNEL = "user_cache:invalidate"
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """用户信息快照（脱离数据库会话，可安全跨请求共享）"""
+    id: int
+    username: str
+    email: str
+    phone: Optional[str]
+    membership_level: str
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        level = user.membership_level
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            phone=user.phone,
+            membership_level=getattr(level, "value", level) or "trial",
+            created_at=user.created_at
+        )
+
+
+class UserCache:
+    """带TTL的认证用户缓存"""
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: Dict[str, Tuple[float, UserSnapshot]] = {}
+        self._emails_by_id: Dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+        # 通知其他worker失效的回调 publisher(user_id, email)，单进程部署为空
+        self.publisher: Optional[Callable[[Optional[int], Optional[str]], None]] = None
+
+    def get(self, email: str) -> Optional[UserSnapshot]:
+        entry = self._entries.get(email)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, snapshot: UserSnapshot):
+        if len(self._entries) >= self.max_size:
+            self._evict_expired()
+            if len(self._entries) >= self.max_size:
+                self.clear()
+
+        self._entries[snapshot.email] = (time.monotonic() + self.ttl, snapshot)
+        self._emails_by_id[snapshot.id] = snapshot.email
+
+    def invalidate(self, email: Optional[str] = None, user_id: Optional[int] = None):
+        """按邮箱或用户ID使缓存失效"""
+        if email is None and user_id is not None:
+            email = self._emails_by_id.pop(user_id, None)
+        if email is not None:
+            entry = self._entries.pop(email, None)
+            if entry is not None:
+                self._emails_by_id.pop(entry[1].id, None)
+
+    def broadcast(self, user_id: Optional[int] = None, email: Optional[str] = None):
+        """通知其他worker使该用户的缓存失效"""
+        if self.publisher is not None:
+            self.publisher(user_id, email)
+
+    def clear(self):
+        self._entries.clear()
+        self._emails_by_id.clear()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for email, (expires_at, snapshot) in list(self._entries.items()):
+            if expires_at < now:
+                del self._entries[email]
+                self._emails_by_id.pop(snapshot.id, None)
+
+
+class UserCacheBroadcaster:
+    """通过Redis pub/sub在worker之间广播用户缓存失效
+
+    失效在同步的ORM提交事件中产生（可能在事件循环线程内），这里只把它放入队列，
+    由独立任务通过异步客户端发布，Redis变慢或不可用时不会阻塞事件循环。
+    """
+
+    def __init__(self, cache: UserCache, redis_url: str, max_pending: int = 10000):
+        self.cache = cache
+        self.redis = aioredis.from_url(redis_url, decode_responses=True)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self.dropped = 0
+
+    def publish(self, user_id: Optional[int], email: Optional[str]):
+        """提交失效通知（可在任意线程调用，不阻塞）"""
+        if self._loop is None or self._loop.is_closed():
+            self.dropped += 1
+            return
+        self._loop.call_soon_threadsafe(self._enqueue, (user_id, email))
+
+    def _enqueue(self, item: Tuple[Optional[int], Optional[str]]):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # 其他worker最多在TTL内使用旧数据
+            self.dropped += 1
+
+    def start(self):
+        """启动发布和订阅任务"""
+        if not self._tasks:
+            self._loop = asyncio.get_running_loop()
+            self._tasks = [asyncio.create_task(self._publish_loop()), asyncio.create_task(self._listen())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._loop = None
+        await self.redis.aclose()
+
+    async def _publish_loop(self):
+        while True:
+            user_id, email = await self._queue.get()
+            try:
+                await self.redis.publish(USER_INVALIDATION_CHANNEL, json.dumps({"user_id": user_id, "email": email}))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"广播用户缓存失效失败: {e}")
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(USER_INVALIDATION_CHANNEL)
+                try:
+                    async for message in pubsub.listen():
+                        if message and message.get("type") == "message":
+                            self.handle(message["data"])
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"用户缓存失效订阅中断，5秒后重连: {e}")
+                await asyncio.sleep(5)
+
+    def handle(self, message: str):
+        data = json.loads(message)
+        self.cache.invalidate(user_id=data.get("user_id"))
+        self.cache.invalidate(email=data.get("email"))
+
+
+# 全局用户缓存实例
+user_cache = UserCache(ttl=float(os.getenv("USER_CACHE_TTL", "30")))
+
+
+def create_user_cache_broadcaster(cache: UserCache = user_cache) -> Optional[UserCacheBroadcaster]:
+    """USER_CACHE_PUBSUB=true 时创建跨worker失效广播，否则返回None"""
+    if os.getenv("USER_CACHE_PUBSUB", "false").lower() != "true":
+        return None
+    broadcaster = UserCacheBroadcaster(cache, os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    cache.publisher = broadcaster.publish
+    return broadcaster
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    """用户记录更新或删除后使缓存失效（邮箱变更时新旧键都失效），提交后再通知其他worker"""
+    user_cache.invalidate(user_id=target.id)
+    user_cache.invalidate(email=target.email)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("updated_users", set()).add((target.id, target.email))
+
+
+@event.listens_for(Session, "after_commit")
+def _broadcast_committed_users(session):
+    """事务提交后再失效一次并广播，避免提交前有请求读到旧记录并重新缓存"""
+    for user_id, email in session.info.pop("updated_users", ()):
+        user_cache.invalidate(user_id=user_id)
+        user_cache.invalidate(email=email)
+        user_cache.broadcast(user_id, email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_users(session):
+    session.info.pop("updated_users", None)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+EMA/MACD基准测试 - 逐点循环 vs 向量化递归滤波
+
+对1万到100万点的随机游走价格，分别测量原Python循环EMA、scipy.signal.lfilter
+以及无scipy时的NumPy分块实现，并测量一次完整MACD的耗时。
+
+用法:
+    python benchmarks/bench_ema.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import ai_strategy_service
+from ai_strategy_service import AIStrategyService, _ema_blocks
+
+
+def loop_ema(prices: np.ndarray, period: int) -> np.ndarray:
+    alpha = 2 / (period + 1)
+    ema = np.zeros_like(prices)
+    ema[0] = prices[0]
+    for i in range(1, len(prices)):
+        ema[i] = alpha * prices[i] + (1 - alpha) * ema[i-1]
+    return ema
+
+
+def timed(func, repeat: int) -> float:
+    """最快一次的耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EMA/MACD基准测试")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--period", type=int, default=26)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = AIStrategyService()
+    alpha = 2 / (args.period + 1)
+    print(f"scipy: {'可用' if ai_strategy_service.lfilter is not None else '不可用'}  周期: {args.period}")
+    print(f"{'点数':>10}{'循环ms':>12}{'lfilter ms':>12}{'NumPy ms':>12}{'MACD ms':>12}{'最大误差':>12}")
+    for size in args.sizes:
+        prices = np.random.default_rng(0).normal(0, 0.001, size).cumsum()
+        prices = 43250.0 * np.exp(prices)
+
+        expected = loop_ema(prices, args.period)
+        loop_ms = timed(lambda: loop_ema(prices, args.period), 1)
+        numpy_ms = timed(lambda: _ema_blocks(prices, alpha), args.repeat)
+        if ai_strategy_service.lfilter is not None:
+            lfilter_ms = f"{timed(lambda: ai_strategy_service.exponential_moving_average(prices, args.period), args.repeat):.2f}"
+        else:
+            lfilter_ms = "-"
+        macd_ms = timed(lambda: service._calculate_macd(prices), args.repeat)
+        error = np.max(np.abs(ai_strategy_service.exponential_moving_average(prices, args.period) - expected) / expected)
+
+        print(f"{size:>10}{loop_ms:>12.2f}{lfilter_ms:>12}{numpy_ms:>12.2f}{macd_ms:>12.2f}{error:>12.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+事件循环延迟基准测试 - 同步Session与异步Session对比
+
+在同一个事件循环中同时运行：
+  * 模拟WebSocket广播（每100ms向所有客户端推送一次行情）
+  * 模拟API请求（认证查询 + 当日用量统计 + 写入使用记录）
+  * 延迟探针（每10ms唤醒一次，记录实际唤醒延迟）
+
+用法:
+    python benchmarks/bench_event_loop_lag.py --requests 400 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# 基准测试使用临时SQLite库，避免导入database时连接默认的PostgreSQL
+os.environ.setdefault("DATABASE_URL", "sqlite:///./crypto_prediction.db")
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_async_db_engine
+from models import UsageRecord, User
+
+PROBE_INTERVAL = 0.01
+
+
+def seed_database(url: str, users: int, records_per_user: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(users)
+        ])
+        conn.execute(insert(UsageRecord), [
+            {"user_id": i + 1, "prediction_type": "prediction",
+             "timestamp": now - timedelta(minutes=j % 600)}
+            for i in range(users) for j in range(records_per_user)
+        ])
+    engine.dispose()
+
+
+async def lag_probe(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def websocket_broadcast(clients: int, stop: asyncio.Event) -> int:
+    queues = [asyncio.Queue(maxsize=1) for _ in range(clients)]
+    payload = {"BTCUSDT": {"binance": {"price": 43250.0, "volume_24h": 12345.0}}}
+    sent = 0
+    while not stop.is_set():
+        message = json.dumps({"type": "market_update", "data": payload})
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+            sent += 1
+        await asyncio.sleep(0.1)
+    return sent
+
+
+def sync_request(SessionLocal, user_id: int):
+    """旧实现：在事件循环线程中直接执行同步查询"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == f"user{user_id - 1}@example.com").first()
+        since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        db.query(UsageRecord).filter(UsageRecord.user_id == user.id, UsageRecord.timestamp >= since).count()
+        db.add(UsageRecord(user_id=user.id, prediction_type="prediction", timestamp=datetime.now()))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_request(AsyncSessionLocal, user_id: int):
+    """新实现：异步Session，查询期间让出事件循环"""
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(
+            select(User).where(User.email == f"user{user_id - 1}@example.com")
+        )).scalar_one()
+        since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        await db.execute(
+            select(func.count(UsageRecord.id)).where(
+                UsageRecord.user_id == user.id, UsageRecord.timestamp >= since
+            )
+        )
+        db.add(UsageRecord(user_id=user.id, prediction_type="prediction", timestamp=datetime.now()))
+        await db.commit()
+
+
+async def run_mode(mode: str, url: str, args) -> dict:
+    if mode == "sync":
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        SessionLocal = sessionmaker(bind=engine)
+
+        async def handle(user_id):
+            sync_request(SessionLocal, user_id)
+    else:
+        engine = create_async_db_engine(url)
+        AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def handle(user_id):
+            await async_request(AsyncSessionLocal, user_id)
+
+    stop = asyncio.Event()
+    samples: list = []
+    probe = asyncio.create_task(lag_probe(samples, stop))
+    broadcaster = asyncio.create_task(websocket_broadcast(args.clients, stop))
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            await handle(i % args.users + 1)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    await broadcaster
+
+    if mode == "sync":
+        engine.dispose()
+    else:
+        await engine.dispose()
+
+    samples.sort()
+    return {
+        "mode": mode,
+        "requests_per_sec": args.requests / elapsed,
+        "lag_p50_ms": statistics.median(samples) * 1000,
+        "lag_p99_ms": samples[int(len(samples) * 0.99) - 1] * 1000,
+        "lag_max_ms": samples[-1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件循环延迟基准测试")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--records-per-user", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=500, help="模拟WebSocket客户端数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed_database(url, args.users, args.records_per_user)
+
+        print(f"{'模式':<6}{'请求/秒':>10}{'p50延迟ms':>12}{'p99延迟ms':>12}{'最大延迟ms':>12}")
+        for mode in ("sync", "async"):
+            result = asyncio.run(run_mode(mode, url, args))
+            print(f"{result['mode']:<6}{result['requests_per_sec']:>10.1f}"
+                  f"{result['lag_p50_ms']:>12.2f}{result['lag_p99_ms']:>12.2f}{result['lag_max_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+预测延迟基准测试 - 串行路径与并发路径对比
+
+串行路径按旧实现逐个时间框架、逐个模型依次等待；
+并发路径为 PredictionService.predict（时间框架 × 模型并发执行）。
+未配置 DEEPSEEK_API_KEY 时使用模拟的LLM响应延迟。
+
+用法:
+    python benchmarks/bench_prediction_latency.py --timeframes 1m 5m 15m 1h --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from prediction_service import PredictionService
+
+MARKET_DATA = {
+    "binance": {"price": 43250.0, "change_percent_24h": 1.2, "volume_24h": 25000.0},
+    "okx": {"price": 43262.5, "change_percent_24h": 1.1, "volume_24h": 18000.0},
+    "bybit": {"price": 43241.0, "change_percent_24h": 1.3, "volume_24h": 12000.0}
+}
+
+
+async def serial_predict(service: PredictionService, symbol: str, timeframes, market_data):
+    """旧实现：逐个时间框架、逐个模型串行等待"""
+    predictions = {}
+    for timeframe in timeframes:
+        technical = await service.technical_analysis_prediction(symbol, timeframe, market_data)
+        ai = await service.ai_model_prediction(symbol, timeframe, market_data)
+        deepseek = await service.deepseek_analysis(symbol, timeframe, market_data)
+        predictions[timeframe] = service.combine_predictions(technical, ai, deepseek)
+    return predictions
+
+
+async def concurrent_predict(service: PredictionService, symbol: str, timeframes, market_data):
+    """新实现：并发执行（每轮使用不同交易对名，避免命中预测缓存）"""
+    return await service.predict(symbol, timeframes, market_data)
+
+
+async def measure(func, service, timeframes, rounds: int):
+    latencies = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        await func(service, f"BENCH{i}USDT", timeframes, MARKET_DATA)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def run(args):
+    service = PredictionService()
+    print(f"时间框架: {', '.join(args.timeframes)}  轮数: {args.rounds}")
+    print(f"{'路径':<12}{'平均ms':>10}{'中位ms':>10}{'最大ms':>10}")
+    for name, func in (("serial", serial_predict), ("concurrent", concurrent_predict)):
+        latencies = await measure(func, service, args.timeframes, args.rounds)
+        print(f"{name:<12}{statistics.mean(latencies) * 1000:>10.1f}"
+              f"{statistics.median(latencies) * 1000:>10.1f}{max(latencies) * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预测延迟基准测试")
+    parser.add_argument("--timeframes", nargs="+", default=["1m", "5m", "15m", "1h"])
+    parser.add_argument("--rounds", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+技术分析延迟基准测试 - 基于价格历史的向量化特征
+
+向PriceHistory写入7天分钟数据后，测量每个时间框架单次
+technical_analysis_prediction 的耗时（目标为亚毫秒级）。
+
+用法:
+    python benchmarks/bench_technical_analysis.py --iterations 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from price_history import PriceHistory
+from prediction_service import PredictionService
+
+
+def build_history(minutes: int) -> PriceHistory:
+    history = PriceHistory(capacity=minutes)
+    rng = np.random.default_rng(0)
+    prices = 43250.0 * np.exp(np.cumsum(rng.normal(0, 0.001, minutes)))
+    start = int(time.time()) // 60 * 60 - minutes * 60
+    for i, price in enumerate(prices):
+        history.append("BTCUSDT", start + i * 60, price)
+    return history
+
+
+async def run(args):
+    service = PredictionService(price_history=build_history(args.minutes))
+    print(f"分钟数据: {args.minutes}  迭代: {args.iterations}")
+    print(f"{'时间框架':<10}{'平均us':>10}{'方向':>10}")
+    for timeframe in args.timeframes:
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            result = await service.technical_analysis_prediction("BTCUSDT", timeframe, {})
+        elapsed = (time.perf_counter() - started) / args.iterations
+        print(f"{timeframe:<10}{elapsed * 1e6:>10.1f}{result['direction']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技术分析延迟基准测试")
+    parser.add_argument("--timeframes", nargs="+", default=["1m", "5m", "15m", "1h", "4h", "1d"])
+    parser.add_argument("--minutes", type=int, default=10080)
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+多交易对信号基准测试 - 逐个交易对 vs (交易对 × K线) 矩阵批量计算
+
+对N个交易对的随机游走价格，分别测量逐个 run_strategy(MarketData) 与一次
+run_strategy_batch(UniverseData) 的耗时，并检查两者信号一致。
+
+用法:
+    python benchmarks/bench_universe_signals.py --symbols 200 1000 --bars 200
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from ai_strategy_service import AIStrategyService, MarketData, UniverseData
+
+
+def build_universe(symbols: int, bars: int) -> UniverseData:
+    rng = np.random.default_rng(0)
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, (symbols, bars)), axis=1))
+    volumes = rng.uniform(1000, 5000, (symbols, bars))
+    return UniverseData(symbols=[f"SYM{i}USDT" for i in range(symbols)], prices=prices, volumes=volumes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多交易对信号基准测试")
+    parser.add_argument("--symbols", nargs="+", type=int, default=[200, 1000])
+    parser.add_argument("--bars", type=int, default=200)
+    parser.add_argument("--strategy", default="ai_enhanced_ma")
+    args = parser.parse_args()
+
+    print(f"策略: {args.strategy}  K线数: {args.bars}")
+    print(f"{'交易对':>8}{'逐个ms':>12}{'批量ms':>12}{'一致':>8}")
+    for count in args.symbols:
+        universe = build_universe(count, args.bars)
+        timestamps = [datetime.now()] * args.bars
+
+        started = time.perf_counter()
+        single = {}
+        for row, symbol in enumerate(universe.symbols):
+            market_data = MarketData(prices=universe.prices[row], volumes=universe.volumes[row],
+                                     timestamps=timestamps, symbol=symbol)
+            single[symbol] = AIStrategyService().run_strategy(args.strategy, market_data)
+        single_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        batch = AIStrategyService().run_strategy_batch(args.strategy, universe)
+        batch_ms = (time.perf_counter() - started) * 1000
+
+        same = all(single[symbol].signal_type == batch[symbol].signal_type for symbol in universe.symbols)
+        print(f"{count:>8}{single_ms:>12.1f}{batch_ms:>12.1f}{'是' if same else '否':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+测试共用的价格序列生成函数
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def random_walk(n: int, start: float = 43250.0, sigma: float = 0.001, seed: int = 0,
+                shocks: Optional[Dict[int, float]] = None) -> np.ndarray:
+    """几何随机游走价格序列，shocks指定个别K线的对数收益率（如暴跌）"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, sigma, n)
+    for index, value in (shocks or {}).items():
+        returns[index] = value
+    return start * np.exp(np.cumsum(returns))
@@ -0,0 +1,107 @@
+"""
+本地AI模型测试
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from ai_model import DEFAULT_MODEL_DIR, AIModel, WINDOW, build_dataset, model_dir, save_model, train_softmax
+from price_history import KlineRecorder, PriceHistory
+from prediction_service import PredictionService
+
+
+def regime_prices(n: int = 6000, seed: int = 3) -> np.ndarray:
+    """趋势交替的价格序列（趋势可由窗口特征预测）"""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.002, 0.002], n // 200), 200)
+    return 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.001, len(drift))))
+
+
+def test_trained_model_round_trips_through_mmap(tmp_path):
+    """测试训练、保存后以内存映射加载，推理结果与训练权重一致"""
+    features, labels = build_dataset(regime_prices())
+    weights = train_softmax(features, labels, epochs=200)
+    save_model(weights, {"samples": len(labels)}, str(tmp_path))
+
+    model = AIModel.load(str(tmp_path))
+    assert isinstance(model.weights, np.memmap)
+    np.testing.assert_allclose(np.asarray(model.weights), weights)
+
+    predicted = (features @ weights[:-1] + weights[-1]).argmax(axis=1)
+    # 趋势序列上应明显优于随机猜测
+    assert (predicted == labels).mean() > 0.5
+
+
+def test_model_dir_is_read_at_call_time_and_anchored_to_backend(tmp_path, monkeypatch):
+    """测试模型目录在调用时读取环境变量，相对路径不受工作目录影响"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("AI_MODEL_DIR", raising=False)
+    assert model_dir() == DEFAULT_MODEL_DIR
+
+    monkeypatch.setenv("AI_MODEL_DIR", "ai_model")
+    assert model_dir() == DEFAULT_MODEL_DIR
+
+    monkeypatch.setenv("AI_MODEL_DIR", str(tmp_path / "model"))
+    features, labels = build_dataset(regime_prices())
+    save_model(train_softmax(features, labels, epochs=10), {})
+    assert AIModel.load() is not None
+    assert os.path.exists(tmp_path / "model" / "weights.npy")
+
+
+def test_missing_model_returns_none(tmp_path):
+    """测试模型文件不存在时返回None"""
+    assert AIModel.load(str(tmp_path)) is None
+
+
+def test_batched_inference_scores_many_pairs(tmp_path):
+    """测试一次调用为多个交易对和时间框架打分，历史不足的位置降级"""
+    features, labels = build_dataset(regime_prices())
+    save_model(train_softmax(features, labels, epochs=100), {}, str(tmp_path))
+
+    history = PriceHistory()
+    start = 1_699_999_200
+    for minute, price in enumerate(regime_prices(600, seed=5)):
+        history.append("BTCUSDT", start + minute * 60, price)
+    service = PredictionService(price_history=history)
+    service.ai_model = AIModel.load(str(tmp_path))
+
+    results = service.ai_model_predict_many([("BTCUSDT", "1m"), ("BTCUSDT", "5m"), ("BTCUSDT", "1h"), ("ETHUSDT", "1m")])
+
+    assert [r["direction"] in ("up", "down", "neutral") for r in results[:2]] == [True, True]
+    assert abs(sum(results[0]["probabilities"].values()) - 1) < 1e-3
+    assert results[2]["confidence"] == 0.0  # 1h 只有10根K线，不足一个窗口
+    assert results[3]["confidence"] == 0.0
+    single = asyncio.run(service.ai_model_prediction("BTCUSDT", "1m", {}))
+    assert single == results[0]
+    assert WINDOW == service.ai_model.window
+
+
+def test_kline_recorder_submits_closed_minutes():
+    """测试分钟切换时提交上一分钟的收盘价"""
+    class Writer:
+        def __init__(self):
+            self.records = []
+
+        def submit(self, record):
+            self.records.append(record)
+
+    writer = Writer()
+    recorder = KlineRecorder(writer)
+    start_ms = 1_699_999_200 * 1000
+    for offset_s, price in ((0, 100.0), (30, 101.0), (60, 102.0), (125, 103.0)):
+        recorder.update({"BTCUSDT": {"binance": {"price": price, "timestamp": start_ms + offset_s * 1000}}})
+
+    assert writer.records == [
+        {"symbol": "BTCUSDT", "interval": "1m", "open_time": 1_699_999_200, "close": 101.0},
+        {"symbol": "BTCUSDT", "interval": "1m", "open_time": 1_699_999_260, "close": 102.0}
+    ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
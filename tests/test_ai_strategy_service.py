@@ -0,0 +1,193 @@
+"""
+AI策略服务技术指标测试
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# 测试共用函数
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import ai_strategy_service
+from ai_strategy_service import AIStrategyService, MarketData, UniverseData
+from tests.helpers import random_walk
+
+
+def loop_ema(prices: np.ndarray, period: int) -> np.ndarray:
+    """原逐点循环实现"""
+    alpha = 2 / (period + 1)
+    ema = np.zeros_like(prices)
+    ema[0] = prices[0]
+    for i in range(1, len(prices)):
+        ema[i] = alpha * prices[i] + (1 - alpha) * ema[i-1]
+    return ema
+
+
+@pytest.mark.parametrize("use_scipy", [True, False])
+def test_ema_two_dimensional(monkeypatch, use_scipy):
+    """测试二维输入的EMA逐行与循环实现一致"""
+    if use_scipy and ai_strategy_service.lfilter is None:
+        pytest.skip("scipy未安装")
+    if not use_scipy:
+        monkeypatch.setattr(ai_strategy_service, "lfilter", None)
+
+    matrix = np.stack([random_walk(700, seed=seed) for seed in range(3)])
+    result = ai_strategy_service.exponential_moving_average(matrix, 12)
+    for row in range(3):
+        np.testing.assert_allclose(result[row], loop_ema(matrix[row], 12), rtol=1e-12)
+
+
+@pytest.mark.parametrize("use_scipy", [True, False])
+@pytest.mark.parametrize("n", [1, 7, 256, 5000])
+def test_ema_matches_loop(monkeypatch, use_scipy, n):
+    """测试向量化EMA（scipy与NumPy分块两种实现）与逐点循环一致"""
+    if use_scipy and ai_strategy_service.lfilter is None:
+        pytest.skip("scipy未安装")
+    if not use_scipy:
+        monkeypatch.setattr(ai_strategy_service, "lfilter", None)
+
+    prices = random_walk(n)
+    for period in (2, 12, 26):
+        np.testing.assert_allclose(
+            ai_strategy_service.exponential_moving_average(prices, period),
+            loop_ema(prices, period),
+            rtol=1e-12
+        )
+
+
+def test_macd_matches_loop():
+    """测试MACD与基于循环EMA的结果一致"""
+    prices = random_walk(1000, seed=1)
+    macd, signal, histogram = AIStrategyService()._calculate_macd(prices)
+
+    expected_macd = loop_ema(prices, 12) - loop_ema(prices, 26)
+    expected_signal = loop_ema(expected_macd, 9)
+    np.testing.assert_allclose(macd, expected_macd, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(signal, expected_signal, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(histogram, expected_macd - expected_signal, rtol=1e-9, atol=1e-9)
+
+
+def golden_cross_data() -> MarketData:
+    """最后一根K线短期均线上穿长期均线"""
+    prices = list(np.linspace(110, 100, 59)) + [110.0]
+    return MarketData(prices=prices, volumes=[1.0] * 60, timestamps=[datetime.now()] * 60, symbol="BTCUSDT")
+
+
+def test_ai_enhanced_strategy_computes_indicators_once():
+    """测试AI增强策略在基础信号和市场环境分析之间共享同一份指标"""
+    service = AIStrategyService()
+    market_data = golden_cross_data()
+
+    signal = service.run_strategy("ai_enhanced_ma", market_data)
+    assert signal.signal_type == "buy"
+    assert "trend_strength" in signal.ai_enhancement
+    assert service.indicator_context.computed == 1
+
+    service.run_strategy("ma_cross", market_data)
+    assert service.indicator_context.computed == 1
+
+    # 原地修改数据并增加版本后重新计算
+    market_data.prices[-1] = 90.0
+    market_data.version += 1
+    assert service.run_strategy("ma_cross", market_data).signal_type == "hold"
+    assert service.indicator_context.computed == 2
+
+
+def test_strategy_computes_only_declared_indicators():
+    """测试均线策略只计算所需指标，并支持任意周期"""
+    service = AIStrategyService()
+    market_data = golden_cross_data()
+
+    signal = service.run_strategy("ma_cross", market_data, {"short_period": 3, "long_period": 30})
+    assert signal.signal_type == "buy"
+    assert set(service.indicator_context.get(market_data)) == {"prices", "ma3", "ma30", "current_price"}
+
+    # 布林带复用已缓存的ma20
+    indicators = service.indicator_context.get(market_data, ("bollinger_bands",))
+    assert indicators["bollinger_bands"]["middle"] is indicators["ma20"]
+
+
+def test_default_indicator_set_unchanged():
+    """测试完整指标集的键和数值与各计算方法一致"""
+    service = AIStrategyService()
+    market_data = golden_cross_data()
+    prices = np.array(market_data.prices)
+    indicators = service.calculate_technical_indicators(market_data)
+
+    assert set(indicators) == {
+        "ma5", "ma10", "ma20", "ma50", "rsi", "bollinger_bands", "macd",
+        "volume_ratio", "current_price", "price_change"
+    }
+    np.testing.assert_allclose(indicators["rsi"], service._calculate_rsi(prices, 14))
+    np.testing.assert_allclose(indicators["bollinger_bands"]["upper"], service._calculate_bollinger_bands(prices)[0])
+    np.testing.assert_allclose(indicators["macd"]["signal"], service._calculate_macd(prices)[1])
+    assert indicators["volume_ratio"] == 1.0
+
+
+@pytest.mark.parametrize("strategy_id", ["ma_cross", "momentum_reversal", "ai_enhanced_ma", "ai_enhanced_momentum"])
+def test_batch_signals_match_single_symbol(strategy_id):
+    """测试整个交易对集合的批量信号与逐个交易对计算一致"""
+    rng = np.random.default_rng(4)
+    rows = [golden_cross_data().prices, list(np.linspace(100, 80, 60))]
+    rows += [list(random_walk(60, seed=seed)) for seed in range(3)]
+    symbols = [f"SYM{i}USDT" for i in range(len(rows))]
+    prices = np.array(rows)
+    volumes = rng.uniform(1, 3, prices.shape)
+    universe = UniverseData(symbols=symbols, prices=prices, volumes=volumes)
+
+    service = AIStrategyService()
+    signals = service.run_strategy_batch(strategy_id, universe)
+    assert list(signals) == symbols
+    if strategy_id in ("ma_cross", "ai_enhanced_ma"):
+        assert signals["SYM0USDT"].signal_type == "buy"
+    for row, symbol in enumerate(symbols):
+        market_data = MarketData(prices=list(prices[row]), volumes=list(volumes[row]),
+                                 timestamps=[datetime.now()] * 60, symbol=symbol)
+        expected = AIStrategyService().run_strategy(strategy_id, market_data)
+        assert signals[symbol].signal_type == expected.signal_type
+        assert signals[symbol].confidence == pytest.approx(expected.confidence)
+        assert signals[symbol].explanation == expected.explanation
+
+
+def test_evaluate_all_shares_indicators(monkeypatch):
+    """测试所有策略共享每个交易对的一份指标，信号与单独运行一致"""
+    rng = np.random.default_rng(5)
+    market_data = {"BTCUSDT": golden_cross_data()}
+    for seed in range(1, 4):
+        prices = list(random_walk(80, seed=seed))
+        market_data[f"SYM{seed}USDT"] = MarketData(prices=prices, volumes=list(rng.uniform(1, 3, 80)),
+                                                   timestamps=[datetime.now()] * 80, symbol=f"SYM{seed}USDT")
+
+    created = []
+    original_init = ai_strategy_service.Indicators.__init__
+    def counting_init(self, data):
+        created.append(data.symbol)
+        original_init(self, data)
+    monkeypatch.setattr(ai_strategy_service.Indicators, "__init__", counting_init)
+
+    service = AIStrategyService()
+    result = service.evaluate_all(market_data)
+    assert sorted(created) == sorted(market_data)
+    assert list(result["signals"]) == list(market_data)
+    assert set(result["timing_ms"]["strategies"]) == set(service.strategies)
+    assert result["signals"]["BTCUSDT"]["ai_enhanced_ma"].signal_type == "buy"
+    assert isinstance(result["signals"]["BTCUSDT"]["ai_enhanced_ma"].price, float)
+
+    for symbol, data in market_data.items():
+        for strategy_id, signal in result["signals"][symbol].items():
+            expected = AIStrategyService().run_strategy(strategy_id, data)
+            assert signal.signal_type == expected.signal_type
+            assert signal.confidence == pytest.approx(expected.confidence)
+            assert signal.ai_enhancement == expected.ai_enhancement
+
+    with pytest.raises(ValueError):
+        service.evaluate_all(market_data, ["ma_cross", "unknown"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,182 @@
+"""
+认证用户缓存测试
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# models导入时会创建数据库引擎，测试中使用SQLite
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
+from models import Base, MembershipLevel, User
+from payment_service import PaymentService
+from user_cache import UserCache, UserCacheBroadcaster, UserSnapshot, user_cache
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(username="alice", email="alice@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def published():
+    """清空全局缓存并记录广播的失效"""
+    messages = []
+    user_cache.clear()
+    user_cache.publisher = lambda user_id, email: messages.append((user_id, email))
+    yield messages
+    user_cache.publisher = None
+    user_cache.clear()
+
+
+def cache_user(db):
+    user = db.query(User).filter(User.email == "alice@example.com").one()
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(snapshot)
+    return snapshot
+
+
+def test_cached_user_hits_until_ttl_expires():
+    """测试TTL内命中缓存，过期后未命中"""
+    cache = UserCache(ttl=0.05)
+    snapshot = UserSnapshot(1, "alice", "alice@example.com", None, "trial", None)
+    cache.set(snapshot)
+
+    assert cache.get("alice@example.com") is snapshot
+    time.sleep(0.06)
+    assert cache.get("alice@example.com") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_user_update_invalidates_and_broadcasts_after_commit(session, published):
+    """测试用户记录更新后本地失效，并在提交后通知其他worker"""
+    snapshot = cache_user(session)
+    assert snapshot.membership_level == "trial"
+
+    user = session.get(User, snapshot.id)
+    user.membership_level = MembershipLevel.pro
+    session.flush()
+    assert user_cache.get(snapshot.email) is None
+    # 提交前不广播，避免其他worker读到未提交的旧记录
+    assert published == []
+
+    session.commit()
+    assert published == [(snapshot.id, snapshot.email)]
+
+
+def test_deleted_user_is_evicted_and_broadcast(session, published):
+    """测试删除用户后本地失效并广播"""
+    snapshot = cache_user(session)
+    session.delete(session.get(User, snapshot.id))
+    session.commit()
+
+    assert user_cache.get(snapshot.email) is None
+    assert published == [(snapshot.id, snapshot.email)]
+
+
+def test_rolled_back_update_is_not_broadcast(session, published):
+    """测试回滚的更新不会广播"""
+    snapshot = cache_user(session)
+    session.get(User, snapshot.id).phone = "123"
+    session.flush()
+    session.rollback()
+    session.commit()
+    assert published == []
+
+
+def test_membership_activation_refreshes_cached_level(session, published, tmp_path, monkeypatch):
+    """测试支付审核通过激活会员后，缓存中的旧等级失效"""
+    monkeypatch.chdir(tmp_path)
+    snapshot = cache_user(session)
+
+    PaymentService().activate_membership(snapshot.id, "premium", session)
+
+    assert user_cache.get(snapshot.email) is None
+    assert published == [(snapshot.id, snapshot.email)]
+    assert cache_user(session).membership_level == "premium"
+
+
+def test_broadcast_message_invalidates_local_cache():
+    """测试收到其他worker的失效通知后清除本地缓存"""
+    cache = UserCache()
+    cache.set(UserSnapshot(1, "alice", "alice@example.com", None, "trial", None))
+    broadcaster = UserCacheBroadcaster(cache, "redis://localhost:6379/0")
+
+    broadcaster.handle(json.dumps({"user_id": 1, "email": "alice@example.com"}))
+
+    assert cache.get("alice@example.com") is None
+
+
+
+def test_broadcaster_publishes_from_its_own_task():
+    """测试失效通知只入队，由广播任务通过异步客户端发布（可在其他线程提交）"""
+    class PubSub:
+        async def subscribe(self, channel):
+            pass
+
+        async def listen(self):
+            await asyncio.Event().wait()
+            yield
+
+        async def aclose(self):
+            pass
+
+    class Redis:
+        def __init__(self):
+            self.messages = []
+
+        async def publish(self, channel, message):
+            self.messages.append((channel, json.loads(message)))
+
+        def pubsub(self, **kwargs):
+            return PubSub()
+
+        async def aclose(self):
+            pass
+
+    broadcaster = UserCacheBroadcaster(UserCache(), "redis://localhost:6379/0")
+    broadcaster.redis = fake = Redis()
+
+    async def run():
+        broadcaster.start()
+        broadcaster.publish(1, "alice@example.com")
+        # 提交可能发生在线程池中的同步会话里
+        worker = threading.Thread(target=broadcaster.publish, args=(2, "bob@example.com"))
+        worker.start()
+        worker.join()
+        assert fake.messages == []
+        for _ in range(100):
+            if len(fake.messages) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await broadcaster.stop()
+
+    asyncio.run(run())
+    assert fake.messages == [
+        ("user_cache:invalidate", {"user_id": 1, "email": "alice@example.com"}),
+        ("user_cache:invalidate", {"user_id": 2, "email": "bob@example.com"})
+    ]
+    # 停止后提交的通知直接丢弃
+    broadcaster.publish(3, None)
+    assert broadcaster.dropped == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
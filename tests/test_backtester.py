@@ -0,0 +1,86 @@
+"""
+向量化回测测试
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# 测试共用函数
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ai_strategy_service import AIStrategyService, MarketData
+from backtester import positions_from_signals, run_backtest, signal_series, simulate
+from tests.helpers import random_walk
+
+DIRECTIONS = {'buy': 1, 'sell': -1, 'hold': 0}
+
+
+def crash_prices(n: int = 300, seed: int = 7) -> np.ndarray:
+    """随机游走中夹杂几次单根K线暴跌"""
+    return random_walk(n, start=100.0, sigma=0.01, seed=seed, shocks={90: -0.12, 180: -0.12, 250: -0.12})
+
+
+@pytest.mark.parametrize("strategy_id", ["ma_cross", "momentum_reversal", "ai_enhanced_ma", "ai_enhanced_momentum"])
+def test_signal_series_matches_run_strategy(strategy_id):
+    """测试整段信号序列与逐根K线调用 run_strategy 的结果一致"""
+    prices = crash_prices()
+    volumes = np.random.default_rng(1).uniform(1, 4, len(prices))
+    direction, confidence = signal_series(strategy_id, prices, volumes)
+
+    for t in range(1, len(prices)):
+        market_data = MarketData(prices=list(prices[:t + 1]), volumes=list(volumes[:t + 1]),
+                                 timestamps=[datetime.now()] * (t + 1), symbol="BTCUSDT")
+        signal = AIStrategyService().run_strategy(strategy_id, market_data)
+        assert direction[t] == DIRECTIONS[signal.signal_type], t
+        assert confidence[t] == pytest.approx(signal.confidence, abs=1e-9), t
+    assert np.count_nonzero(direction) > 0
+
+
+def test_positions_follow_signals():
+    """测试开平仓、置信度过滤、做空和最长持仓"""
+    direction = np.array([0, 1, 0, 0, -1, 0, 1, 0, 0, 0])
+    confidence = np.array([0, 0.5, 0, 0, 0.5, 0, 0.2, 0, 0, 0])
+
+    np.testing.assert_array_equal(positions_from_signals(direction, confidence), [0, 1, 1, 1, 0, 0, 1, 1, 1, 1])
+    np.testing.assert_array_equal(positions_from_signals(direction, confidence, min_confidence=0.3),
+                                  [0, 1, 1, 1, 0, 0, 0, 0, 0, 0])
+    np.testing.assert_array_equal(positions_from_signals(direction, confidence, allow_short=True),
+                                  [0, 1, 1, 1, -1, -1, 1, 1, 1, 1])
+    np.testing.assert_array_equal(positions_from_signals(direction, confidence, max_hold=2),
+                                  [0, 1, 1, 0, 0, 0, 1, 1, 0, 0])
+
+
+def test_simulate_pnl_fees_and_trades():
+    """测试收益、手续费、回撤和胜率"""
+    prices = np.array([100.0, 110.0, 99.0, 99.0, 120.0, 108.0])
+    positions = np.array([1.0, 1.0, 0.0, 0.0, 1.0, 0.0])
+    result = simulate(prices, positions, fee=0.001, initial_capital=1000.0)
+
+    # 第一笔 100 -> 99 亏损，第二笔 120 -> 108 亏损；每笔开平仓各收0.1%
+    first = 0.999 * 0.99 * 0.999
+    second = 0.999 * 0.9 * 0.999
+    assert result["final_equity"] == pytest.approx(1000 * first * second, abs=0.01)
+    assert result["trades"] == 2
+    assert result["win_rate"] == 0.0
+    assert result["max_drawdown"] == pytest.approx(1 - first * second / (0.999 * 1.1), abs=1e-6)
+    assert result["fees_paid"] == pytest.approx(1 + 0.989 + 0.988 + 0.888, abs=0.01)
+
+
+def test_run_backtest_reports_metrics():
+    """测试回测结果包含主要指标"""
+    result = run_backtest("ma_cross", crash_prices(), timeframe="1m", allow_short=True)
+    assert result["strategy"] == "ma_cross"
+    assert result["trades"] > 0
+    assert 0 <= result["win_rate"] <= 1
+    assert set(result) >= {"pnl", "max_drawdown", "sharpe", "fees_paid", "signals"}
+    with pytest.raises(ValueError):
+        run_backtest("unknown", crash_prices())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,64 @@
+"""
+异步缓存测试
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from cache import AsyncCache, LocalTTLCache
+
+
+def test_local_ttl_cache_expiry():
+    """测试进程内缓存过期"""
+    cache = LocalTTLCache()
+    cache.set("a", "1", ttl=0.01)
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == "2"
+
+
+def test_fallback_when_redis_unavailable():
+    """测试Redis不可用时透明退化为进程内缓存"""
+    async def run():
+        cache = AsyncCache("redis://127.0.0.1:1/0")
+        await cache.set_many({"aggregated:BTCUSDT": '{"avg_price": 1}', "aggregated:ETHUSDT": '{"avg_price": 2}'}, ttl=10)
+        values = await cache.get_many_json(["aggregated:BTCUSDT", "aggregated:ETHUSDT", "aggregated:XRPUSDT"])
+        single = await cache.get_json("aggregated:ETHUSDT")
+        available = cache.redis_available
+        await cache.close()
+        return values, single, available
+
+    values, single, available = asyncio.run(run())
+    assert values == {
+        "aggregated:BTCUSDT": {"avg_price": 1},
+        "aggregated:ETHUSDT": {"avg_price": 2},
+        "aggregated:XRPUSDT": None
+    }
+    assert single == {"avg_price": 2}
+    assert not available
+
+
+def test_set_nx_lease_with_local_fallback():
+    """测试Redis不可用时租约在进程内互斥，过期后可重新获取"""
+    async def run():
+        cache = AsyncCache("redis://127.0.0.1:1/0")
+        first = await cache.set_nx("prediction_warm:BTCUSDT:1m:0", "1", ttl=0.05)
+        second = await cache.set_nx("prediction_warm:BTCUSDT:1m:0", "1", ttl=0.05)
+        await asyncio.sleep(0.06)
+        expired = await cache.set_nx("prediction_warm:BTCUSDT:1m:0", "1", ttl=0.05)
+        await cache.close()
+        return first, second, expired
+
+    assert asyncio.run(run()) == (True, False, True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
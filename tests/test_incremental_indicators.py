@@ -0,0 +1,92 @@
+"""
+增量技术指标测试
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# 测试共用函数
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ai_strategy_service import AIStrategyService, MarketData, exponential_moving_average
+from incremental_indicators import RSI, IncrementalIndicators, IndicatorEngine
+from rolling_stats import rolling_mean, rolling_std
+from tests.helpers import random_walk
+
+T0 = 1_699_999_200
+
+
+def test_matches_batch_indicators():
+    """测试逐根更新的均线、MACD、布林带与批量计算一致"""
+    prices = random_walk(500)
+    state = IncrementalIndicators()
+    for price in prices:
+        state.update(price)
+    snapshot = state.snapshot()
+
+    np.testing.assert_allclose(snapshot["ma20"], rolling_mean(prices, 20)[-2:], rtol=1e-10)
+    np.testing.assert_allclose(snapshot["ma50"], rolling_mean(prices, 50)[-2:], rtol=1e-10)
+    macd = exponential_moving_average(prices, 12) - exponential_moving_average(prices, 26)
+    np.testing.assert_allclose(snapshot["macd"]["macd"], macd[-2:], rtol=1e-8)
+    np.testing.assert_allclose(snapshot["macd"]["signal"], exponential_moving_average(macd, 9)[-2:], rtol=1e-8)
+    std = rolling_std(prices, 20)[-1]
+    np.testing.assert_allclose(snapshot["bollinger_bands"]["upper"][-1], rolling_mean(prices, 20)[-1] + 2 * std, rtol=1e-10)
+    assert snapshot["volume_ratio"] == 1.0
+    assert snapshot["bars"] == 500
+
+
+def test_wilder_rsi():
+    """测试Wilder平滑RSI"""
+    prices = random_walk(100, seed=1)
+    deltas = np.diff(prices)
+    gains, losses = np.maximum(deltas, 0), np.maximum(-deltas, 0)
+    avg_gain, avg_loss = gains[:14].mean(), losses[:14].mean()
+    for gain, loss in zip(gains[14:], losses[14:]):
+        avg_gain = (avg_gain * 13 + gain) / 14
+        avg_loss = (avg_loss * 13 + loss) / 14
+
+    rsi = RSI(14)
+    values = [rsi.update(price) for price in prices]
+    assert values[13] is None and values[14] is not None
+    assert values[-1] == pytest.approx(100 - 100 / (1 + avg_gain / avg_loss), rel=1e-8)
+
+
+def test_engine_feeds_closed_bars_to_strategy():
+    """测试引擎按K线收盘推进指标，策略直接用快照得到与完整历史相同的信号"""
+    closes = list(np.linspace(110, 100, 59)) + [110.0]
+    engine = IndicatorEngine(timeframes=("1m", "5m"))
+    for minute, close in enumerate(closes):
+        # 每分钟内多次更新，只有最后价格作为收盘价
+        engine.update("BTCUSDT", T0 + minute * 60, close * 0.99)
+        engine.update("BTCUSDT", T0 + minute * 60 + 30, close)
+    assert engine.snapshot("BTCUSDT", "1m")["bars"] == 59
+
+    # 下一分钟的第一次更新使最后一根K线收盘
+    engine.update("BTCUSDT", T0 + 60 * 60, 111.0)
+    snapshot = engine.snapshot("BTCUSDT", "1m")
+    assert snapshot["bars"] == 60
+    assert snapshot["current_price"] == 110.0
+    assert engine.snapshot("BTCUSDT", "5m")["bars"] == 12
+    assert engine.snapshot("ETHUSDT", "1m") == {}
+
+    service = AIStrategyService()
+    market_data = MarketData(prices=closes, volumes=[1.0] * 60, timestamps=[datetime.now()] * 60, symbol="BTCUSDT")
+    assert service.run_strategy("ma_cross", snapshot).signal_type == "buy"
+    assert service.run_strategy("ma_cross", market_data).signal_type == "buy"
+    assert service.run_strategy("ai_enhanced_ma", snapshot).signal_type == "buy"
+    # 快照中没有的均线周期
+    assert service.run_strategy("ma_cross", snapshot, {"short_period": 3, "long_period": 30}).signal_type == "hold"
+
+    # 批量评估可直接使用快照
+    signals = service.evaluate_all({"BTCUSDT": snapshot, "ETHUSDT": market_data})["signals"]
+    assert signals["BTCUSDT"]["ai_enhanced_ma"].signal_type == "buy"
+    assert signals["ETHUSDT"]["ma_cross"].signal_type == "buy"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,108 @@
+"""
+LLM并发管控测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from llm_governor import WARM_TIER, LLMGovernor, LLMOverloaded
+
+
+def test_premium_admitted_before_trial():
+    """测试名额释放后优先分配给高等级会员"""
+    async def run():
+        governor = LLMGovernor(max_concurrency=1)
+        order = []
+
+        async def call(level):
+            async with governor.slot(level):
+                order.append(level)
+                await asyncio.sleep(0.01)
+
+        holder = asyncio.ensure_future(call("basic"))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(call(level)) for level in ("trial", "pro", "premium")]
+        await asyncio.gather(holder, *waiters)
+        return order, governor.get_metrics()
+
+    order, metrics = asyncio.run(run())
+    assert order == ["basic", "premium", "pro", "trial"]
+    assert metrics["active"] == 0
+    assert metrics["tiers"]["premium"]["admitted"] == 1
+
+
+def test_warm_tier_yields_to_members_but_outlasts_trial_timeout():
+    """测试预热请求排在所有会员之后，但不会在会员的排队时限内被丢弃"""
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, max_wait={"trial": 0.01})
+        await governor.acquire("basic")
+        warm = asyncio.ensure_future(governor.acquire(WARM_TIER))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded):
+            await governor.acquire("trial")
+        trial = asyncio.ensure_future(governor.acquire("trial"))
+        await asyncio.sleep(0)
+
+        governor.release()
+        await trial
+        admitted_first = not warm.done()
+        governor.release()
+        await warm
+        governor.release()
+        return admitted_first, governor.get_metrics()
+
+    admitted_first, metrics = asyncio.run(run())
+    assert admitted_first
+    assert metrics["tiers"]["warm"]["admitted"] == 1
+    assert metrics["tiers"]["warm"]["shed"] == 0
+
+
+def test_full_queue_sheds_lowest_priority():
+    """测试队列满时淘汰最低优先级的等待者"""
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, max_queue=1)
+        await governor.acquire("pro")
+        trial = asyncio.ensure_future(governor.acquire("trial"))
+        await asyncio.sleep(0)
+        premium = asyncio.ensure_future(governor.acquire("premium"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(LLMOverloaded):
+            await trial
+        # 低优先级的新请求在队列满时直接被拒绝
+        with pytest.raises(LLMOverloaded):
+            await governor.acquire("basic")
+
+        governor.release()
+        await premium
+        governor.release()
+        return governor.get_metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["tiers"]["trial"]["shed"] == 1
+    assert metrics["tiers"]["basic"]["shed"] == 1
+    assert metrics["active"] == 0
+
+
+def test_queue_timeout_sheds_request():
+    """测试排队超时的请求被拒绝"""
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, max_wait={"trial": 0.01})
+        await governor.acquire("premium")
+        with pytest.raises(LLMOverloaded):
+            await governor.acquire("trial")
+        governor.release()
+        return governor.get_metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["tiers"]["trial"]["shed"] == 1
+    assert metrics["queued"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
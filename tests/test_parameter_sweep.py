@@ -0,0 +1,103 @@
+"""
+策略参数搜索测试
+"""
+import multiprocessing as mp
+import os
+import sys
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# 测试共用函数
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from backtester import positions_from_signals, signal_series, simulate
+from parameter_sweep import _init_worker, grid_params, load_latest_sweep, random_params, run_sweep, save_sweep, walk_forward_splits
+from tests.helpers import random_walk
+
+
+def sweep_prices(n: int = 3000, seed: int = 3) -> np.ndarray:
+    return random_walk(n, start=100.0, sigma=0.01, seed=seed)
+
+
+def test_param_grid_and_random_sample():
+    """测试网格只含短周期小于长周期的组合，随机抽样来自网格且不重复"""
+    grid = grid_params("ma_cross")
+    assert grid and all(params["short_period"] < params["long_period"] for params in grid)
+    sample = random_params("ma_cross", 10, seed=1)
+    assert len(sample) == 10
+    assert all(params in grid for params in sample)
+    assert len({tuple(params.items()) for params in sample}) == 10
+    assert len(random_params("momentum_reversal", 1000)) == len(grid_params("momentum_reversal"))
+
+
+def test_walk_forward_splits():
+    """测试测试区间紧接训练区间、互不重叠且不越界"""
+    splits = walk_forward_splits(700, folds=4, train_multiple=3)
+    assert splits[0] == (0, 300, 400)
+    for (_, _, previous_end), (start, middle, end) in zip(splits, splits[1:]):
+        assert middle == previous_end
+        assert middle - start == 300 and end - middle == 100
+    assert splits[-1][2] <= 700
+    with pytest.raises(ValueError):
+        walk_forward_splits(10, folds=4, train_multiple=3)
+
+
+def test_run_sweep_ranks_and_walks_forward(tmp_path):
+    """测试并行搜索结果与单独回测一致，并能保存和读取"""
+    prices = sweep_prices()
+    result = run_sweep("ma_cross", prices, search="random", samples=8, min_trades=1, workers=2)
+
+    assert result["evaluated"] == 8
+    scores = [entry["train_score"] for entry in result["ranked"] if entry["train_score"] is not None]
+    assert scores == sorted(scores, reverse=True)
+    assert len(result["walk_forward"]) == 4
+    assert result["recommended"] == result["walk_forward"][-1]["params"]
+
+    # 样本外区间的统计与单独回测（信号用截至该区间的全部历史）一致
+    fold = result["walk_forward"][0]
+    start, middle, end = fold["split"]
+    direction, confidence = signal_series("ma_cross", prices[:end], params=fold["params"])
+    positions = positions_from_signals(direction, confidence)
+    assert fold["test"] == simulate(prices[middle:end], positions[middle:end])
+
+    path = save_sweep(result, str(tmp_path))
+    assert os.path.exists(path)
+    assert load_latest_sweep("ma_cross", str(tmp_path))["ranked"] == result["ranked"]
+    assert load_latest_sweep("momentum_reversal", str(tmp_path)) is None
+
+
+def test_folds_without_valid_candidates_are_skipped():
+    """测试交易次数要求无法满足时，不选参数、不计样本外收益、也不给出推荐"""
+    result = run_sweep("ma_cross", sweep_prices(), search="random", samples=4, min_trades=10_000, workers=1)
+
+    assert result["valid_folds"] == 0
+    assert result["recommended"] is None
+    assert result["out_of_sample_return"] is None
+    assert all(fold["params"] is None and fold["test"] is None for fold in result["walk_forward"])
+    assert all(entry["train_score"] is None for entry in result["ranked"])
+
+
+
+@pytest.mark.parametrize("method", [m for m in ("spawn", "forkserver") if m in mp.get_all_start_methods()])
+def test_worker_exit_does_not_unlink_shared_prices(method):
+    """测试非fork方式启动的工作进程退出时不会删除创建方的共享内存"""
+    shm = SharedMemory(create=True, size=8 * 10)
+    try:
+        worker = mp.get_context(method).Process(target=_init_worker, args=(shm.name, 1, 10))
+        worker.start()
+        worker.join(30)
+        assert worker.exitcode == 0
+
+        attached = SharedMemory(name=shm.name)
+        attached.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
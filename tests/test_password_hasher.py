@@ -0,0 +1,86 @@
+"""
+密码哈希线程池测试
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from password_hasher import PasswordHasher
+
+
+def test_saturated_hasher_rejects_with_retry_after():
+    """测试排队任务达到上限时返回503和Retry-After，并记录指标"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hash(password):
+        started.set()
+        release.wait(5)
+        return f"hashed-{password}"
+
+    hasher = PasswordHasher(slow_hash, lambda plain, hashed: True, max_workers=1, max_pending=2)
+
+    async def run():
+        tasks = [asyncio.ensure_future(hasher.hash(f"p{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+
+        with pytest.raises(HTTPException) as rejected:
+            await hasher.verify("p", "hashed")
+        saturated = hasher.get_metrics()
+
+        release.set()
+        return rejected.value, saturated, await asyncio.gather(*tasks)
+
+    try:
+        error, saturated, results = asyncio.run(run())
+    finally:
+        release.set()
+        hasher.shutdown()
+
+    assert error.status_code == 503
+    assert error.headers == {"Retry-After": "1"}
+    assert saturated["pending"] == 2
+    assert saturated["running"] == 1
+    assert saturated["queue_depth"] == 1
+    assert saturated["rejected"] == 1
+
+    assert results == ["hashed-p0", "hashed-p1"]
+    metrics = hasher.get_metrics()
+    assert metrics["pending"] == 0
+    assert metrics["completed"] == 2
+    assert metrics["rejected"] == 1
+    # 第二个任务排队等待第一个任务完成
+    assert metrics["max_queue_ms"] > 0
+
+
+def test_hash_and_verify_run_off_event_loop():
+    """测试哈希和验证在线程池中执行"""
+    threads = []
+
+    def record(*args):
+        threads.append(threading.current_thread().name)
+        return True
+
+    hasher = PasswordHasher(record, record, max_workers=1)
+
+    async def run():
+        return await hasher.hash("p"), await hasher.verify("p", "h")
+
+    try:
+        assert asyncio.run(run()) == (True, True)
+    finally:
+        hasher.shutdown()
+    assert all(name.startswith("bcrypt") for name in threads)
+    assert hasher.get_metrics()["completed"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
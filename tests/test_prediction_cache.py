@@ -0,0 +1,114 @@
+"""
+共享预测缓存测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from prediction_cache import PredictionCache, bar_bounds
+
+
+class MemoryStore:
+    """测试用的内存存储"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get_json(self, key):
+        return self.data.get(key)
+
+    async def set_json(self, key, value, ttl=None):
+        self.data[key] = value
+
+
+def test_bar_bounds_alignment():
+    """测试K线边界对齐"""
+    assert bar_bounds("5m", 1700000123) == (1700000100, 1700000400)
+    assert bar_bounds("1h", 1700000123) == (1699999200, 1700002800)
+    # 2023-11-13 是周一
+    assert bar_bounds("1w", 1700000123)[0] == 1699833600
+
+    with pytest.raises(ValueError):
+        bar_bounds("2m")
+
+
+def test_concurrent_requests_coalesce():
+    """测试并发的相同请求只计算一次"""
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"direction": "up"}
+
+    async def run():
+        cache = PredictionCache(MemoryStore())
+        results = await asyncio.gather(*[
+            cache.get_or_compute("BTCUSDT", "5m", compute) for _ in range(10)
+        ])
+        # 计算完成后的请求直接命中缓存
+        again = await cache.get_or_compute("BTCUSDT", "5m", compute)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(r == {"direction": "up"} for r in results)
+    assert again == {"direction": "up"}
+    assert cache.get_stats() == {"hits": 1, "misses": 1, "coalesced": 9, "recomputed": 0, "inflight": 0}
+
+
+def test_failed_computation_is_not_cached():
+    """测试计算失败时不写入缓存，下次请求重新计算"""
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return {"direction": "down"}
+
+    async def run():
+        cache = PredictionCache(MemoryStore())
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("ETHUSDT", "1m", compute)
+        return await cache.get_or_compute("ETHUSDT", "1m", compute)
+
+    assert asyncio.run(run()) == {"direction": "down"}
+    assert len(attempts) == 2
+
+
+def test_higher_priority_waiter_recomputes_degraded_result():
+    """测试低优先级请求的计算被降级时，合并到其上的高优先级请求按自己的优先级重新计算"""
+    calls = []
+
+    def compute_for(priority):
+        async def compute():
+            calls.append(priority)
+            await asyncio.sleep(0.01)
+            # 模拟LLM按低优先级被限流
+            return {"direction": "neutral", "degraded": True} if priority == 3 else {"direction": "up"}
+        return compute
+
+    async def run():
+        cache = PredictionCache(MemoryStore())
+        return cache, await asyncio.gather(
+            cache.get_or_compute("BTCUSDT", "5m", compute_for(3), priority=3),
+            cache.get_or_compute("BTCUSDT", "5m", compute_for(0), priority=0),
+            cache.get_or_compute("BTCUSDT", "5m", compute_for(0), priority=0),
+            cache.get_or_compute("BTCUSDT", "5m", compute_for(3), priority=3)
+        )
+
+    cache, results = asyncio.run(run())
+    assert [r["direction"] for r in results] == ["neutral", "up", "up", "neutral"]
+    # 两个高优先级等待者合并为一次重新计算
+    assert calls == [3, 0]
+    assert cache.get_stats()["recomputed"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
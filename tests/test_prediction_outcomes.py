@@ -0,0 +1,95 @@
+"""
+预测结果记录与判定测试
+"""
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from prediction_outcomes import build_prediction_records, resolve_outcomes, summarize_accuracy
+
+MARKET_DATA = {
+    "binance": {"price": 100.0},
+    "okx": {"price": 102.0}
+}
+
+
+def test_records_expand_every_model():
+    """测试每个时间框架展开为综合结果和各子模型记录"""
+    prediction = {
+        "direction": "up",
+        "confidence": 0.6,
+        "target_price": 103.0,
+        "details": {
+            "technical": {"direction": "up", "confidence": 0.5},
+            "ai_model": {"direction": "neutral", "confidence": 0.0},
+            "deepseek": {"direction": "down", "confidence": 0.8}
+        }
+    }
+    records = build_prediction_records(7, "BTCUSDT", {"5m": prediction}, MARKET_DATA, now=1_000_000)
+
+    # 未训练的AI模型（置信度0）不记录
+    assert [r["model"] for r in records] == ["combined", "technical_analysis", "deepseek"]
+    assert all(r["base_price"] == 101.0 and r["target_time"] == 1_000_300 for r in records)
+    assert records[0]["predicted_price"] == 103.0
+    assert records[0]["prediction_time"] == datetime(1970, 1, 12, 13, 46, 40)
+    assert build_prediction_records(7, "BTCUSDT", {"5m": prediction}, {}) == []
+
+
+def test_records_skip_degraded_and_placeholder_models():
+    """测试超时降级的子模型和进行中的DEEPSEEK占位结果不记录为中性预测，DEEPSEEK降级时不记录综合结果"""
+    prediction = {
+        "direction": "up",
+        "confidence": 0.5,
+        "details": {
+            "technical": {"direction": "up", "confidence": 0.5},
+            "ai_model": {"direction": "up", "confidence": 0.4},
+            "deepseek": {"direction": "neutral", "confidence": 0.0, "degraded": True}
+        }
+    }
+    records = build_prediction_records(7, "BTCUSDT", {"5m": prediction}, MARKET_DATA, now=1_000_000)
+    assert [r["model"] for r in records] == ["technical_analysis", "ai_model"]
+
+    prediction["details"]["deepseek"] = {"direction": "neutral", "confidence": 0.0, "reasoning": "DEEPSEEK分析进行中"}
+    prediction["details"]["ai_model"]["degraded"] = True
+    records = build_prediction_records(7, "BTCUSDT", {"5m": prediction}, MARKET_DATA, now=1_000_000)
+    assert [r["model"] for r in records] == ["combined", "technical_analysis"]
+
+
+def test_resolve_outcomes_vectorized():
+    """测试用到期前最后一根已收盘K线批量判定方向和命中"""
+    kline_times = np.arange(0, 3600, 60)
+    kline_closes = 100.0 + np.arange(len(kline_times))  # 每分钟上涨1
+
+    outcomes = resolve_outcomes(
+        target_times=[600, 1200, 1200, 90_000],
+        base_prices=[100.0, 130.0, 119.0, 100.0],
+        predicted=["up", "down", "neutral", "up"],
+        kline_times=kline_times,
+        kline_closes=kline_closes
+    )
+
+    # 到期600秒时，最后一根已收盘K线开盘于540秒
+    assert outcomes["actual_price"][0] == 109.0
+    assert list(outcomes["actual_direction"]) == ["up", "down", "neutral", "unknown"]
+    assert list(outcomes["is_correct"]) == [True, True, True, None]
+    assert list(outcomes["found"]) == [True, True, True, False]
+
+
+def test_summarize_accuracy():
+    """测试命中率计算"""
+    rows = summarize_accuracy([
+        {"symbol": "BTCUSDT", "timeframe": "5m", "model": "deepseek", "total": 8, "correct": 6},
+        {"symbol": "BTCUSDT", "timeframe": "5m", "model": "ai_model", "total": 0, "correct": 0}
+    ])
+    assert rows[0]["hit_rate"] == 0.75
+    assert rows[1]["hit_rate"] is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
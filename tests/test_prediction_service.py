@@ -0,0 +1,248 @@
+"""
+预测服务测试
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from prediction_outcomes import build_prediction_records
+from prediction_service import PredictionService
+from prediction_cache import PredictionCache
+from llm_governor import LLMOverloaded
+
+MARKET_DATA = {
+    "binance": {"price": 43250.0, "change_percent_24h": 1.2, "volume_24h": 25000.0},
+    "okx": {"price": 43262.5, "change_percent_24h": 1.1, "volume_24h": 18000.0}
+}
+
+
+def make_service():
+    with patch.dict(os.environ, {}, clear=True):
+        return PredictionService()
+
+
+def test_slow_model_degrades_only_its_contribution():
+    """测试单个模型超时只影响自身的贡献"""
+    service = make_service()
+    service.model_timeouts["deepseek"] = 0.05
+
+    prediction = asyncio.run(service.predict_timeframe("BTCUSDT", "5m", MARKET_DATA))
+
+    details = prediction["details"]
+    assert details["deepseek"]["confidence"] == 0.0
+    assert "超时" in details["deepseek"]["reasoning"]
+    assert details["technical"]["method"] == "technical_analysis"
+    assert details["ai_model"]["method"] == "ai_model"
+
+
+def test_predict_returns_every_timeframe():
+    """测试多时间框架预测返回全部结果"""
+    service = make_service()
+    timeframes = ["1m", "5m", "15m"]
+
+    predictions = asyncio.run(service.predict("BTCUSDT", timeframes, MARKET_DATA))
+
+    assert list(predictions) == timeframes
+    for prediction in predictions.values():
+        assert prediction["direction"] in ("up", "down", "neutral")
+
+
+def test_deepseek_calls_share_client_and_record_timing():
+    """测试DEEPSEEK调用复用同一客户端并记录耗时"""
+    service = make_service()
+    service.deepseek_api_key = "test-key"
+    clients = []
+
+    def handler(request):
+        return httpx.Response(200, json={"choices": [{"message": {"content": "预计上涨，置信度70%"}}]})
+
+    async def run():
+        service.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        for _ in range(3):
+            await service.call_deepseek_api("prompt")
+            clients.append(service.http_client)
+        await service.shutdown()
+
+    asyncio.run(run())
+
+    assert len(set(map(id, clients))) == 1
+    assert service.http_client is None
+    stats = service.get_llm_stats()
+    assert stats["calls"] == 3
+    assert stats["avg_total_ms"] >= stats["avg_connect_ms"]
+
+
+def test_deepseek_batch_uses_one_call_for_all_timeframes():
+    """测试多时间框架预测只发起一次DEEPSEEK调用"""
+    service = make_service()
+    service.deepseek_api_key = "test-key"
+    prompts = []
+
+    async def fake_call(prompt, max_tokens=1000, json_mode=False, membership_level=None):
+        prompts.append(prompt)
+        return '```json\n{"1m": {"direction": "up", "probability": 72, "reasoning": "放量突破"},' \
+               ' "5m": {"direction": "down", "probability": "65%", "reasoning": "顶背离"}}\n```'
+
+    service.call_deepseek_api = fake_call
+    predictions = asyncio.run(service.predict("BTCUSDT", ["1m", "5m"], MARKET_DATA))
+
+    assert len(prompts) == 1
+    assert predictions["1m"]["details"]["deepseek"]["direction"] == "up"
+    assert predictions["5m"]["details"]["deepseek"]["probability"] == 65.0
+
+
+def test_deepseek_batch_falls_back_on_parse_failure():
+    """测试批量响应无法解析时退回逐个时间框架调用"""
+    service = make_service()
+    service.deepseek_api_key = "test-key"
+    prompts = []
+
+    async def fake_call(prompt, max_tokens=1000, json_mode=False, membership_level=None):
+        prompts.append(prompt)
+        if json_mode:
+            return '{"1m": {"direction": "up", "probability": 70}'
+        return "预计价格将上涨，置信度70%"
+
+    service.call_deepseek_api = fake_call
+    predictions = asyncio.run(service.predict("BTCUSDT", ["1m", "5m", "15m"], MARKET_DATA))
+
+    assert len(prompts) == 4
+    for prediction in predictions.values():
+        assert prediction["details"]["deepseek"]["direction"] == "up"
+
+
+def test_deepseek_outage_degrades_without_per_timeframe_retries():
+    """测试DEEPSEEK故障时批量请求失败不再逐个时间框架重试，结果降级"""
+    service = make_service()
+    service.deepseek_api_key = "test-key"
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    async def run():
+        service.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await service.predict("BTCUSDT", ["1m", "5m", "15m"], MARKET_DATA)
+        finally:
+            await service.shutdown()
+
+    predictions = asyncio.run(run())
+
+    assert len(requests) == 1
+    for prediction in predictions.values():
+        assert prediction["degraded"]
+        assert prediction["details"]["deepseek"]["confidence"] == 0.0
+        assert prediction["details"]["deepseek"]["degraded"]
+
+
+def test_predict_stream_emits_preliminary_before_deadline():
+    """测试流式预测先推送初步结果，LLM超过截止时间时以初步结果收尾"""
+    service = make_service()
+
+    async def slow_deepseek(symbol, timeframes, market_data, membership_level=None):
+        await asyncio.sleep(5)
+        return {}
+
+    service.deepseek_analysis_batch = slow_deepseek
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        events = []
+        async for event in service.predict_stream("BTCUSDT", ["1m", "5m"], MARKET_DATA, deadline=0.5):
+            events.append((event, asyncio.get_running_loop().time() - started))
+        return events
+
+    events = asyncio.run(run())
+    kinds = [event["event"] for event, _ in events]
+
+    assert kinds[:2] == ["preliminary", "preliminary"]
+    assert all(elapsed < 0.5 for event, elapsed in events if event["event"] == "preliminary")
+    finals = [event for event, _ in events if event["event"] == "final"]
+    assert {event["timeframe"] for event in finals} == {"1m", "5m"}
+    assert all(event["partial"] for event in finals)
+    assert kinds[-1] == "done"
+
+    # 部分结果中的DEEPSEEK占位结果不会被记录为预测
+    for event in finals:
+        records = build_prediction_records(1, "BTCUSDT", {event["timeframe"]: event["prediction"]}, MARKET_DATA)
+        assert "deepseek" not in {record["model"] for record in records}
+
+
+def test_shed_llm_call_degrades_to_technical_and_is_not_cached():
+    """测试LLM被限流时降级为技术分析结果，且降级结果不写入缓存"""
+    saved = {}
+
+    class Store:
+        async def get_json(self, key):
+            return saved.get(key)
+
+        async def set_json(self, key, value, ttl):
+            saved[key] = value
+
+    with patch.dict(os.environ, {}, clear=True):
+        service = PredictionService(prediction_cache=PredictionCache(Store()))
+
+    async def overloaded(*args, **kwargs):
+        raise LLMOverloaded("LLM队列已满")
+
+    service.deepseek_analysis = overloaded
+    prediction = asyncio.run(service.predict("BTCUSDT", ["5m"], MARKET_DATA, membership_level="trial"))["5m"]
+
+    assert prediction["degraded"]
+    assert prediction["details"]["deepseek"]["confidence"] == 0.0
+    assert "降级" in prediction["details"]["deepseek"]["reasoning"]
+    assert saved == {}
+
+
+
+def test_failed_deepseek_call_is_degraded_and_not_cached():
+    """测试DEEPSEEK请求失败的结果标记为降级，不写入缓存"""
+    saved = {}
+
+    class Store:
+        async def get_json(self, key):
+            return saved.get(key)
+
+        async def set_json(self, key, value, ttl):
+            saved[key] = value
+
+    with patch.dict(os.environ, {"DEEPSEEK_API_KEY": "test-key"}, clear=True):
+        service = PredictionService(prediction_cache=PredictionCache(Store()))
+
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async def run():
+        service.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await service.predict("BTCUSDT", ["5m"], MARKET_DATA)
+        finally:
+            await service.shutdown()
+
+    prediction = asyncio.run(run())["5m"]
+
+    assert prediction["degraded"]
+    assert prediction["details"]["deepseek"]["degraded"]
+    assert prediction["details"]["deepseek"]["confidence"] == 0.0
+    assert saved == {}
+
+    # 其他异常退回的结果同样是降级结果
+    async def broken(*args, **kwargs):
+        raise RuntimeError("bad prompt")
+
+    service.call_deepseek_api = broken
+    fallback = asyncio.run(service.deepseek_analysis("BTCUSDT", "5m", MARKET_DATA))
+    assert fallback["degraded"] and fallback["confidence"] == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,130 @@
+"""
+预测预热测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from llm_governor import WARM_TIER
+from prediction_warmer import PopularityTracker, PredictionWarmer
+
+T0 = 1_699_999_200
+
+
+def test_tracker_counts_recent_requests_only():
+    """测试只统计窗口内的请求，按次数排序"""
+    tracker = PopularityTracker(window=600)
+    tracker.record("BTCUSDT", ["1m", "5m"], now=T0)
+    tracker.record("BTCUSDT", ["1m"], now=T0 + 120)
+    assert tracker.top(10, now=T0 + 130) == [(("BTCUSDT", "1m"), 2), (("BTCUSDT", "5m"), 1)]
+
+    # 第一分钟的请求已超出窗口
+    tracker.record("ETHUSDT", ["1m"], now=T0 + 700)
+    assert tracker.top(10, now=T0 + 700) == [(("BTCUSDT", "1m"), 1), (("ETHUSDT", "1m"), 1)]
+
+
+def test_warm_predicts_popular_due_pairs():
+    """测试只为刚收盘时间框架下的热门交易对预热，同一交易对合并为一次调用"""
+    class Service:
+        def __init__(self):
+            self.calls = []
+
+        async def predict(self, symbol, timeframes, market_data, membership_level=None):
+            assert membership_level == WARM_TIER
+            self.calls.append((symbol, sorted(timeframes)))
+            return {}
+
+    class Snapshot:
+        def get_symbol_data(self, symbol):
+            return {"binance": {"price": 100.0}} if symbol != "DOGEUSDT" else {}
+
+    tracker = PopularityTracker()
+    for _ in range(3):
+        tracker.record("BTCUSDT", ["1m", "5m", "1h"])
+    tracker.record("ETHUSDT", ["1m"])  # 次数不足
+    tracker.record("DOGEUSDT", ["1m"])
+    tracker.record("DOGEUSDT", ["1m"])  # 无行情数据
+
+    service = Service()
+    warmer = PredictionWarmer(service, Snapshot(), tracker, min_count=2)
+    warmed = asyncio.run(warmer.warm(["1m", "5m"]))
+
+    assert service.calls == [("BTCUSDT", ["1m", "5m"])]
+    assert warmed == 2
+    assert warmer.get_stats()["warmed"] == 2
+
+
+def test_warm_ranks_within_due_timeframes():
+    """测试高频时间框架的热门交易对不会挤掉刚收盘的长周期时间框架"""
+    class Service:
+        def __init__(self):
+            self.calls = []
+
+        async def predict(self, symbol, timeframes, market_data, membership_level=None):
+            self.calls.append((symbol, sorted(timeframes)))
+            return {}
+
+    class Snapshot:
+        def get_symbol_data(self, symbol):
+            return {"binance": {"price": 100.0}}
+
+    tracker = PopularityTracker()
+    for symbol in ("BTCUSDT", "ETHUSDT", "SOLUSDT"):
+        for _ in range(10):
+            tracker.record(symbol, ["1m"])
+    for _ in range(2):
+        tracker.record("BNBUSDT", ["4h"])
+
+    service = Service()
+    warmer = PredictionWarmer(service, Snapshot(), tracker, top_n=2, min_count=2)
+    assert asyncio.run(warmer.warm(["4h"])) == 1
+    assert service.calls == [("BNBUSDT", ["4h"])]
+    assert tracker.top(2, timeframes=["4h"]) == [(("BNBUSDT", "4h"), 2)]
+
+
+def test_warm_lease_lets_one_worker_compute():
+    """测试多个worker共享租约时，同一K线的预热只由一个worker计算"""
+    class Service:
+        def __init__(self):
+            self.calls = []
+
+        async def predict(self, symbol, timeframes, market_data, membership_level=None):
+            self.calls.append((symbol, sorted(timeframes)))
+            return {}
+
+    class Snapshot:
+        def get_symbol_data(self, symbol):
+            return {"binance": {"price": 100.0}}
+
+    class LeaseStore:
+        def __init__(self):
+            self.keys = set()
+
+        async def set_nx(self, key, value, ttl):
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+            return True
+
+    store = LeaseStore()
+    workers = []
+    for _ in range(3):
+        tracker = PopularityTracker()
+        tracker.record("BTCUSDT", ["1m", "5m"])
+        workers.append(PredictionWarmer(Service(), Snapshot(), tracker, min_count=1, lease_store=store))
+
+    async def run():
+        return await asyncio.gather(*(worker.warm(["1m", "5m"]) for worker in workers))
+
+    assert sorted(asyncio.run(run())) == [0, 0, 2]
+    assert sum(len(worker.prediction_service.calls) for worker in workers) == 1
+    assert sum(worker.get_stats()["leased_elsewhere"] for worker in workers) == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
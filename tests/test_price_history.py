@@ -0,0 +1,90 @@
+"""
+价格历史测试
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from price_history import PriceHistory, trend_features
+from prediction_service import PredictionService
+
+T0 = 1_699_999_200  # 整小时开盘时间
+
+
+def test_minute_buckets_keep_last_price_and_wrap():
+    """测试同一分钟保留最后价格，缓冲区满后覆盖最旧数据"""
+    history = PriceHistory(capacity=3)
+    history.append("BTCUSDT", T0, 100.0)
+    history.append("BTCUSDT", T0 + 30, 101.0)
+    for minute in range(1, 4):
+        history.append("BTCUSDT", T0 + 60 * minute, 100.0 + minute * 10)
+
+    opens, closes = history.bars("BTCUSDT", "1m", 10)
+    assert history.size("BTCUSDT") == 3
+    assert list(closes) == [110.0, 120.0, 130.0]
+    assert list(np.diff(opens)) == [60, 60]
+
+
+def test_bars_aggregate_minutes_into_timeframe():
+    """测试分钟数据聚合为更大时间框架的收盘价"""
+    history = PriceHistory()
+    for minute in range(12):
+        history.append("BTCUSDT", T0 + 60 * minute, 100.0 + minute)
+
+    opens, closes = history.bars("BTCUSDT", "5m", 10)
+    assert all(opens % 300 == 0)
+    assert closes[-1] == 111.0
+    # 完整K线以最后一分钟的价格收盘
+    full = closes[:-1]
+    assert list(np.diff(full)) == [5.0] * (len(full) - 1)
+
+
+def test_closed_bars_exclude_current_bar():
+    """测试已收盘K线不含当前未收盘K线"""
+    history = PriceHistory()
+    for minute in range(12):
+        history.append("BTCUSDT", T0 + 60 * minute, 100.0 + minute)
+
+    # 第12分钟仍在第三根5分钟K线内
+    opens, closes = history.closed_bars("BTCUSDT", "5m", 10, now=T0 + 11 * 60 + 30)
+    assert list(opens) == [T0, T0 + 300]
+    assert list(closes) == [104.0, 109.0]
+    # 下一根K线开始后，第三根已收盘
+    opens, closes = history.closed_bars("BTCUSDT", "5m", 2, now=T0 + 15 * 60)
+    assert list(closes) == [109.0, 111.0]
+
+
+def test_trend_features_follow_direction():
+    """测试上涨和下跌序列的趋势、动量符号"""
+    rng = np.random.default_rng(7)
+    noise = rng.normal(0, 0.001, 60)
+    up = 100 * np.exp(np.cumsum(noise + 0.002))
+    down = 100 * np.exp(np.cumsum(noise - 0.002))
+
+    assert trend_features(up)["trend"] > 0 and trend_features(up)["momentum"] > 0
+    assert trend_features(down)["trend"] < 0 and trend_features(down)["momentum"] < 0
+
+
+def test_technical_prediction_is_deterministic():
+    """测试技术分析基于价格历史给出确定的结果"""
+    history = PriceHistory()
+    for minute in range(120):
+        history.append("BTCUSDT", T0 + 60 * minute, 100.0 * (1.001 ** minute))
+    service = PredictionService(price_history=history)
+
+    first = asyncio.run(service.technical_analysis_prediction("BTCUSDT", "1m", {}))
+    second = asyncio.run(service.technical_analysis_prediction("BTCUSDT", "1m", {}))
+
+    assert first == second
+    assert first["direction"] == "up"
+    assert first["features"]["bars"] == service.TECHNICAL_LOOKBACK
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
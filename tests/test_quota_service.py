@@ -0,0 +1,104 @@
+"""
+配额服务测试
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from quota_service import QuotaService, QUOTA_LIMITS
+
+
+def make_service(initial_usage=0):
+    """创建连接不可用Redis的配额服务，以测试进程内计数"""
+    loads = []
+
+    async def loader(user_id, since):
+        loads.append(user_id)
+        return initial_usage
+
+    service = QuotaService(redis_url="redis://127.0.0.1:1/0", usage_loader=loader)
+    return service, loads
+
+
+def test_local_fallback_enforces_limit():
+    """测试Redis不可用时进程内计数仍然限制配额"""
+    async def run():
+        service, loads = make_service(initial_usage=QUOTA_LIMITS["trial"] - 2)
+        results = [await service.consume(1, "trial") for _ in range(3)]
+        await service.close()
+        return results, loads
+
+    results, loads = asyncio.run(run())
+    assert [r["allowed"] for r in results] == [True, True, False]
+    assert [r["remaining"] for r in results] == [1, 0, 0]
+    # 当日用量只在计数器初始化时加载一次
+    assert loads == [1]
+
+
+def test_refund_restores_quota():
+    """测试退还配额"""
+    async def run():
+        service, _ = make_service(initial_usage=QUOTA_LIMITS["basic"] - 1)
+        first = await service.consume(2, "basic")
+        await service.refund(2, "basic")
+        second = await service.consume(2, "basic")
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["allowed"] and second["allowed"]
+    assert second["remaining"] == 0
+
+
+def test_refund_targets_consume_day():
+    """测试跨越午夜的请求退还到扣减当天的计数器，且不会在新的一天创建计数器"""
+    calls = []
+
+    class StubRedis:
+        def register_script(self, script):
+            async def run(keys, args=()):
+                calls.append(("refund" if "DECR" in script else "consume", keys[0]))
+                return [1, 1] if "INCR" in script else -1
+            return run
+
+    async def run():
+        service = QuotaService(redis_client=StubRedis())
+        quota = await service.consume(4, "basic")
+        await service.refund(4, "basic", "20240101")
+
+        # Redis不可用时同样只退还扣减当天的进程内计数
+        local, _ = make_service()
+        local_quota = await local.consume(5, "trial")
+        await local.refund(5, "trial", "19990101")
+        unchanged = dict(local._local_counts)
+        await local.refund(5, "trial", local_quota["day"])
+        await local.close()
+        return quota, unchanged, dict(local._local_counts), local_quota["day"]
+
+    quota, unchanged, refunded, day = asyncio.run(run())
+    assert calls == [("consume", f"quota:4:{quota['day']}"), ("refund", "quota:4:20240101")]
+    assert unchanged == {(5, day): 1}
+    assert refunded == {(5, day): 0}
+
+
+def test_premium_is_unlimited():
+    """测试高级会员不限次数"""
+    async def run():
+        service, loads = make_service()
+        result = await service.consume(3, "premium")
+        await service.close()
+        return result, loads
+
+    result, loads = asyncio.run(run())
+    assert result["allowed"]
+    assert result["remaining"] is None
+    assert loads == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
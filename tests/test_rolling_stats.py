@@ -0,0 +1,93 @@
+"""
+滚动窗口统计测试
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 添加后端目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+# 测试共用函数
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from ai_strategy_service import AIStrategyService
+from rolling_stats import rolling_max, rolling_mean, rolling_min, rolling_std, rolling_var
+from tests.helpers import random_walk
+
+
+@pytest.mark.parametrize("period", [1, 5, 20, 50])
+def test_matches_window_by_window_results(period):
+    """测试与逐窗口计算的结果一致"""
+    values = random_walk(3001)
+    windows = sliding_window_view(values, period)
+
+    np.testing.assert_allclose(rolling_mean(values, period), np.convolve(values, np.ones(period)/period, mode='valid'), rtol=1e-12)
+    np.testing.assert_allclose(rolling_var(values, period), windows.var(axis=1), rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(rolling_max(values, period), windows.max(axis=1))
+    np.testing.assert_array_equal(rolling_min(values, period), windows.min(axis=1))
+
+
+def test_variance_stable_for_large_offsets():
+    """测试价格很大、波动很小时方差不因大数相减失真"""
+    rng = np.random.default_rng(1)
+    values = 1e9 + np.cumsum(rng.normal(0, 0.01, 100_000))
+    expected = np.array([np.std(values[i:i+20]) for i in range(len(values) - 19)])
+
+    np.testing.assert_allclose(rolling_std(values, 20), expected, rtol=1e-4)
+    np.testing.assert_array_equal(rolling_std(np.full(100, 43250.1), 20), np.zeros(81))
+
+
+def test_variance_stable_for_long_trending_series():
+    """测试长期趋势使价格远离整体均值时，窗口标准差仍然准确"""
+    rng = np.random.default_rng(3)
+    n = 1_000_000
+    values = np.linspace(10_000, 60_000, n) + rng.normal(0, 0.5, n)
+    for period in (20, 200):
+        expected = sliding_window_view(values, period).std(axis=1)
+        np.testing.assert_allclose(rolling_std(values, period), expected, rtol=1e-8)
+        np.testing.assert_allclose(rolling_mean(values, period), sliding_window_view(values, period).mean(axis=1), rtol=1e-12)
+
+
+def test_two_dimensional_rows_match_one_dimensional():
+    """测试二维输入按行计算，与逐行调用一致"""
+    matrix = np.stack([random_walk(500, start=start, seed=seed) for seed, start in enumerate((43250.0, 2580.0, 0.5))])
+    for func in (rolling_mean, rolling_std, rolling_max, rolling_min):
+        result = func(matrix, 20)
+        assert result.shape == (3, 481)
+        for row in range(3):
+            np.testing.assert_allclose(result[row], func(matrix[row], 20), rtol=1e-9)
+    assert rolling_mean(matrix, 600).shape == (3, 0)
+
+
+def test_short_series_returns_empty():
+    """测试序列短于窗口时返回空数组"""
+    assert len(rolling_mean([1.0, 2.0], 5)) == 0
+    assert len(rolling_max([1.0, 2.0], 5)) == 0
+    with pytest.raises(ValueError):
+        rolling_mean([1.0], 0)
+
+
+def test_indicators_match_previous_implementation():
+    """测试布林带、RSI与原实现一致"""
+    prices = random_walk(2000, seed=2)
+    service = AIStrategyService()
+
+    upper, middle, lower = service._calculate_bollinger_bands(prices, 20, 2)
+    ma = np.convolve(prices, np.ones(20)/20, mode='valid')
+    std = np.array([np.std(prices[i:i+20]) for i in range(len(prices)-20+1)])
+    np.testing.assert_allclose(middle, ma, rtol=1e-12)
+    np.testing.assert_allclose(upper, ma + 2 * std, rtol=1e-9)
+    np.testing.assert_allclose(lower, ma - 2 * std, rtol=1e-9)
+
+    deltas = np.diff(prices)
+    avg_gains = np.convolve(np.where(deltas > 0, deltas, 0), np.ones(14)/14, mode='valid')
+    avg_losses = np.convolve(np.where(deltas < 0, -deltas, 0), np.ones(14)/14, mode='valid')
+    expected_rsi = 100 - (100 / (1 + avg_gains / (avg_losses + 1e-10)))
+    np.testing.assert_allclose(service._calculate_rsi(prices, 14), expected_rsi, rtol=1e-6, atol=1e-6)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])